@@ -3,32 +3,54 @@ Flask API Server for Avilla Partners Dashboard
 Provides working API endpoints with real data integration
 """
 
-from flask import Flask, jsonify, request, render_template_string, send_from_directory
+from flask import Flask, Response, jsonify, request, render_template_string, send_from_directory, stream_with_context
 from flask_cors import CORS
 import json
 import pandas as pd
 import requests
 from typing import Dict, List, Optional
 import os
+import atexit
 from datetime import datetime
 import openai
+from firm_store import FirmStore, cursor_position, decode_cursor, encode_cursor
+from buybox_engine import BuyboxEngine
+from firm_aggregates import FirmAggregates
+from firm_details import FirmDetailIndex
+from firm_export import PARQUET_AVAILABLE, stream_csv, stream_parquet
+from firm_snapshot import FirmSnapshotManager
+from firm_columnar import ColumnarSnapshot
+from response_cache import LRUCache, conditional_get
+from search_interpreter import QueryInterpreter, RuleBasedParser
 
 app = Flask(__name__)
 CORS(app)
 
-# Load the generated firm database
-try:
-    with open('/Users/osirislamon/Documents/GitHub/oc_startup/avilla_firms_database.json', 'r') as f:
-        FIRMS_DATABASE = json.load(f)
-    
-    with open('/Users/osirislamon/Documents/GitHub/oc_startup/avilla_summary_stats.json', 'r') as f:
-        SUMMARY_STATS = json.load(f)
-        
-    print(f"✅ Loaded {len(FIRMS_DATABASE)} firms from database")
-except Exception as e:
-    print(f"❌ Error loading database: {e}")
-    FIRMS_DATABASE = []
-    SUMMARY_STATS = {}
+# Load the generated firm database into a hot-reloadable snapshot
+def build_firm_indexes(records):
+    """Columnar store and derived indexes used by the listing endpoints"""
+    store = FirmStore.from_columnar(records) if isinstance(records, ColumnarSnapshot) else FirmStore(records)
+    return {
+        'store': store,
+        'buybox_engine': BuyboxEngine(store),
+        'aggregates': FirmAggregates(store),
+        'details': FirmDetailIndex(store),
+        'filtered_ids': LRUCache(128),  # filter fingerprint -> ordered row ids
+        'query_parser': RuleBasedParser.from_store(store)
+    }
+
+FIRM_SNAPSHOTS = FirmSnapshotManager(
+    '/Users/osirislamon/Documents/GitHub/oc_startup/avilla_firms_database.json',
+    stats_path='/Users/osirislamon/Documents/GitHub/oc_startup/avilla_summary_stats.json',
+    columnar_path='/Users/osirislamon/Documents/GitHub/oc_startup/avilla_firms_database.bin',
+    records_as_columns=True,
+    build=build_firm_indexes
+)
+if FIRM_SNAPSHOTS.last_reload.get('error'):
+    print(f"❌ Error loading database: {FIRM_SNAPSHOTS.last_reload['error']}")
+else:
+    print(f"✅ Loaded {len(FIRM_SNAPSHOTS.current.records)} firms from database")
+FIRM_SNAPSHOTS.start_watcher()
 
 # API Configuration (use environment variables in production)
 API_CONFIG = {
@@ -89,13 +111,23 @@ def comprehensive_dashboard():
     except FileNotFoundError:
         return "<h1>Comprehensive dashboard not found</h1>", 404
 
+def snapshot_version():
+    """Identity of the data behind the polled endpoints (used in ETags)"""
+    info = FIRM_SNAPSHOTS.current.info
+    return f"{info.get('version')}:{info.get('stats_version')}"
+
+RESPONSE_BODIES = LRUCache(256)
+
 @app.route('/api/firms')
+@conditional_get(snapshot_version, RESPONSE_BODIES)
 def get_firms():
     """Get firms with filtering and pagination"""
+    snapshot = FIRM_SNAPSHOTS.current
     
     # Get query parameters
     page = int(request.args.get('page', 1))
     per_page = int(request.args.get('per_page', 50))
+    cursor = request.args.get('cursor')  # keyset pagination; '' requests the first page
     state = request.args.get('state', 'all')
     min_score = int(request.args.get('min_score', 0))
     max_score = int(request.args.get('max_score', 100))
@@ -105,51 +137,51 @@ def get_firms():
     succession_risk = request.args.get('succession_risk', 'all')
     website_status = request.args.get('website_status', 'all')
     search_query = request.args.get('search', '')
+    search_mode = request.args.get('search_mode', 'substring')  # substring, prefix, fuzzy
+    sort = request.args.get('sort', 'default')  # default or relevance
+    
+    # Filter firms through the store's bitmap and range indexes
+    score_filtered = min_score > 0 or max_score < 100
+    revenue_filtered = min_revenue > 0 or max_revenue < 50000000
+    filters = dict(
+        state=state if state != 'all' else None,
+        min_score=min_score if score_filtered else None,
+        max_score=max_score if score_filtered else None,
+        min_revenue=min_revenue if revenue_filtered else None,
+        max_revenue=max_revenue if revenue_filtered else None,
+        subindustry=subindustry if subindustry != 'all' else None,
+        succession_risk=succession_risk if succession_risk != 'all' else None,
+        website_status=website_status if website_status != 'all' else None,
+        search=search_query or None,
+        search_mode=search_mode
+    )
     
-    # Filter firms
-    filtered_firms = FIRMS_DATABASE.copy()
-    
-    # Apply filters
-    if state != 'all':
-        filtered_firms = [f for f in filtered_firms if f['state'] == state]
-    
-    if min_score > 0 or max_score < 100:
-        filtered_firms = [f for f in filtered_firms if min_score <= f['deal_score'] <= max_score]
-    
-    if min_revenue > 0 or max_revenue < 50000000:
-        filtered_firms = [f for f in filtered_firms if min_revenue <= f['revenue_estimate'] <= max_revenue]
-    
-    if subindustry != 'all':
-        filtered_firms = [f for f in filtered_firms if f['subindustry'] == subindustry]
-    
-    if succession_risk != 'all':
-        if succession_risk == 'low':
-            filtered_firms = [f for f in filtered_firms if f['succession_risk_score'] < 40]
-        elif succession_risk == 'medium':
-            filtered_firms = [f for f in filtered_firms if 40 <= f['succession_risk_score'] < 70]
-        elif succession_risk == 'high':
-            filtered_firms = [f for f in filtered_firms if f['succession_risk_score'] >= 70]
-    
-    if website_status != 'all':
-        if website_status == 'has_website':
-            filtered_firms = [f for f in filtered_firms if f['website'] is not None]
-        elif website_status == 'no_website':
-            filtered_firms = [f for f in filtered_firms if f['website'] is None]
-    
-    # Search functionality
-    if search_query:
-        search_lower = search_query.lower()
-        filtered_firms = [f for f in filtered_firms if 
-                         search_lower in f['name'].lower() or
-                         search_lower in f['city'].lower() or
-                         search_lower in f['owner_name'].lower() or
-                         search_lower in f['subindustry'].lower()]
-    
-    # Pagination
-    total_firms = len(filtered_firms)
-    start_idx = (page - 1) * per_page
+    # The filtered, ordered id list is shared by every page of the same query
+    filter_key = (tuple(sorted(filters.items())), sort)
+    firm_ids = snapshot.filtered_ids.get(filter_key)
+    if firm_ids is None:
+        firm_ids = snapshot.store.select(**filters)
+        if search_query and sort == 'relevance':
+            firm_ids = snapshot.store.rank_by_relevance(firm_ids, search_query)
+        snapshot.filtered_ids.put(filter_key, firm_ids)
+    
+    # Pagination - only the requested page is materialized into dicts
+    total_firms = len(firm_ids)
+    if cursor is not None:
+        start_idx = 0
+        if cursor:
+            try:
+                position = decode_cursor(cursor)
+            except ValueError as e:
+                return jsonify({'error': str(e)}), 400
+            if position['v'] != snapshot.store.version:
+                return jsonify({'error': 'Cursor expired - the firm database was reloaded, restart pagination'}), 410
+            start_idx = cursor_position(firm_ids, position['after'], position['pos'])
+        page = start_idx // per_page + 1
+    else:
+        start_idx = (page - 1) * per_page
     end_idx = start_idx + per_page
-    paginated_firms = filtered_firms[start_idx:end_idx]
+    paginated_firms = snapshot.store.rows(firm_ids[start_idx:end_idx])
     
     return jsonify({
         'firms': paginated_firms,
@@ -157,7 +189,8 @@ def get_firms():
             'page': page,
             'per_page': per_page,
             'total': total_firms,
-            'pages': (total_firms + per_page - 1) // per_page
+            'pages': (total_firms + per_page - 1) // per_page,
+            'next_cursor': encode_cursor(snapshot.store.version, firm_ids, end_idx)
         },
         'filters_applied': {
             'state': state,
@@ -166,67 +199,50 @@ def get_firms():
             'subindustry': subindustry,
             'succession_risk': succession_risk,
             'website_status': website_status,
-            'search_query': search_query
+            'search_query': search_query,
+            'search_mode': search_mode,
+            'sort': sort
         }
     })
 
 @app.route('/api/firm/<firm_id>')
 def get_firm_details(firm_id):
     """Get detailed information for a specific firm"""
+    snapshot = FIRM_SNAPSHOTS.current
     
-    firm = next((f for f in FIRMS_DATABASE if f['firm_id'] == firm_id), None)
+    enriched_firm = snapshot.details.details(firm_id)
     
-    if not firm:
+    if not enriched_firm:
         return jsonify({'error': 'Firm not found'}), 404
     
-    # Enrich with additional details
-    enriched_firm = firm.copy()
-    
-    # Add market context
-    same_metro_firms = [f for f in FIRMS_DATABASE if f['metro'] == firm['metro']]
-    enriched_firm['market_context'] = {
-        'metro_firm_count': len(same_metro_firms),
-        'metro_avg_score': sum(f['deal_score'] for f in same_metro_firms) / len(same_metro_firms),
-        'rank_in_metro': sorted(same_metro_firms, key=lambda x: x['deal_score'], reverse=True).index(firm) + 1
-    }
-    
-    # Add valuation estimates
-    ebitda = enriched_firm['estimated_ebitda']
-    multiple = enriched_firm['estimated_multiple']
-    enriched_firm['valuation_estimates'] = {
-        'enterprise_value': int(ebitda * multiple),
-        'equity_value_range': [int(ebitda * (multiple - 0.5)), int(ebitda * (multiple + 0.5))],
-        'price_per_employee': int((ebitda * multiple) / firm['employee_count']) if firm['employee_count'] > 0 else 0
-    }
-    
-    # Add competitive analysis
-    competitors = [f for f in FIRMS_DATABASE if 
-                   f['metro'] == firm['metro'] and 
-                   f['subindustry'] == firm['subindustry'] and
-                   f['firm_id'] != firm_id][:5]
-    
-    enriched_firm['competitors'] = [{
-        'name': c['name'],
-        'revenue_estimate': c['revenue_estimate'],
-        'deal_score': c['deal_score'],
-        'succession_risk_score': c['succession_risk_score']
-    } for c in competitors]
-    
     return jsonify(enriched_firm)
 
-@app.route('/api/ai-search', methods=['POST'])
-def ai_search():
-    """AI-powered natural language search"""
+@app.route('/api/firms/details', methods=['POST'])
+def get_firms_details():
+    """Get detailed information for many firms in one request"""
+    snapshot = FIRM_SNAPSHOTS.current
     
-    data = request.get_json()
-    query = data.get('query', '')
+    data = request.get_json() or {}
+    firm_ids = data.get('firm_ids', [])
     
-    if not query:
-        return jsonify({'error': 'Query is required'}), 400
+    if not isinstance(firm_ids, list) or not firm_ids:
+        return jsonify({'error': 'firm_ids must be a non-empty list'}), 400
+    if len(firm_ids) > 500:
+        return jsonify({'error': 'At most 500 firm_ids per request'}), 400
+    if any(isinstance(firm_id, bool) or not isinstance(firm_id, (str, int)) for firm_id in firm_ids):
+        return jsonify({'error': 'firm_ids must be strings or integers'}), 400
+
+    firms, not_found = snapshot.details.batch_details(firm_ids)
     
-    try:
-        # Use OpenAI to interpret the search query
-        prompt = f"""
+    return jsonify({
+        'firms': firms,
+        'not_found': not_found,
+        'count': len(firms)
+    })
+
+def interpret_query_with_llm(query: str) -> Optional[Dict]:
+    """Ask OpenAI to turn a search query into filter params (None if the reply is not JSON)"""
+    prompt = f"""
         Convert this natural language query about accounting firms into structured search parameters:
         
         Query: "{query}"
@@ -247,98 +263,93 @@ def ai_search():
         - "high succession risk CPA firms" -> {{"subindustry": "CPA Firms", "succession_risk": "high"}}
         - "firms without websites over $2M revenue" -> {{"website_status": "no_website", "min_revenue": 2000000}}
         """
-        
-        response = client.chat.completions.create(
-            model="gpt-3.5-turbo",
-            messages=[{"role": "user", "content": prompt}],
-            max_tokens=300,
-            temperature=0.1
-        )
-        
-        # Parse the AI response
-        ai_response = response.choices[0].message.content
-        try:
-            search_params = json.loads(ai_response)
-        except json.JSONDecodeError:
+    
+    response = client.chat.completions.create(
+        model="gpt-3.5-turbo",
+        messages=[{"role": "user", "content": prompt}],
+        max_tokens=300,
+        temperature=0.1
+    )
+    
+    # Parse the AI response
+    ai_response = response.choices[0].message.content
+    try:
+        return json.loads(ai_response)
+    except json.JSONDecodeError:
+        return None
+
+QUERY_INTERPRETER = QueryInterpreter(
+    interpret_query_with_llm,
+    cache_path=os.getenv('AI_SEARCH_CACHE_PATH')  # optional on-disk persistence
+)
+
+@app.route('/api/ai-search', methods=['POST'])
+def ai_search():
+    """AI-powered natural language search"""
+    snapshot = FIRM_SNAPSHOTS.current
+    
+    data = request.get_json()
+    query = data.get('query', '')
+    
+    if not query:
+        return jsonify({'error': 'Query is required'}), 400
+    
+    try:
+        # Rule parser first, then the interpretation cache, then OpenAI
+        search_params, interpretation_source = QUERY_INTERPRETER.interpret(query, snapshot.query_parser)
+        if search_params is None:
             # Fallback to keyword search
             search_params = {"search_query": query, "additional_context": "Fallback to keyword search"}
         
-        # Apply the AI-interpreted search
-        filtered_firms = FIRMS_DATABASE.copy()
-        
-        # Apply AI-derived filters
-        if search_params.get('state') and search_params['state'] != 'all':
-            filtered_firms = [f for f in filtered_firms if f['state'] == search_params['state']]
-        
-        if search_params.get('min_revenue'):
-            filtered_firms = [f for f in filtered_firms if f['revenue_estimate'] >= search_params['min_revenue']]
-        
-        if search_params.get('max_revenue'):
-            filtered_firms = [f for f in filtered_firms if f['revenue_estimate'] <= search_params['max_revenue']]
-        
-        if search_params.get('min_deal_score'):
-            filtered_firms = [f for f in filtered_firms if f['deal_score'] >= search_params['min_deal_score']]
-        
-        if search_params.get('subindustry'):
-            filtered_firms = [f for f in filtered_firms if f['subindustry'] == search_params['subindustry']]
-        
-        if search_params.get('succession_risk') and search_params['succession_risk'] != 'all':
-            if search_params['succession_risk'] == 'low':
-                filtered_firms = [f for f in filtered_firms if f['succession_risk_score'] < 40]
-            elif search_params['succession_risk'] == 'medium':
-                filtered_firms = [f for f in filtered_firms if 40 <= f['succession_risk_score'] < 70]
-            elif search_params['succession_risk'] == 'high':
-                filtered_firms = [f for f in filtered_firms if f['succession_risk_score'] >= 70]
-        
-        if search_params.get('website_status') and search_params['website_status'] != 'all':
-            if search_params['website_status'] == 'has_website':
-                filtered_firms = [f for f in filtered_firms if f['website'] is not None]
-            elif search_params['website_status'] == 'no_website':
-                filtered_firms = [f for f in filtered_firms if f['website'] is None]
-        
-        if search_params.get('city_keywords'):
-            city_firms = []
-            for keyword in search_params['city_keywords']:
-                city_firms.extend([f for f in filtered_firms if keyword.lower() in f['city'].lower()])
-            filtered_firms = city_firms
+        # Apply the AI-interpreted search through the firm store indexes
+        firm_ids = snapshot.store.select(
+            state=search_params['state'] if search_params.get('state') and search_params['state'] != 'all' else None,
+            min_revenue=search_params.get('min_revenue') or None,
+            max_revenue=search_params.get('max_revenue') or None,
+            min_score=search_params.get('min_deal_score') or None,
+            subindustry=search_params.get('subindustry') or None,
+            succession_risk=search_params.get('succession_risk') or None,
+            website_status=search_params.get('website_status') or None,
+            city_keywords=search_params.get('city_keywords') or None
+        )
         
         # Limit results and sort by deal score
-        filtered_firms.sort(key=lambda x: x['deal_score'], reverse=True)
+        firm_ids = snapshot.store.order_by(firm_ids, 'deal_score', descending=True)
         
         return jsonify({
             'query': query,
             'interpreted_search': search_params,
-            'results_count': len(filtered_firms),
-            'firms': filtered_firms[:25],  # Return top 25 results
-            'ai_explanation': search_params.get('additional_context', f'Found {len(filtered_firms)} firms matching your criteria')
+            'results_count': len(firm_ids),
+            'firms': snapshot.store.rows(firm_ids[:25]),  # Return top 25 results
+            'ai_explanation': search_params.get('additional_context', f'Found {len(firm_ids)} firms matching your criteria'),
+            'interpretation_source': interpretation_source
         })
         
     except Exception as e:
         print(f"AI search error: {e}")
-        # Fallback to simple keyword search
-        search_lower = query.lower()
-        filtered_firms = [f for f in FIRMS_DATABASE if 
-                         search_lower in f['name'].lower() or
-                         search_lower in f['city'].lower() or
-                         search_lower in f['subindustry'].lower()]
+        # Fallback to keyword search over the inverted index
+        firm_ids = snapshot.store.search_ids(query, fields=('name', 'city', 'subindustry'))
         
         return jsonify({
             'query': query,
             'interpreted_search': {'fallback': True},
-            'results_count': len(filtered_firms),
-            'firms': filtered_firms[:25],
-            'ai_explanation': f'Performed keyword search, found {len(filtered_firms)} matches'
+            'results_count': len(firm_ids),
+            'firms': snapshot.store.rows(firm_ids[:25]),
+            'ai_explanation': f'Performed keyword search, found {len(firm_ids)} matches',
+            'interpretation_source': 'keyword'
         })
 
 @app.route('/api/generate-outreach', methods=['POST'])
 def generate_outreach():
     """Generate personalized outreach emails"""
+    snapshot = FIRM_SNAPSHOTS.current
     
     data = request.get_json()
     firm_id = data.get('firm_id')
     template_type = data.get('template_type', 'succession_opportunity')
     
-    firm = next((f for f in FIRMS_DATABASE if f['firm_id'] == firm_id), None)
+    row = snapshot.details.row(firm_id)
+    firm = snapshot.store.rows([row])[0] if row is not None else None
     
     if not firm:
         return jsonify({'error': 'Firm not found'}), 404
@@ -402,89 +413,91 @@ def generate_outreach():
 
 @app.route('/api/export-firms')
 def export_firms():
-    """Export firms to CSV"""
+    """Export firms to CSV (or stream CSV/Parquet with ?stream=true)"""
+    snapshot = FIRM_SNAPSHOTS.current
     
     # Apply same filters as get_firms
     state = request.args.get('state', 'all')
     min_score = int(request.args.get('min_score', 0))
+    stream = request.args.get('stream', 'false').lower() == 'true'
+    export_format = request.args.get('format', 'csv').lower()
     
-    filtered_firms = FIRMS_DATABASE.copy()
-    
-    if state != 'all':
-        filtered_firms = [f for f in filtered_firms if f['state'] == state]
-    
-    if min_score > 0:
-        filtered_firms = [f for f in filtered_firms if f['deal_score'] >= min_score]
+    firm_ids = snapshot.store.select(
+        state=state if state != 'all' else None,
+        min_score=min_score if min_score > 0 else None
+    )
     
-    # Convert to CSV format
-    df = pd.DataFrame(filtered_firms)
+    if stream:
+        # Chunked response - rows are rendered as the client reads them
+        filename = f'avilla_firms_export_{datetime.now().strftime("%Y%m%d_%H%M%S")}.{export_format}'
+        headers = {
+            'Content-Disposition': f'attachment; filename={filename}',
+            'X-Record-Count': str(len(firm_ids))
+        }
+        if export_format == 'csv':
+            return Response(stream_with_context(stream_csv(snapshot.store, firm_ids)),
+                            mimetype='text/csv', headers=headers)
+        if export_format == 'parquet':
+            if not PARQUET_AVAILABLE:
+                return jsonify({'error': 'Parquet export requires pyarrow'}), 501
+            return Response(stream_with_context(stream_parquet(snapshot.store, firm_ids)),
+                            mimetype='application/vnd.apache.parquet', headers=headers)
+        return jsonify({'error': 'Unsupported export format'}), 400
+    
+    # Convert to CSV format straight from the column arrays
+    df = pd.DataFrame(snapshot.store.column_slice(firm_ids))
     csv_data = df.to_csv(index=False)
     
     return jsonify({
         'csv_data': csv_data,
         'filename': f'avilla_firms_export_{datetime.now().strftime("%Y%m%d_%H%M%S")}.csv',
-        'record_count': len(filtered_firms)
+        'record_count': len(firm_ids)
     })
 
 @app.route('/api/stats')
+@conditional_get(snapshot_version, RESPONSE_BODIES)
 def get_stats():
     """Get dashboard statistics"""
+    snapshot = FIRM_SNAPSHOTS.current
+    
+    return jsonify(snapshot.aggregates.stats)
+
+@app.route('/api/snapshot', methods=['GET', 'POST'])
+def firm_snapshot_status():
+    """Current firm database snapshot; POST forces a reload"""
+    
+    reloaded = FIRM_SNAPSHOTS.reload(force=True) if request.method == 'POST' else False
     
     return jsonify({
-        'total_firms': len(FIRMS_DATABASE),
-        'high_score_firms': len([f for f in FIRMS_DATABASE if f['deal_score'] >= 80]),
-        'succession_opportunities': len([f for f in FIRMS_DATABASE if f['succession_risk_score'] >= 70]),
-        'avg_deal_score': sum(f['deal_score'] for f in FIRMS_DATABASE) / len(FIRMS_DATABASE),
-        'ma_firms': len([f for f in FIRMS_DATABASE if f['state'] == 'MA']),
-        'fl_firms': len([f for f in FIRMS_DATABASE if f['state'] == 'FL']),
-        'last_updated': datetime.now().isoformat()
+        'snapshot': FIRM_SNAPSHOTS.current.info,
+        'last_reload': FIRM_SNAPSHOTS.last_reload,
+        'reloaded': reloaded
     })
 
 @app.route('/api/fragmentation-analysis')
+@conditional_get(snapshot_version, RESPONSE_BODIES)
 def fragmentation_analysis():
     """Get market fragmentation analysis"""
+    snapshot = FIRM_SNAPSHOTS.current
     
     metro = request.args.get('metro', 'all')
     
     if metro == 'all':
         # Return overall fragmentation summary
-        return jsonify(SUMMARY_STATS)
+        return jsonify({**snapshot.summary_stats, 'data_version': snapshot.aggregates.version})
     else:
-        # Return specific metro analysis
-        metro_firms = [f for f in FIRMS_DATABASE if f['metro'] == metro]
+        # Return precomputed metro analysis
+        analysis = snapshot.aggregates.metro_fragmentation.get(metro)
         
-        if not metro_firms:
+        if not analysis:
             return jsonify({'error': 'Metro not found'}), 404
         
-        # Calculate HHI
-        total_revenue = sum(f['revenue_estimate'] for f in metro_firms)
-        market_shares = [(f['revenue_estimate'] / total_revenue) * 100 for f in metro_firms]
-        hhi = sum((share/100)**2 for share in market_shares)
-        
-        # Top 5 concentration
-        sorted_shares = sorted(market_shares, reverse=True)
-        top5_share = sum(sorted_shares[:5])
-        
-        # Analysis
-        analysis = {
-            'metro': metro,
-            'total_firms': len(metro_firms),
-            'total_market_size': total_revenue,
-            'hhi_index': hhi,
-            'top5_concentration': top5_share,
-            'fragmentation_score': min(100, (1-hhi) * 100 + (100-top5_share) * 0.5),
-            'avg_deal_score': sum(f['deal_score'] for f in metro_firms) / len(metro_firms),
-            'succession_opportunities': len([f for f in metro_firms if f['succession_risk_score'] >= 70]),
-            'recommendation': 'High fragmentation - strong roll-up opportunity' if hhi < 0.15 else 
-                           'Moderate fragmentation - selective acquisitions' if hhi < 0.25 else
-                           'Concentrated market - focus on market leaders'
-        }
-        
         return jsonify(analysis)
 
 @app.route('/api/analyze-buybox', methods=['POST'])
 def analyze_buybox():
     """Analyze market opportunity based on custom buybox criteria"""
+    snapshot = FIRM_SNAPSHOTS.current
     
     data = request.get_json()
     buybox = data.get('buybox', {})
@@ -493,102 +506,21 @@ def analyze_buybox():
         return jsonify({'error': 'Buybox criteria required'}), 400
     
     try:
-        # Filter firms based on buybox criteria
-        filtered_firms = FIRMS_DATABASE.copy()
-        
-        # Revenue filter
-        min_revenue = buybox.get('min_revenue', 0)
-        max_revenue = buybox.get('max_revenue', 100000000)
-        filtered_firms = [f for f in filtered_firms if min_revenue <= f['revenue_estimate'] <= max_revenue]
-        
-        # EBITDA filter
-        min_ebitda = buybox.get('min_ebitda', 0)
-        filtered_firms = [f for f in filtered_firms if f['estimated_ebitda'] >= min_ebitda]
-        
-        # Multiple filter
-        max_multiple = buybox.get('max_multiple', 10)
-        filtered_firms = [f for f in filtered_firms if f['estimated_multiple'] <= max_multiple]
-        
-        # Geography filter
-        geography = buybox.get('geography', 'all')
-        if geography == 'ma':
-            filtered_firms = [f for f in filtered_firms if f['state'] == 'MA']
-        elif geography == 'fl':
-            filtered_firms = [f for f in filtered_firms if f['state'] == 'FL']
-        elif geography == 'northeast':
-            filtered_firms = [f for f in filtered_firms if f['state'] == 'MA']
-        elif geography == 'southeast':
-            filtered_firms = [f for f in filtered_firms if f['state'] == 'FL']
-        
-        # Succession priority filter
-        succession_priority = buybox.get('succession_priority', 'any')
-        if succession_priority == 'high':
-            filtered_firms = [f for f in filtered_firms if f['succession_risk_score'] >= 70]
-        elif succession_priority == 'medium':
-            filtered_firms = [f for f in filtered_firms if 40 <= f['succession_risk_score'] < 70]
-        elif succession_priority == 'growth':
-            filtered_firms = [f for f in filtered_firms if f['succession_risk_score'] < 40]
-        
-        # Digital maturity filter
-        digital_maturity = buybox.get('digital_maturity', 'any')
-        if digital_maturity == 'modern':
-            filtered_firms = [f for f in filtered_firms if f['website'] and f['yelp_review_count'] > 20]
-        elif digital_maturity == 'basic':
-            filtered_firms = [f for f in filtered_firms if f['website']]
-        elif digital_maturity == 'limited':
-            filtered_firms = [f for f in filtered_firms if not f['website']]
-        
-        # Calculate match scores
-        for firm in filtered_firms:
-            firm['match_score'] = calculate_match_score(firm, buybox)
-        
-        # Filter by minimum match score
-        filtered_firms = [f for f in filtered_firms if f.get('match_score', 0) >= 50]
-        
-        # Sort by match score
-        filtered_firms.sort(key=lambda x: x.get('match_score', 0), reverse=True)
-        
-        # Calculate TAM
-        total_tam = sum(f['estimated_ebitda'] * f['estimated_multiple'] for f in filtered_firms)
-        avg_deal_size = total_tam / len(filtered_firms) if filtered_firms else 0
-        avg_multiple = sum(f['estimated_multiple'] for f in filtered_firms) / len(filtered_firms) if filtered_firms else 0
-        
-        # Calculate fragmentation by metro
-        metro_analysis = {}
-        for firm in filtered_firms:
-            metro = firm['metro']
-            if metro not in metro_analysis:
-                metro_analysis[metro] = []
-            metro_analysis[metro].append(firm)
-        
-        fragmentation_data = {}
-        for metro, metro_firms in metro_analysis.items():
-            if len(metro_firms) >= 3:  # Only analyze metros with 3+ firms
-                total_revenue = sum(f['revenue_estimate'] for f in metro_firms)
-                market_shares = [(f['revenue_estimate'] / total_revenue) * 100 for f in metro_firms]
-                hhi = sum((share/100)**2 for share in market_shares)
-                top5_share = sum(sorted(market_shares, reverse=True)[:5])
-                
-                fragmentation_data[metro] = {
-                    'firm_count': len(metro_firms),
-                    'hhi_index': hhi,
-                    'top5_share': top5_share,
-                    'fragmentation_score': round((1 - hhi) * 100),
-                    'opportunity': 'High' if hhi < 0.15 else 'Medium' if hhi < 0.25 else 'Low'
-                }
+        # Score, filter and rank every firm in one vectorized pass
+        analysis = snapshot.buybox_engine.analyze(buybox)
+        tam_analysis = analysis['tam_analysis']
+        fragmentation_data = analysis['fragmentation_analysis']
         
         # Generate AI insights
-        insights = generate_buybox_insights(filtered_firms, buybox, total_tam, fragmentation_data)
+        insights = generate_buybox_insights(
+            analysis['total_matches'], tam_analysis['avg_multiple'], analysis['high_succession_count'],
+            tam_analysis['total_tam'], fragmentation_data
+        )
         
         return jsonify({
-            'matching_firms': filtered_firms[:100],  # Limit to top 100 results
-            'total_matches': len(filtered_firms),
-            'tam_analysis': {
-                'total_tam': total_tam,
-                'firm_count': len(filtered_firms),
-                'avg_deal_size': avg_deal_size,
-                'avg_multiple': avg_multiple
-            },
+            'matching_firms': analysis['matching_firms'],  # Top 100 results
+            'total_matches': analysis['total_matches'],
+            'tam_analysis': tam_analysis,
             'fragmentation_analysis': fragmentation_data,
             'ai_insights': insights,
             'buybox_criteria': buybox
@@ -598,80 +530,22 @@ def analyze_buybox():
         print(f"Buybox analysis error: {e}")
         return jsonify({'error': 'Analysis failed'}), 500
 
-def calculate_match_score(firm, buybox):
-    """Calculate how well a firm matches the buybox criteria"""
-    score = 0
-    
-    # Revenue match (25% weight)
-    min_rev = buybox.get('min_revenue', 0)
-    max_rev = buybox.get('max_revenue', 100000000)
-    if min_rev <= firm['revenue_estimate'] <= max_rev:
-        score += 25
-    elif firm['revenue_estimate'] >= min_rev * 0.8:
-        score += 15
-    
-    # EBITDA match (20% weight)
-    min_ebitda = buybox.get('min_ebitda', 0)
-    if firm['estimated_ebitda'] >= min_ebitda:
-        score += 20
-    elif firm['estimated_ebitda'] >= min_ebitda * 0.7:
-        score += 10
-    
-    # Multiple match (15% weight)
-    max_multiple = buybox.get('max_multiple', 10)
-    if firm['estimated_multiple'] <= max_multiple:
-        score += 15
-    elif firm['estimated_multiple'] <= max_multiple * 1.2:
-        score += 8
-    
-    # Succession priority match (20% weight)
-    succession = buybox.get('succession_priority', 'any')
-    if succession == 'high' and firm['succession_risk_score'] >= 70:
-        score += 20
-    elif succession == 'medium' and 40 <= firm['succession_risk_score'] < 70:
-        score += 20
-    elif succession == 'growth' and firm['succession_risk_score'] < 40:
-        score += 20
-    elif succession == 'any':
-        score += 15
-    
-    # Digital maturity match (10% weight)
-    digital = buybox.get('digital_maturity', 'any')
-    if digital == 'modern' and firm['website'] and firm['yelp_review_count'] > 20:
-        score += 10
-    elif digital == 'basic' and firm['website']:
-        score += 10
-    elif digital == 'limited' and not firm['website']:
-        score += 10
-    elif digital == 'any':
-        score += 8
-    
-    # Geography bonus (10% weight)
-    geography = buybox.get('geography', 'all')
-    if (geography == 'all' or 
-        (geography in ['northeast', 'ma'] and firm['state'] == 'MA') or
-        (geography in ['southeast', 'fl'] and firm['state'] == 'FL')):
-        score += 10
-    
-    return min(score, 100)
-
-def generate_buybox_insights(firms, buybox, total_tam, fragmentation_data):
+def generate_buybox_insights(firm_count, avg_multiple, high_succession, total_tam, fragmentation_data):
     """Generate AI insights based on buybox analysis"""
     insights = []
     
     # Market size insights
-    if len(firms) > 100:
-        insights.append(f"🎯 Large market opportunity with {len(firms)} matching firms identified")
-    elif len(firms) > 50:
-        insights.append(f"📊 Solid market with {len(firms)} potential targets")
-    elif len(firms) > 10:
-        insights.append(f"🔍 Focused market with {len(firms)} quality opportunities")
+    if firm_count > 100:
+        insights.append(f"🎯 Large market opportunity with {firm_count} matching firms identified")
+    elif firm_count > 50:
+        insights.append(f"📊 Solid market with {firm_count} potential targets")
+    elif firm_count > 10:
+        insights.append(f"🔍 Focused market with {firm_count} quality opportunities")
     else:
-        insights.append(f"💎 Niche market with {len(firms)} specialized targets")
+        insights.append(f"💎 Niche market with {firm_count} specialized targets")
     
     # Valuation insights
-    if firms:
-        avg_multiple = sum(f['estimated_multiple'] for f in firms) / len(firms)
+    if firm_count:
         if avg_multiple < 3.0:
             insights.append(f"💰 Attractive valuations averaging {avg_multiple:.1f}x EBITDA")
         elif avg_multiple > 4.5:
@@ -686,7 +560,6 @@ def generate_buybox_insights(firms, buybox, total_tam, fragmentation_data):
         insights.append(f"🏢 High fragmentation in {', '.join(high_frag_metros[:3])} - excellent roll-up opportunities")
     
     # Succession insights
-    high_succession = len([f for f in firms if f['succession_risk_score'] >= 70])
     if high_succession > 0:
         insights.append(f"👥 {high_succession} firms with high succession risk - immediate opportunities")
     
@@ -699,58 +572,12 @@ def generate_buybox_insights(firms, buybox, total_tam, fragmentation_data):
     return insights
 
 @app.route('/api/market-heatmap')
+@conditional_get(snapshot_version, RESPONSE_BODIES)
 def market_heatmap():
     """Get market heatmap data for visualization"""
+    snapshot = FIRM_SNAPSHOTS.current
     
-    # Group firms by zip code
-    zip_data = {}
-    for firm in FIRMS_DATABASE:
-        zip_code = firm['zip_code']
-        if zip_code not in zip_data:
-            zip_data[zip_code] = {
-                'zip': zip_code,
-                'city': firm['city'],
-                'state': firm['state'],
-                'metro': firm['metro'],
-                'firms': [],
-                'total_revenue': 0,
-                'avg_deal_score': 0,
-                'succession_opportunities': 0
-            }
-        
-        zip_data[zip_code]['firms'].append(firm)
-        zip_data[zip_code]['total_revenue'] += firm['revenue_estimate']
-        if firm['succession_risk_score'] >= 70:
-            zip_data[zip_code]['succession_opportunities'] += 1
-    
-    # Calculate aggregated metrics
-    heatmap_data = []
-    for zip_code, data in zip_data.items():
-        firm_count = len(data['firms'])
-        avg_deal_score = sum(f['deal_score'] for f in data['firms']) / firm_count
-        avg_revenue = data['total_revenue'] / firm_count
-        
-        heatmap_data.append({
-            'zip': zip_code,
-            'city': data['city'],
-            'state': data['state'],
-            'metro': data['metro'],
-            'firm_count': firm_count,
-            'avg_deal_score': round(avg_deal_score, 1),
-            'avg_revenue': round(avg_revenue / 1000000, 1),  # Convert to millions
-            'succession_opportunities': data['succession_opportunities'],
-            'market_density': firm_count,
-            'opportunity_score': round((avg_deal_score + firm_count * 5) / 2, 1)
-        })
-    
-    # Sort by opportunity score
-    heatmap_data.sort(key=lambda x: x['opportunity_score'], reverse=True)
-    
-    return jsonify({
-        'heatmap_data': heatmap_data,
-        'total_zips': len(heatmap_data),
-        'total_firms': len(FIRMS_DATABASE)
-    })
+    return jsonify(snapshot.aggregates.heatmap)
 
 @app.route('/api/universal-search', methods=['POST'])
 def universal_search():
@@ -1596,12 +1423,25 @@ def prepare_crm_data(businesses: List[Dict]) -> Dict:
 
 import random
 import numpy as np
+from heatmap_grid import sample_opportunity_grid
 
 # Import the SMB Valuation Engine
 try:
-    from smb_valuation_engine import SMBValuationEngine, BusinessSignals
+    from smb_valuation_engine import SMBValuationEngine, business_signals_from_dict
+    from valuation_cache import ValuationResultCache, json_default
+    from valuation_store import ValuationStore
+    from background_loop import BackgroundEventLoop
     VALUATION_ENGINE_AVAILABLE = True
-    valuation_engine = SMBValuationEngine(API_CONFIG)
+    # Identical inputs are answered from here; set VALUATION_CACHE_DIR to keep results across restarts
+    VALUATION_RESULTS = ValuationResultCache(directory=os.getenv('VALUATION_CACHE_DIR'))
+    # Portfolio businesses and their valuation history
+    VALUATION_STORE = ValuationStore(os.getenv('VALUATION_DB_PATH', 'valuations.db'))
+    valuation_engine = SMBValuationEngine(API_CONFIG, result_cache=VALUATION_RESULTS, store=VALUATION_STORE)
+    # The engine's HTTP session and in-flight lookups live on this loop for the life of the process
+    VALUATION_LOOP = BackgroundEventLoop("valuation-loop")
+    atexit.register(VALUATION_LOOP.stop, valuation_engine.close)
+    # job id -> latest progress event of a streamed batch
+    BATCH_JOBS = LRUCache(256)
 except ImportError:
     VALUATION_ENGINE_AVAILABLE = False
     print("⚠️ SMB Valuation Engine not available - install additional dependencies")
@@ -1615,35 +1455,10 @@ def valuate_business():
     try:
         data = request.get_json()
         
-        # Create BusinessSignals from input
-        signals = BusinessSignals(
-            business_id=data.get("business_id", "unknown"),
-            name=data.get("name", "Unknown Business"),
-            category=data.get("category", "HVAC"),
-            geo=data.get("geo", "Unknown Location"),
-            R_total=data.get("R_total", 0),
-            R_12=data.get("R_12", 0),
-            stars=data.get("stars", 3.5),
-            rating_volatility=data.get("rating_volatility", 0.3),
-            trends_now=data.get("trends_now", 1.0),
-            trends_avg=data.get("trends_avg", 1.0),
-            pop_times_index=data.get("pop_times_index", 1.0),
-            competitors_density=data.get("competitors_density", 0.5),
-            median_income=data.get("median_income", 50000),
-            population=data.get("population", 10000),
-            years_in_business=data.get("years_in_business", 5),
-            website_quality=data.get("website_quality", 0.7),
-            social_presence=data.get("social_presence", 0.5)
-        )
-        
-        # Parse ads data
-        ads_data = data.get("ads_data", [])
-        if isinstance(ads_data, list):
-            signals.ads_data = ads_data
+        signals = business_signals_from_dict(data)
         
         # Run valuation
-        import asyncio
-        result = asyncio.run(valuation_engine.valuate_business(signals))
+        result = VALUATION_LOOP.run(valuation_engine.valuate_business(signals, use_cache=data.get("use_cache", True)))
         
         return jsonify(result)
         
@@ -1651,6 +1466,29 @@ def valuate_business():
         print(f"Valuation error: {e}")
         return jsonify({"error": str(e)}), 500
 
+@app.route('/api/valuate/sensitivity', methods=['POST'])
+def valuate_sensitivity():
+    """🎯 Valuation sensitivity - deltas, tornado data and elasticities from one shared set of draws"""
+    if not VALUATION_ENGINE_AVAILABLE:
+        return jsonify({"error": "Valuation engine not available"}), 503
+    
+    try:
+        data = request.get_json()
+        perturbations = data.get("perturbations")
+        if perturbations is not None and not isinstance(perturbations, dict):
+            return jsonify({"error": "perturbations must map parameter names to changes"}), 400
+        
+        signals = business_signals_from_dict(data.get("business", {}))
+        result = valuation_engine.sensitivity_analysis(signals, perturbations, data.get("n_samples"))
+        
+        return jsonify(result)
+        
+    except (TypeError, ValueError) as e:
+        return jsonify({"error": f"Invalid sensitivity request: {e}"}), 400
+    except Exception as e:
+        print(f"Sensitivity analysis error: {e}")
+        return jsonify({"error": str(e)}), 500
+
 @app.route('/api/valuate/batch', methods=['POST'])
 def batch_valuate():
     """📊 Batch business valuation from CSV"""
@@ -1666,8 +1504,9 @@ def batch_valuate():
             return jsonify({"error": "CSV content required"}), 400
         
         # Run batch valuation
-        import asyncio
-        result = asyncio.run(valuation_engine.batch_valuate_csv(csv_content, default_category))
+        result = VALUATION_LOOP.run(valuation_engine.batch_valuate_csv(
+            csv_content, default_category, use_cache=data.get("use_cache", True)
+        ))
         
         return jsonify(result)
         
@@ -1675,6 +1514,94 @@ def batch_valuate():
         print(f"Batch valuation error: {e}")
         return jsonify({"error": str(e)}), 500
 
+def _event_stream_response(events, output_format: str = "ndjson", on_event=None):
+    """Stream an async generator of event dicts as NDJSON or server-sent events"""
+    def generate():
+        for event in VALUATION_LOOP.iterate(events):
+            if on_event is not None:
+                on_event(event)
+            body = json.dumps(event, default=json_default)
+            yield f"event: {event['type']}\ndata: {body}\n\n" if output_format == "sse" else body + "\n"
+    
+    mimetype = "text/event-stream" if output_format == "sse" else "application/x-ndjson"
+    return Response(stream_with_context(generate()), mimetype=mimetype,
+                    headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+@app.route('/api/valuate/batch/stream', methods=['POST'])
+def stream_batch_valuate():
+    """📊 Streamed batch valuation - NDJSON (default) or server-sent events, one event per result"""
+    if not VALUATION_ENGINE_AVAILABLE:
+        return jsonify({"error": "Valuation engine not available"}), 503
+    
+    # JSON body {"csv": ...} or the raw CSV with options in the query string
+    data = (request.get_json(silent=True) or {}) if request.is_json else {"csv": request.get_data(as_text=True)}
+    csv_content = data.get("csv")
+    default_category = data.get("default_category", request.args.get("default_category", "HVAC"))
+    use_cache = data.get("use_cache", request.args.get("use_cache", "true").lower() != "false")
+    output_format = data.get("format", request.args.get("format", "ndjson"))
+    
+    if not csv_content:
+        return jsonify({"error": "CSV content required"}), 400
+    if output_format not in ("ndjson", "sse"):
+        return jsonify({"error": "format must be ndjson or sse"}), 400
+    
+    def track(event):
+        if event["type"] != "result":
+            BATCH_JOBS.put(event["job_id"], {k: v for k, v in event.items() if k != "summary"})
+    
+    events = valuation_engine.stream_batch_valuation(csv_content, default_category, use_cache=use_cache)
+    return _event_stream_response(events, output_format, on_event=track)
+
+@app.route('/api/valuate/batch/jobs/<job_id>')
+def batch_valuation_job(job_id):
+    """Latest progress of a streamed batch valuation"""
+    if not VALUATION_ENGINE_AVAILABLE:
+        return jsonify({"error": "Valuation engine not available"}), 503
+    
+    job = BATCH_JOBS.get(job_id)
+    if job is None:
+        return jsonify({"error": "Unknown batch job"}), 404
+    return jsonify(job)
+
+@app.route('/api/portfolio/revalue', methods=['POST'])
+def revalue_portfolio():
+    """📒 Revalue the stored portfolio - only businesses whose signals, prior or engine version changed"""
+    if not VALUATION_ENGINE_AVAILABLE:
+        return jsonify({"error": "Valuation engine not available"}), 503
+    
+    try:
+        data = request.get_json(silent=True) or {}
+        csv_content = data.get("csv")
+        
+        # Optional CSV adds or updates portfolio businesses before the run
+        businesses = None
+        if csv_content:
+            businesses = valuation_engine.parse_batch_csv(csv_content, data.get("default_category", "HVAC"))
+        
+        result = VALUATION_LOOP.run(valuation_engine.revalue_portfolio(
+            businesses, business_ids=data.get("business_ids"), force=bool(data.get("force", False))
+        ))
+        
+        return jsonify(result)
+        
+    except Exception as e:
+        print(f"Portfolio revaluation error: {e}")
+        return jsonify({"error": str(e)}), 500
+
+@app.route('/api/portfolio/<business_id>/history')
+def valuation_history(business_id):
+    """Stored valuations of one business, newest first"""
+    if not VALUATION_ENGINE_AVAILABLE:
+        return jsonify({"error": "Valuation engine not available"}), 503
+    
+    limit = min(max(request.args.get('limit', 50, type=int), 1), 500)
+    include_results = request.args.get('include_results', 'false').lower() == 'true'
+    history = VALUATION_STORE.history(business_id, limit=limit, include_results=include_results)
+    if not history:
+        return jsonify({"error": "No valuations stored for this business"}), 404
+    
+    return jsonify({"business_id": business_id, "valuations": history, "count": len(history)})
+
 @app.route('/api/zip-opportunities', methods=['POST'])
 def zip_opportunities():
     """🏆 Generate ZIP code opportunity report"""
@@ -1689,8 +1616,7 @@ def zip_opportunities():
             return jsonify({"error": "ZIP codes required"}), 400
         
         # Generate opportunity report
-        import asyncio
-        result = asyncio.run(valuation_engine.generate_zip_opportunity_report(zip_codes))
+        result = VALUATION_LOOP.run(valuation_engine.generate_zip_opportunity_report(zip_codes))
         
         return jsonify(result)
         
@@ -1698,6 +1624,23 @@ def zip_opportunities():
         print(f"ZIP opportunities error: {e}")
         return jsonify({"error": str(e)}), 500
 
+@app.route('/api/zip-opportunities/stream', methods=['POST'])
+def stream_zip_opportunities():
+    """🏆 ZIP opportunity report streamed one ZIP section at a time (NDJSON or SSE)"""
+    if not VALUATION_ENGINE_AVAILABLE:
+        return jsonify({"error": "Valuation engine not available"}), 503
+    
+    data = request.get_json(silent=True) or {}
+    zip_codes = data.get("zip_codes", [])
+    output_format = data.get("format", request.args.get("format", "ndjson"))
+    
+    if not zip_codes:
+        return jsonify({"error": "ZIP codes required"}), 400
+    if output_format not in ("ndjson", "sse"):
+        return jsonify({"error": "format must be ndjson or sse"}), 400
+    
+    return _event_stream_response(valuation_engine.stream_zip_opportunity_report(zip_codes), output_format)
+
 @app.route('/api/priors')
 def get_valuation_priors():
     """📋 Get business category priors for valuation"""
@@ -2328,62 +2271,30 @@ def unified_heatmap():
         elif "boston" in location.lower():
             center_coords = {"lat": 42.3601, "lng": -71.0589}
         
-        # Generate heatmap data points
-        heatmap_data = []
-        for i in range(50):  # 50 data points
-            lat_offset = (random.random() - 0.5) * 0.5  # ±0.25 degrees
-            lng_offset = (random.random() - 0.5) * 0.5
-            
-            lat = center_coords["lat"] + lat_offset
-            lng = center_coords["lng"] + lng_offset
-            
-            # Generate realistic opportunity scores
-            density = random.uniform(0.2, 0.9)
-            tam_value = random.uniform(1e6, 10e6)
-            succession_risk = random.uniform(0.3, 0.8)
-            digital_gap = random.uniform(0.4, 0.9)
-            opportunity = (succession_risk * 0.4 + digital_gap * 0.3 + density * 0.3)
-            
-            heatmap_data.append([lat, lng, opportunity])
-        
-        # Create Plotly heatmap JSON
-        plotly_json = {
-            "data": [{
-                "type": "densitymapbox",
-                "lat": [point[0] for point in heatmap_data],
-                "lon": [point[1] for point in heatmap_data],
-                "z": [point[2] for point in heatmap_data],
-                "radius": 20,
-                "colorscale": "Viridis",
-                "showscale": True,
-                "colorbar": {"title": "Opportunity Score"}
-            }],
-            "layout": {
-                "mapbox": {
-                    "style": "open-street-map",
-                    "center": {"lat": center_coords["lat"], "lon": center_coords["lng"]},
-                    "zoom": 10
-                },
-                "height": 500,
-                "title": f"Business Opportunity Heatmap - {location}"
-            }
-        }
+        # Sample layers on an 11x11 grid spanning ±0.25 degrees
+        grid = sample_opportunity_grid(center_coords, size=11, step=0.05)
+        opportunity = grid.layers["opportunity"]
+        quantize = data.get("quantize", False)
         
         result = {
             "center_location": location,
             "center_coordinates": center_coords,
             "category": category,
             "radius_miles": radius,
-            "plotly_json": json.dumps(plotly_json),
-            "analysis_points": len(heatmap_data),
+            "grid": grid.to_payload(quantize == "uint8" or quantize is True),
+            "analysis_points": int(opportunity.size),
             "summary": {
-                "total_businesses": len(heatmap_data),
-                "high_opportunity_areas": len([p for p in heatmap_data if p[2] > 0.7]),
-                "avg_density": sum([p[2] for p in heatmap_data]) / len(heatmap_data)
+                "total_businesses": int(opportunity.size),
+                "high_opportunity_areas": int((opportunity > 0.7).sum()),
+                "avg_density": float(opportunity.mean())
             },
             "timestamp": datetime.now().isoformat()
         }
         
+        # The Plotly figure is several times the size of the grid - only build it for clients that ask
+        if data.get("include_plotly"):
+            result["plotly_json"] = grid.plotly_json("opportunity", title=f"Business Opportunity Heatmap - {location}")
+        
         return jsonify(result)
         
     except Exception as e:
@@ -2428,7 +2339,7 @@ def unified_health():
 
 if __name__ == '__main__':
     print(f"🚀 Starting Enhanced Okapiq API Server...")
-    print(f"📊 Loaded {len(FIRMS_DATABASE)} firms")
+    print(f"📊 Loaded {len(FIRM_SNAPSHOTS.current.records)} firms")
     print(f"🏦 SMB Valuation Engine: {'✅ ENABLED' if VALUATION_ENGINE_AVAILABLE else '❌ DISABLED'}")
     print(f"🌐 Dashboard: http://localhost:5000")
     print(f"💰 Valuation Dashboard: http://localhost:5000/valuation")
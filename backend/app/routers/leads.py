@@ -1,10 +1,11 @@
 from fastapi import APIRouter, HTTPException, Depends, Query, UploadFile, File
-from fastapi.responses import FileResponse, JSONResponse
+from fastapi.responses import FileResponse, JSONResponse, StreamingResponse
 from pydantic import BaseModel
 from typing import List, Optional, Dict, Any
 import pandas as pd
 import json
 import io
+import csv
 from datetime import datetime
 import sys
 import os
@@ -38,6 +39,7 @@ class LeadExportRequest(BaseModel):
     format: str = "csv"
     include_contact_info: bool = True
     include_scores: bool = True
+    stream: bool = False
 
 class LeadFilterRequest(BaseModel):
     min_revenue: Optional[float] = None
@@ -56,6 +58,45 @@ class OutreachRequest(BaseModel):
     approach_type: str = "acquisition"
     tone: str = "professional"
 
+def _lead_export_row(lead: Dict[str, Any], include_contact_info: bool) -> Dict[str, Any]:
+    """CRM-ready export row for a single lead"""
+    export_row = {
+        'Business Name': lead['name'],
+        'Industry': lead['industry'],
+        'Location': lead['location'],
+        'Estimated Revenue': f"${lead['estimated_revenue']:,.0f}",
+        'Employee Count': lead['employee_count'],
+        'Years in Business': lead['years_in_business'],
+        'Lead Score': f"{lead['lead_score']:.1f}/100",
+        'Succession Risk': f"{lead['succession_risk_score']:.1f}/100"
+    }
+    
+    if include_contact_info:
+        export_row.update({
+            'Phone': lead.get('phone', ''),
+            'Website': lead.get('website', ''),
+            'Address': lead.get('address', '')
+        })
+    
+    return export_row
+
+def _stream_leads_csv(leads_data: List[Dict[str, Any]], include_contact_info: bool, chunk_rows: int = 1000):
+    """Yield CSV text for the leads in chunks of ``chunk_rows`` rows"""
+    output = io.StringIO()
+    writer = None
+    for index, lead in enumerate(leads_data, 1):
+        export_row = _lead_export_row(lead, include_contact_info)
+        if writer is None:
+            writer = csv.DictWriter(output, fieldnames=list(export_row), lineterminator="\n")
+            writer.writeheader()
+        writer.writerow(export_row)
+        if index % chunk_rows == 0:
+            yield output.getvalue()
+            output.seek(0)
+            output.truncate()
+    if output.getvalue():
+        yield output.getvalue()
+
 @router.post("/export/crm")
 async def export_leads_to_crm(request: LeadExportRequest, db: Session = Depends(get_db)):
     """Export leads to CRM-ready format"""
@@ -65,27 +106,15 @@ async def export_leads_to_crm(request: LeadExportRequest, db: Session = Depends(
         if request.lead_ids:
             leads_data = [lead for lead in leads_data if lead.get('id') in request.lead_ids]
         
-        export_data = []
-        for lead in leads_data:
-            export_row = {
-                'Business Name': lead['name'],
-                'Industry': lead['industry'],
-                'Location': lead['location'],
-                'Estimated Revenue': f"${lead['estimated_revenue']:,.0f}",
-                'Employee Count': lead['employee_count'],
-                'Years in Business': lead['years_in_business'],
-                'Lead Score': f"{lead['lead_score']:.1f}/100",
-                'Succession Risk': f"{lead['succession_risk_score']:.1f}/100"
-            }
-            
-            if request.include_contact_info:
-                export_row.update({
-                    'Phone': lead.get('phone', ''),
-                    'Website': lead.get('website', ''),
-                    'Address': lead.get('address', '')
-                })
-            
-            export_data.append(export_row)
+        if request.format.lower() == "csv" and request.stream:
+            # Chunked response - rows are written as the client reads them
+            return StreamingResponse(
+                _stream_leads_csv(leads_data, request.include_contact_info),
+                media_type="text/csv",
+                headers={"Content-Disposition": f"attachment; filename=okapiq_leads_{datetime.now().strftime('%Y%m%d')}.csv"}
+            )
+        
+        export_data = [_lead_export_row(lead, request.include_contact_info) for lead in leads_data]
         
         df = pd.DataFrame(export_data)
         
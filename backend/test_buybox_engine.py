@@ -0,0 +1,203 @@
+#!/usr/bin/env python3
+"""
+Tests for the vectorized buybox engine
+Results must match the per-firm loop /api/analyze-buybox used before the
+engine, firm for firm and metro for metro.
+"""
+
+import copy
+import json
+import os
+import random
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(ROOT)
+
+from buybox_engine import BuyboxEngine
+from firm_store import FirmStore
+
+
+@pytest.fixture(scope="module")
+def firms():
+    with open(os.path.join(ROOT, "avilla_firms_database.json")) as f:
+        return json.load(f)
+
+
+def baseline_match_score(firm, buybox):
+    """Per-firm match score, as the loop computed it"""
+    score = 0
+
+    min_rev = buybox.get('min_revenue', 0)
+    max_rev = buybox.get('max_revenue', 100000000)
+    if min_rev <= firm['revenue_estimate'] <= max_rev:
+        score += 25
+    elif firm['revenue_estimate'] >= min_rev * 0.8:
+        score += 15
+
+    min_ebitda = buybox.get('min_ebitda', 0)
+    if firm['estimated_ebitda'] >= min_ebitda:
+        score += 20
+    elif firm['estimated_ebitda'] >= min_ebitda * 0.7:
+        score += 10
+
+    max_multiple = buybox.get('max_multiple', 10)
+    if firm['estimated_multiple'] <= max_multiple:
+        score += 15
+    elif firm['estimated_multiple'] <= max_multiple * 1.2:
+        score += 8
+
+    succession = buybox.get('succession_priority', 'any')
+    if succession == 'high' and firm['succession_risk_score'] >= 70:
+        score += 20
+    elif succession == 'medium' and 40 <= firm['succession_risk_score'] < 70:
+        score += 20
+    elif succession == 'growth' and firm['succession_risk_score'] < 40:
+        score += 20
+    elif succession == 'any':
+        score += 15
+
+    digital = buybox.get('digital_maturity', 'any')
+    if digital == 'modern' and firm['website'] and firm['yelp_review_count'] > 20:
+        score += 10
+    elif digital == 'basic' and firm['website']:
+        score += 10
+    elif digital == 'limited' and not firm['website']:
+        score += 10
+    elif digital == 'any':
+        score += 8
+
+    geography = buybox.get('geography', 'all')
+    if (geography == 'all' or
+            (geography in ['northeast', 'ma'] and firm['state'] == 'MA') or
+            (geography in ['southeast', 'fl'] and firm['state'] == 'FL')):
+        score += 10
+
+    return min(score, 100)
+
+
+def baseline_analyze(firms, buybox):
+    """Filter, score, rank and roll up a buybox one firm at a time"""
+    filtered = [f for f in copy.deepcopy(firms)
+                if buybox.get('min_revenue', 0) <= f['revenue_estimate'] <= buybox.get('max_revenue', 100000000)]
+    filtered = [f for f in filtered if f['estimated_ebitda'] >= buybox.get('min_ebitda', 0)]
+    filtered = [f for f in filtered if f['estimated_multiple'] <= buybox.get('max_multiple', 10)]
+
+    geography = buybox.get('geography', 'all')
+    if geography in ('ma', 'northeast'):
+        filtered = [f for f in filtered if f['state'] == 'MA']
+    elif geography in ('fl', 'southeast'):
+        filtered = [f for f in filtered if f['state'] == 'FL']
+
+    succession = buybox.get('succession_priority', 'any')
+    if succession == 'high':
+        filtered = [f for f in filtered if f['succession_risk_score'] >= 70]
+    elif succession == 'medium':
+        filtered = [f for f in filtered if 40 <= f['succession_risk_score'] < 70]
+    elif succession == 'growth':
+        filtered = [f for f in filtered if f['succession_risk_score'] < 40]
+
+    digital = buybox.get('digital_maturity', 'any')
+    if digital == 'modern':
+        filtered = [f for f in filtered if f['website'] and f['yelp_review_count'] > 20]
+    elif digital == 'basic':
+        filtered = [f for f in filtered if f['website']]
+    elif digital == 'limited':
+        filtered = [f for f in filtered if not f['website']]
+
+    for firm in filtered:
+        firm['match_score'] = baseline_match_score(firm, buybox)
+    filtered = [f for f in filtered if f['match_score'] >= 50]
+    filtered.sort(key=lambda f: f['match_score'], reverse=True)
+
+    metros = {}
+    for firm in filtered:
+        metros.setdefault(firm['metro'], []).append(firm)
+    fragmentation = {}
+    for metro, metro_firms in metros.items():
+        if len(metro_firms) >= 3:
+            total_revenue = sum(f['revenue_estimate'] for f in metro_firms)
+            shares = [f['revenue_estimate'] / total_revenue * 100 for f in metro_firms]
+            hhi = sum((share / 100) ** 2 for share in shares)
+            fragmentation[metro] = {
+                'firm_count': len(metro_firms),
+                'hhi_index': hhi,
+                'top5_share': sum(sorted(shares, reverse=True)[:5]),
+                'fragmentation_score': round((1 - hhi) * 100),
+                'opportunity': 'High' if hhi < 0.15 else 'Medium' if hhi < 0.25 else 'Low'
+            }
+
+    return {
+        'matching_firms': filtered[:100],
+        'total_matches': len(filtered),
+        'total_tam': sum(f['estimated_ebitda'] * f['estimated_multiple'] for f in filtered),
+        'fragmentation_analysis': fragmentation,
+    }
+
+
+def random_buybox(rng):
+    options = {
+        'min_revenue': [0, 500000, 2000000, None],
+        'max_revenue': [100000000, 5000000, None],
+        'min_ebitda': [0, 300000, None],
+        'max_multiple': [10, 3.5, 3.0, None],
+        'geography': ['all', 'ma', 'northeast', 'fl', 'southeast', 'west', None],
+        'succession_priority': ['any', 'high', 'medium', 'growth', 'unknown', None],
+        'digital_maturity': ['any', 'modern', 'basic', 'limited', 'unknown', None],
+    }
+    buybox = {key: rng.choice(values) for key, values in options.items()}
+    return {key: value for key, value in buybox.items() if value is not None}
+
+
+def with_empty_websites(firms):
+    """Every fifth firm with a website gets an empty one instead"""
+    firms = copy.deepcopy(firms)
+    for i, firm in enumerate(f for f in firms if f['website']):
+        if i % 5 == 0:
+            firm['website'] = ''
+    return firms
+
+
+@pytest.mark.parametrize("empty_websites", [False, True])
+def test_engine_matches_baseline_over_random_buyboxes(firms, empty_websites):
+    if empty_websites:
+        firms = with_empty_websites(firms)
+    engine = BuyboxEngine(FirmStore(firms))
+    rng = random.Random(3)
+    matched = 0
+    for _ in range(300):
+        buybox = random_buybox(rng)
+        expected = baseline_analyze(firms, buybox)
+        result = engine.analyze(buybox)
+
+        assert result['matching_firms'] == expected['matching_firms'], buybox
+        assert result['total_matches'] == expected['total_matches'], buybox
+        assert result['tam_analysis']['total_tam'] == pytest.approx(expected['total_tam']), buybox
+        assert list(result['fragmentation_analysis']) == list(expected['fragmentation_analysis']), buybox
+        for metro, metrics in expected['fragmentation_analysis'].items():
+            assert result['fragmentation_analysis'][metro] == pytest.approx(metrics), (buybox, metro)
+        matched += result['total_matches']
+    # The random buyboxes must actually exercise matching
+    assert matched > 0
+
+
+def test_engine_leaves_store_rows_unscored(firms):
+    store = FirmStore(firms)
+    BuyboxEngine(store).analyze({'min_revenue': 0})
+    assert all('match_score' not in firm for firm in store.rows(list(range(store.size))))
+
+
+def test_empty_website_counts_as_no_website(firms):
+    firms = with_empty_websites(firms)
+    empty = [f['firm_id'] for f in firms if f['website'] == '']
+    engine = BuyboxEngine(FirmStore(firms))
+
+    def ids(digital):
+        matches = engine.analyze({'digital_maturity': digital}, top_k=len(firms))['matching_firms']
+        return {f['firm_id'] for f in matches}
+
+    assert empty
+    assert set(empty) & ids('limited')
+    assert not set(empty) & (ids('basic') | ids('modern'))
@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+"""
+Tests for the columnar firm snapshot
+The .bin snapshot must give back exactly the firms it was written from, and
+derived fields must not depend on whether firms were loaded from the .bin
+snapshot or from the JSON database.
+"""
+
+import copy
+import json
+import os
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(ROOT)
+
+from firm_columnar import DERIVED_FIELDS, ColumnarSnapshot, add_derived_fields, write_columnar_snapshot
+
+
+def sample_firms():
+    """Firms in both field conventions, with missing and null source values"""
+    return [
+        {"firm_id": "f1", "name": "Alpha CPA", "location": "Boston, MA", "deal_score": 88,
+         "revenue_estimate": 6200000, "employee_count": 31, "years_established": 27, "debt_to_equity": 0.2},
+        {"firm_id": "f2", "name": "Beta Tax", "location": "Miami, FL", "deal_score": 77,
+         "revenue_estimate": 2500000, "employee_count": 12, "years_established": 8, "debt_to_equity": 0.9},
+        {"firm_id": "f3", "name": "Gamma Books", "location": "Tampa, FL", "deal_score": 66,
+         "revenue": 900000, "employees": 4, "years_in_business": 3, "debt_to_equity": 1.1},
+        {"firm_id": "f4", "name": "Delta Advisors", "location": "Orlando, FL", "deal_score": 40,
+         "revenue_estimate": None, "employee_count": 0, "years_established": None, "debt_to_equity": 0.5},
+    ]
+
+
+@pytest.mark.parametrize("database", ["sample", "avilla"])
+def test_columnar_round_trip_is_exact(tmp_path, database):
+    """Every field of every firm comes back with the same value and type"""
+    if database == "avilla":
+        with open(os.path.join(ROOT, "avilla_firms_database.json")) as f:
+            firms = json.load(f)
+    else:
+        firms = sample_firms()
+    bin_path = tmp_path / "firms.bin"
+    write_columnar_snapshot(copy.deepcopy(firms), str(bin_path))
+
+    snapshot = ColumnarSnapshot(str(bin_path))
+    fields = list(dict.fromkeys(key for firm in firms for key in firm))
+    expected = [{name: firm.get(name) for name in fields} for firm in firms]
+    records = snapshot.records()
+    assert len(snapshot) == len(firms)
+    assert records == expected
+    # == treats 1 and 1.0 alike, so compare the serialized form too
+    assert json.dumps(records) == json.dumps(expected)
+
+
+def test_derived_fields_match_between_columnar_and_json(tmp_path):
+    """The .bin snapshot stores the same derived fields the JSON load computes"""
+    firms = sample_firms()
+    json_path = tmp_path / "firms.json"
+    bin_path = tmp_path / "firms.bin"
+    json_path.write_text(json.dumps(firms))
+    write_columnar_snapshot(copy.deepcopy(firms), str(bin_path))
+
+    from_json = add_derived_fields(json.loads(json_path.read_text()))
+    from_columnar = ColumnarSnapshot(str(bin_path)).records(include_derived=True)
+
+    assert len(from_json) == len(from_columnar)
+    for json_firm, columnar_firm in zip(from_json, from_columnar):
+        assert json_firm["market_position"] == columnar_firm["market_position"]
+        assert json_firm["revenue_per_employee"] == pytest.approx(columnar_firm["revenue_per_employee"])
+        assert json_firm["risk_score"] == pytest.approx(columnar_firm["risk_score"])
+        assert set(DERIVED_FIELDS) <= set(columnar_firm)
+
+
+def test_enhanced_server_loads_same_derived_fields(tmp_path, monkeypatch):
+    """enhanced_api_server.read_database gives the same derived fields from either file"""
+    server = pytest.importorskip("enhanced_api_server")
+    # The server's own field names, as its sample data uses them
+    firms = [
+        {"firm_id": firm["firm_id"], "name": firm["name"], "location": firm["location"], "deal_score": firm["deal_score"],
+         "revenue": firm.get("revenue_estimate") or firm.get("revenue") or 0,
+         "employees": firm.get("employee_count") or firm.get("employees") or 1,
+         "years_in_business": firm.get("years_established") or firm.get("years_in_business") or 5,
+         "debt_to_equity": firm["debt_to_equity"]}
+        for firm in sample_firms()
+    ]
+    json_path = tmp_path / "firms.json"
+    bin_path = tmp_path / "firms.bin"
+    stats_path = tmp_path / "stats.json"
+    json_path.write_text(json.dumps(firms))
+    stats_path.write_text("{}")
+    monkeypatch.setattr(server, "DATABASE_PATH", str(json_path))
+    monkeypatch.setattr(server, "SUMMARY_STATS_PATH", str(stats_path))
+
+    monkeypatch.setattr(server, "COLUMNAR_PATH", str(tmp_path / "missing.bin"))
+    from_json, _ = server.read_database()
+
+    write_columnar_snapshot(copy.deepcopy(firms), str(bin_path))
+    os.utime(bin_path, ns=(os.stat(json_path).st_mtime_ns + 1, os.stat(json_path).st_mtime_ns + 1))
+    monkeypatch.setattr(server, "COLUMNAR_PATH", str(bin_path))
+    from_columnar, _ = server.read_database()
+
+    assert [f["firm_id"] for f in from_json] == [f["firm_id"] for f in from_columnar]
+    for json_firm, columnar_firm in zip(from_json, from_columnar):
+        assert json_firm["market_position"] == columnar_firm["market_position"]
+        assert json_firm["revenue_per_employee"] == pytest.approx(columnar_firm["revenue_per_employee"])
+        assert json_firm["risk_score"] == pytest.approx(columnar_firm["risk_score"])
@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+"""
+Tests for the columnar firm store behind /api/firms
+Indexed selection must return the same firms, in the same order, as the
+list filters the endpoint applied before the store.
+"""
+
+import json
+import os
+import random
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(ROOT)
+
+from firm_store import FirmStore
+
+
+@pytest.fixture(scope="module")
+def firms():
+    with open(os.path.join(ROOT, "avilla_firms_database.json")) as f:
+        return json.load(f)
+
+
+def baseline_filter(firms, state, min_score, max_score, min_revenue, max_revenue, subindustry, succession_risk,
+                    website_status, search):
+    """/api/firms filters as list comprehensions over the firm dicts"""
+    filtered = firms
+    if state != 'all':
+        filtered = [f for f in filtered if f['state'] == state]
+    if min_score > 0 or max_score < 100:
+        filtered = [f for f in filtered if min_score <= f['deal_score'] <= max_score]
+    if min_revenue > 0 or max_revenue < 50000000:
+        filtered = [f for f in filtered if min_revenue <= f['revenue_estimate'] <= max_revenue]
+    if subindustry != 'all':
+        filtered = [f for f in filtered if f['subindustry'] == subindustry]
+    if succession_risk == 'low':
+        filtered = [f for f in filtered if f['succession_risk_score'] < 40]
+    elif succession_risk == 'medium':
+        filtered = [f for f in filtered if 40 <= f['succession_risk_score'] < 70]
+    elif succession_risk == 'high':
+        filtered = [f for f in filtered if f['succession_risk_score'] >= 70]
+    if website_status == 'has_website':
+        filtered = [f for f in filtered if f['website'] is not None]
+    elif website_status == 'no_website':
+        filtered = [f for f in filtered if f['website'] is None]
+    if search:
+        search = search.lower()
+        filtered = [f for f in filtered if search in f['name'].lower() or search in f['city'].lower()
+                    or search in f['owner_name'].lower() or search in f['subindustry'].lower()]
+    return filtered
+
+
+def test_select_matches_baseline_filters(firms):
+    store = FirmStore(firms)
+    rng = random.Random(1)
+    for _ in range(500):
+        state = rng.choice(['all', 'MA', 'FL', 'TX'])
+        min_score, max_score = rng.choice([0, 50, 70]), rng.choice([100, 90, 80])
+        min_revenue, max_revenue = rng.choice([0, 1000000]), rng.choice([50000000, 3000000])
+        subindustry = rng.choice(['all', 'CPA Firms', 'Tax Preparation'])
+        succession_risk = rng.choice(['all', 'low', 'medium', 'high'])
+        website_status = rng.choice(['all', 'has_website', 'no_website'])
+        search = rng.choice(['', 'bos', 'smith', 'cpa', 'zz'])
+        score_filter = min_score > 0 or max_score < 100
+        revenue_filter = min_revenue > 0 or max_revenue < 50000000
+
+        ids = store.select(
+            state=None if state == 'all' else state,
+            min_score=min_score if score_filter else None,
+            max_score=max_score if score_filter else None,
+            min_revenue=min_revenue if revenue_filter else None,
+            max_revenue=max_revenue if revenue_filter else None,
+            subindustry=None if subindustry == 'all' else subindustry,
+            succession_risk=None if succession_risk == 'all' else succession_risk,
+            website_status=None if website_status == 'all' else website_status,
+            search=search or None
+        )
+        expected = baseline_filter(firms, state, min_score, max_score, min_revenue, max_revenue, subindustry,
+                                   succession_risk, website_status, search)
+        assert store.rows(ids) == expected
+
+
+def test_empty_store():
+    store = FirmStore([])
+    assert store.rows(store.select(state='MA')) == []
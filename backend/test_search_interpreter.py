@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+"""
+Tests for the /api/ai-search rule parser and interpretation cache
+"""
+
+import json
+import os
+import sys
+import threading
+
+import pytest
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from search_interpreter import QueryInterpreter, RuleBasedParser
+
+
+@pytest.fixture
+def parser():
+    return RuleBasedParser({"boston": "MA", "miami": "FL"}, ["Tax Preparation", "CPA Firms"])
+
+
+def filters(params):
+    return {key: value for key, value in params.items() if key != "additional_context"}
+
+
+@pytest.mark.parametrize("query, expected", [
+    ("tax firms under 1.5 million", {"max_revenue": 1500000, "subindustry": "Tax Preparation"}),
+    ("firms over 1.5 mil", {"min_revenue": 1500000}),
+    ("firms over 2 mm", {"min_revenue": 2000000}),
+    ("firms under 3bn", {"max_revenue": 3000000000}),
+    ("firms under 2 billion", {"max_revenue": 2000000000}),
+    ("CPA firms in Boston over $2M",
+     {"min_revenue": 2000000, "subindustry": "CPA Firms", "state": "MA", "city_keywords": ["Boston"]}),
+    ("firms between 1 and 2 million in miami",
+     {"min_revenue": 1000000, "max_revenue": 2000000, "state": "FL", "city_keywords": ["Miami"]}),
+    ("firms between $500000 and $2m", {"min_revenue": 500000, "max_revenue": 2000000}),
+    ("$750k+ firms in boston", {"min_revenue": 750000, "state": "MA", "city_keywords": ["Boston"]}),
+    ("firms over 500k with score over 80", {"min_deal_score": 80, "min_revenue": 500000}),
+])
+def test_revenue_phrasings(parser, query, expected):
+    params = parser.parse(query)
+    assert params is not None
+    assert filters(params) == expected
+
+
+@pytest.mark.parametrize("query", ["firms over 2", "firms over 2 millionaires", "firms in boston with great vibes"])
+def test_unparsed_queries_go_to_llm(parser, query):
+    assert parser.parse(query) is None
+
+
+def test_concurrent_remember_keeps_cache_file_valid(tmp_path):
+    cache_path = str(tmp_path / "queries.json")
+    interpreter = QueryInterpreter(lambda query: {"query": query}, cache_path=cache_path)
+
+    def worker(n):
+        for i in range(25):
+            interpreter.interpret(f"query {n} {i}")
+
+    threads = [threading.Thread(target=worker, args=(n,)) for n in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    with open(cache_path) as f:
+        saved = json.load(f)
+    assert len(saved) == 200
+    assert os.listdir(tmp_path) == ["queries.json"]
+    assert QueryInterpreter(lambda query: None, cache_path=cache_path).interpret("query 3 7") == ({"query": "query 3 7"}, "cache")
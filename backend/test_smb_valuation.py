@@ -0,0 +1,281 @@
+#!/usr/bin/env python3
+"""
+Tests for the SMB valuation engine, its result cache and valuation store
+"""
+
+import os
+import sys
+
+import numpy as np
+import pytest
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from valuation_cache import ValuationResultCache
+
+
+@pytest.mark.parametrize("directory", [False, True])
+def test_cache_hits_are_copies_marked_cached(tmp_path, directory):
+    cache = ValuationResultCache(directory=str(tmp_path) if directory else None)
+    cache.put("fp", {"valuation": {"p50": np.float64(1.5e6), "samples": np.arange(3)}, "timestamp": "then"})
+
+    first = cache.get("fp")
+    first["fingerprint"] = "changed"
+    first["valuation"]["p50"] = 0
+
+    second = cache.get("fp")
+    assert second["valuation"] == {"p50": 1.5e6, "samples": [0, 1, 2]}
+    assert "fingerprint" not in second
+    assert second["cached"] is True
+    assert second["timestamp"] == "then"
+    assert second["cached_at"]
+
+    if directory:
+        assert ValuationResultCache(directory=str(tmp_path)).get("fp")["valuation"]["p50"] == 1.5e6
+
+
+def make_signals(i: int = 0, reviews: int = 100):
+    from smb_valuation_engine import BusinessSignals
+    return BusinessSignals(business_id=f"b{i}", name=f"Biz {i}", category=["HVAC", "Dental", "Salon"][i % 3],
+                           geo="Dallas, TX", R_total=reviews, R_12=20, stars=4.1)
+
+
+def make_engine(store=None, census=True):
+    """Engine with no network sources, optionally with a fake Census source"""
+    from smb_valuation_engine import SMBValuationEngine
+    engine = SMBValuationEngine({}, result_cache=ValuationResultCache(), store=store)
+    if census:
+        engine.api_keys = {"CENSUS_API_KEY": "test"}
+
+        async def fake_census(geo):
+            return {"median_income": 91000, "population": 42000}
+
+        engine._get_census_data = fake_census
+    return engine
+
+
+def test_enrichment_leaves_caller_signals_untouched():
+    import asyncio
+    from dataclasses import asdict
+    engine = make_engine()
+    signals = make_signals()
+    before = asdict(signals)
+
+    first = asyncio.run(engine.valuate_business(signals, use_cache=False))
+    second = asyncio.run(engine.valuate_business(signals, use_cache=False))
+
+    assert asdict(signals) == before
+    assert first["signal_sources"]["signals"]["median_income"] == "census"
+    assert second["signal_sources"]["signals"]["median_income"] == "census"
+    assert second["signal_sources"]["signals"]["population"] == "census"
+    assert first["valuation"] == second["valuation"]
+
+
+def test_zip_listing_cache_is_not_enriched_in_place():
+    import asyncio
+    from smb_valuation_engine import ZIP_CACHE
+    engine = make_engine()
+
+    async def two_reports():
+        first = await engine._analyze_zip("99901", asyncio.Semaphore(4))
+        misses = engine.result_cache.misses
+        second = await engine._analyze_zip("99901", asyncio.Semaphore(4))
+        return first, second, misses
+
+    first, second, misses = asyncio.run(two_reports())
+    listings = ZIP_CACHE.get(("businesses", "99901"))
+    assert all(row["median_income"] != 91000 for row in listings)
+    # The second report fingerprints the same inputs, so every valuation is a cache hit
+    assert engine.result_cache.misses == misses
+    assert engine.result_cache.hits == first["total_businesses"]
+    assert second["total_market_value"] == first["total_market_value"]
+
+
+def test_sensitivity_default_grid_has_no_dead_parameters():
+    from smb_valuation_engine import BusinessSignals
+    engine = make_engine(census=False)
+    signals = BusinessSignals(business_id="s", name="S", category="HVAC", geo="Dallas, TX", R_total=120, R_12=30,
+                              stars=4.3, ads_data=[{"vol": 5000, "cpc": 10.0, "competition": 0.5}])
+    result = engine.sensitivity_analysis(signals, n_samples=512)
+    assert all(bar["swing"] > 0 for bar in result["tornado"])
+    assert {bar["parameter"] for bar in result["tornado"]}.isdisjoint({"R_total", "ads_cpc"})
+
+
+@pytest.mark.parametrize("n_samples", [1, 0.5, 10 ** 7])
+def test_sensitivity_rejects_out_of_range_samples(n_samples):
+    from smb_valuation_engine import create_valuation_api
+    client = create_valuation_api({}).test_client()
+    response = client.post("/api/valuate/sensitivity", json={"business": {"R_12": 30}, "n_samples": n_samples})
+    assert response.status_code == 400
+
+
+def test_sensitivity_route_uses_every_business_field():
+    from smb_valuation_engine import create_valuation_api
+    client = create_valuation_api({}).test_client()
+    body = {"business": {"R_total": 80, "R_12": 20, "stars": 4.0, "median_income": 120000},
+            "perturbations": {"median_income": [0.1]}, "n_samples": 256}
+    result = client.post("/api/valuate/sensitivity", json=body).get_json()
+    assert result["perturbations"][0]["base_value"] == 120000
+
+
+def test_revalue_portfolio_skips_unchanged_businesses_with_enrichment():
+    import asyncio
+    from valuation_store import ValuationStore
+    store = ValuationStore(":memory:")
+    engine = make_engine(store=store)
+
+    async def nightly_runs():
+        first = await engine.revalue_portfolio([make_signals(i) for i in range(5)], in_pool=False)
+        second = await engine.revalue_portfolio(in_pool=False)
+        third = await engine.revalue_portfolio(in_pool=False)
+        return first, second, third
+
+    first, second, third = asyncio.run(nightly_runs())
+    assert first["revalued"] == 5
+    assert second["unchanged"] == second["total"] == 5
+    assert third["unchanged"] == third["total"] == 5
+    # Stored signals are the caller's input, not the Census values
+    assert all(row["median_income"] == 50000 for row in store.business_signals())
+
+
+def test_simulation_runs_off_the_event_loop_thread():
+    import asyncio
+    import threading
+    engine = make_engine(census=False)
+    threads = []
+
+    def recording(method):
+        def wrapper(*args, **kwargs):
+            threads.append(threading.current_thread())
+            return method(*args, **kwargs)
+        return wrapper
+
+    engine._monte_carlo_valuation = recording(engine._monte_carlo_valuation)
+    engine._batch_monte_carlo_valuation = recording(engine._batch_monte_carlo_valuation)
+
+    async def valuations():
+        await engine.valuate_business(make_signals(0), use_cache=False)
+        await engine._valuate_batch([make_signals(i) for i in range(1, 4)], use_cache=False, persist=False)
+        return threading.current_thread()
+
+    loop_thread = asyncio.run(valuations())
+    assert len(threads) == 2
+    assert loop_thread not in threads
+
+
+def varied_signals():
+    """Businesses across categories, with and without ad data"""
+    from smb_valuation_engine import BusinessSignals
+    return [
+        BusinessSignals(business_id=f"v{i}", name=f"Varied {i}", category=["HVAC", "Dental", "Salon"][i % 3],
+                        geo="Austin, TX", R_total=40 + 37 * i, R_12=5 + 3 * i, stars=3.2 + 0.2 * i,
+                        ads_data=[{"vol": 1000.0 * (i + 1), "cpc": 4.0 + i, "competition": 0.4}] if i % 2 else [])
+        for i in range(8)
+    ]
+
+
+def test_seeded_valuations_match_across_single_matrix_and_pool():
+    import asyncio
+    engine = make_engine(census=False)
+
+    async def three_ways():
+        single = [await engine.valuate_business(signals, use_cache=False) for signals in varied_signals()]
+        matrix, _ = await engine._valuate_batch(varied_signals(), use_cache=False, persist=False)
+        pooled, _ = await engine._valuate_batch(varied_signals(), use_cache=False, in_pool=True, persist=False)
+        used_pool = engine._process_pool is not None
+        await engine.close()
+        return single, matrix, pooled, used_pool
+
+    single, matrix, pooled, used_pool = asyncio.run(three_ways())
+    assert used_pool
+    for one, row, pooled_row in zip(single, matrix, pooled):
+        assert row["fingerprint"] == pooled_row["fingerprint"] == one["fingerprint"]
+        assert row["valuation"] == one["valuation"]
+        assert pooled_row["valuation"] == one["valuation"]
+
+
+def test_fingerprints_are_stable_across_engines_and_number_types():
+    from dataclasses import replace
+    first = make_engine().valuation_fingerprint(make_signals())
+    assert make_engine().valuation_fingerprint(make_signals()) == first
+    assert make_engine().valuation_fingerprint(replace(make_signals(), R_total=100.0, median_income=50000.0)) == first
+    # Configured enrichment sources change the enriched inputs, so they are part of the fingerprint
+    assert make_engine(census=False).valuation_fingerprint(make_signals()) != first
+    assert make_engine().valuation_fingerprint(make_signals(reviews=101)) != first
+
+
+def test_streamed_batch_matches_in_process_batch():
+    import asyncio
+    lines = ["business_id,name,category,geo,R_total,R_12,stars"]
+    for i in range(60):
+        lines.append(f"c{i},CSV {i},{['HVAC', 'Dental', 'Salon'][i % 3]},Austin TX,{20 + 7 * i},{i % 40},{3 + (i % 20) / 10}")
+    csv_content = "\n".join(lines)
+
+    async def both():
+        in_process = await make_engine(census=False).batch_valuate_csv(csv_content, use_cache=False)
+        streamer = make_engine(census=False)
+        events = [event async for event in streamer.stream_batch_valuation(csv_content, use_cache=False)]
+        await streamer.close()
+        return in_process, events
+
+    in_process, events = asyncio.run(both())
+    streamed = sorted((event for event in events if event["type"] == "result"), key=lambda event: event["index"])
+    assert len(streamed) == len(in_process["results"]) == 60
+    for event, result in zip(streamed, in_process["results"]):
+        assert event["result"]["valuation"] == result["valuation"]
+    assert events[-1]["type"] == "summary"
+    assert events[-1]["summary"] == in_process["summary"]
+
+
+def test_revalue_after_restart_recomputes_nothing(tmp_path):
+    import asyncio
+    from valuation_store import ValuationStore
+    path = str(tmp_path / "valuations.db")
+
+    async def revalue(businesses=None):
+        return await make_engine(store=ValuationStore(path)).revalue_portfolio(businesses, in_pool=False)
+
+    first = asyncio.run(revalue([make_signals(i) for i in range(4)]))
+    restarted = asyncio.run(revalue())
+    assert first["revalued"] == 4
+    assert restarted["unchanged"] == restarted["total"] == 4
+
+
+def test_valuate_route_uses_every_business_field():
+    pytest.importorskip("asgiref")  # the route is an async view
+    from smb_valuation_engine import create_valuation_api
+    client = create_valuation_api({}).test_client()
+    body = {"R_total": 80, "R_12": 20, "stars": 4.0, "use_cache": False}
+    base = client.post("/api/valuate", json=body).get_json()
+    richer = client.post("/api/valuate", json={**body, "median_income": 120000}).get_json()
+    assert richer["fingerprint"] != base["fingerprint"]
+    assert richer["valuation"] != base["valuation"]
+
+
+def test_failed_zip_cancels_its_other_valuations():
+    import asyncio
+    engine = make_engine(census=False)
+    cancelled = []
+
+    async def valuate_business(business, use_cache=True):
+        if business.category == "HVAC":
+            raise RuntimeError("valuation failed")
+        try:
+            await asyncio.sleep(60)
+        except asyncio.CancelledError:
+            cancelled.append(business.business_id)
+            raise
+
+    engine.valuate_business = valuate_business
+
+    async def failing_zip():
+        limit = asyncio.Semaphore(8)
+        with pytest.raises(RuntimeError):
+            await asyncio.wait_for(engine._analyze_zip("99902", limit), timeout=5)
+        await asyncio.sleep(0)
+        # Checked before asyncio.run's shutdown cancels whatever is still running
+        return list(cancelled), limit._value
+
+    cancelled_at_failure, free_slots = asyncio.run(failing_zip())
+    assert len(cancelled_at_failure) == 4
+    assert free_slots == 8
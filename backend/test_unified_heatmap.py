@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+"""
+Tests for the unified system's heatmap cells, their tile cache and the batch routes
+"""
+
+import asyncio
+import os
+import sys
+
+import pytest
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+unified = pytest.importorskip("unified_okapiq_system")
+
+
+def analyze_point(engine, point):
+    async def analyze():
+        key = (point["lat"], point["lng"], 5, "HVAC")
+        cell = await unified.HEATMAP_TILE_CACHE.get_or_fetch(key, lambda: engine._analyze_grid_point(point, "HVAC"))
+        if engine.session:
+            await engine.session.close()
+        return cell, unified.HEATMAP_TILE_CACHE.get(key)
+    return asyncio.run(analyze())
+
+
+def test_cells_without_any_source_are_not_cached():
+    engine = unified.UnifiedOkapiqEngine({"YELP_API_KEY": "test"})
+
+    async def yelp_down(business_name, location):
+        return {}
+
+    engine._fetch_yelp_data = yelp_down
+    cell, cached = analyze_point(engine, {"lat": 10.0, "lng": 20.0})
+    assert cell is None
+    assert cached is None
+
+
+def test_sources_are_matched_by_name():
+    engine = unified.UnifiedOkapiqEngine({"CENSUS_API_KEY": "test"})
+
+    async def census(location):
+        return {"population": 42000, "median_income": 91000, "median_age": 38}
+
+    engine._fetch_census_data = census
+    cell, cached = analyze_point(engine, {"lat": 11.0, "lng": 21.0})
+    assert cell is not None
+    assert cached == cell
+
+    async def fetch():
+        data = await engine._fetch_business_data("HVAC", "11.0,21.0")
+        await engine.session.close()
+        return data
+
+    data = asyncio.run(fetch())
+    assert data["sources"] == ["census_data"]
+    assert data["demographics"]["median_income"] == 91000
+
+
+@pytest.mark.parametrize("route", ["/api/unified/batch-analyze", "/api/unified/batch-analyze/stream"])
+@pytest.mark.parametrize("options", [
+    '"concurrency": "many"', '"timeout_seconds": NaN', '"timeout_seconds": "nan"',
+    '"concurrency": Infinity', '"timeout_seconds": -Infinity',
+])
+def test_batch_routes_reject_bad_options(route, options):
+    client = unified.app.test_client()
+    body = '{"businesses": [{"name": "A", "location": "Dallas, TX"}], %s}' % options
+    response = client.post(route, data=body, content_type="application/json")
+    assert response.status_code == 400
@@ -0,0 +1,80 @@
+"""
+Long-lived asyncio event loop for sync (WSGI) request handlers
+Flask views submit coroutines to one loop running in a daemon thread, so
+async clients created on it (aiohttp sessions, single-flight caches) live
+for the whole process instead of dying with a per-request asyncio.run loop.
+"""
+
+import asyncio
+import logging
+import os
+import threading
+from typing import Any, AsyncIterator, Awaitable, Callable, Iterator, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class BackgroundEventLoop:
+    """An event loop in a daemon thread, started on first use (and again in a forked child)"""
+
+    def __init__(self, name: str = "background-loop"):
+        self.name = name
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        self._pid: Optional[int] = None
+        self._lock = threading.Lock()
+
+    @property
+    def loop(self) -> asyncio.AbstractEventLoop:
+        """The running loop; threads do not survive fork, so a child process starts its own"""
+        with self._lock:
+            if self._loop is None or self._pid != os.getpid() or not self._thread.is_alive():
+                loop = asyncio.new_event_loop()
+                ready = threading.Event()
+
+                def run():
+                    asyncio.set_event_loop(loop)
+                    loop.call_soon(ready.set)
+                    loop.run_forever()
+
+                self._thread = threading.Thread(target=run, name=self.name, daemon=True)
+                self._thread.start()
+                ready.wait()
+                self._loop, self._pid = loop, os.getpid()
+            return self._loop
+
+    def run(self, coro: Awaitable[Any], timeout: Optional[float] = None) -> Any:
+        """Run a coroutine on the loop and block the calling thread for its result"""
+        future = asyncio.run_coroutine_threadsafe(coro, self.loop)
+        try:
+            return future.result(timeout)
+        except BaseException:
+            # Timed out or the caller went away - don't leave the coroutine running
+            future.cancel()
+            raise
+
+    def iterate(self, agen: AsyncIterator[Any]) -> Iterator[Any]:
+        """Drive an async generator on the loop from a sync generator"""
+        try:
+            while True:
+                try:
+                    yield self.run(agen.__anext__())
+                except StopAsyncIteration:
+                    break
+        finally:
+            self.run(agen.aclose())
+
+    def stop(self, cleanup: Optional[Callable[[], Awaitable[Any]]] = None, timeout: float = 10.0):
+        """Run ``cleanup()`` on the loop (e.g. closing HTTP sessions), then stop it"""
+        with self._lock:
+            loop, thread = self._loop, self._thread
+            self._loop = None
+        if loop is None or self._pid != os.getpid() or not thread.is_alive():
+            return
+        if cleanup is not None:
+            try:
+                asyncio.run_coroutine_threadsafe(cleanup(), loop).result(timeout)
+            except Exception as e:
+                logger.error(f"{self.name} cleanup error: {e}")
+        loop.call_soon_threadsafe(loop.stop)
+        thread.join(timeout)
@@ -0,0 +1,201 @@
+"""
+Vectorized buybox matching engine for the Avilla firm database
+Scores every firm against a buybox in one pass of NumPy array operations,
+selects the top matches with a partial sort and rolls up TAM and per-metro
+fragmentation without touching the shared firm records
+"""
+
+from typing import Any, Dict
+
+import numpy as np
+
+from firm_store import FirmStore
+
+# Geography buckets used by the buybox dashboard
+GEOGRAPHY_STATES = {
+    "ma": "MA",
+    "northeast": "MA",
+    "fl": "FL",
+    "southeast": "FL",
+}
+
+# Metros need at least this many matching firms for a fragmentation readout
+MIN_METRO_FIRMS = 3
+
+
+class BuyboxEngine:
+    """Scores firms in a ``FirmStore`` against buybox criteria"""
+
+    def __init__(self, store: FirmStore):
+        self.store = store
+        columns = store.columns
+        empty = np.zeros(store.size)
+
+        # Float views of the scoring inputs, built once per store
+        self.revenue = columns["revenue_estimate"].astype(float) if "revenue_estimate" in columns else empty
+        self.ebitda = columns["estimated_ebitda"].astype(float) if "estimated_ebitda" in columns else empty
+        self.multiple = columns["estimated_multiple"].astype(float) if "estimated_multiple" in columns else empty
+        self.succession = columns["succession_risk_score"].astype(float) if "succession_risk_score" in columns else empty
+        self.reviews = columns["yelp_review_count"].astype(float) if "yelp_review_count" in columns else empty
+        # Buybox scoring counts an empty website as none (the store's has_website only checks for None)
+        websites = columns["website"] if "website" in columns else np.empty(store.size, dtype=object)
+        self.has_website = np.array([bool(website) for website in websites], dtype=bool)
+        self.enterprise_value = self.ebitda * self.multiple
+
+        states = columns["state"] if "state" in columns else np.empty(store.size, dtype=object)
+        self.state_masks = {state: states == state for state in set(GEOGRAPHY_STATES.values())}
+
+        self.metros, self.metro_codes = store.category_codes.get("metro", ([], np.zeros(store.size, dtype=np.int64)))
+
+    def _succession_masks(self) -> Dict[str, np.ndarray]:
+        return {
+            "high": self.succession >= 70,
+            "medium": (self.succession >= 40) & (self.succession < 70),
+            "growth": self.succession < 40,
+        }
+
+    def _digital_masks(self) -> Dict[str, np.ndarray]:
+        return {
+            "modern": self.has_website & (self.reviews > 20),
+            "basic": self.has_website,
+            "limited": ~self.has_website,
+        }
+
+    def match_scores(self, buybox: Dict[str, Any]) -> np.ndarray:
+        """Weighted match score (0-100) for every firm in the store"""
+        size = self.store.size
+        score = np.zeros(size, dtype=np.int64)
+
+        # Revenue match (25% weight)
+        min_rev = buybox.get("min_revenue", 0)
+        max_rev = buybox.get("max_revenue", 100000000)
+        in_range = (self.revenue >= min_rev) & (self.revenue <= max_rev)
+        score += np.where(in_range, 25, np.where(self.revenue >= min_rev * 0.8, 15, 0))
+
+        # EBITDA match (20% weight)
+        min_ebitda = buybox.get("min_ebitda", 0)
+        score += np.where(self.ebitda >= min_ebitda, 20, np.where(self.ebitda >= min_ebitda * 0.7, 10, 0))
+
+        # Multiple match (15% weight)
+        max_multiple = buybox.get("max_multiple", 10)
+        score += np.where(self.multiple <= max_multiple, 15, np.where(self.multiple <= max_multiple * 1.2, 8, 0))
+
+        # Succession priority match (20% weight)
+        succession = buybox.get("succession_priority", "any")
+        if succession == "any":
+            score += 15
+        elif succession in ("high", "medium", "growth"):
+            score += np.where(self._succession_masks()[succession], 20, 0)
+
+        # Digital maturity match (10% weight)
+        digital = buybox.get("digital_maturity", "any")
+        if digital == "any":
+            score += 8
+        elif digital in ("modern", "basic", "limited"):
+            score += np.where(self._digital_masks()[digital], 10, 0)
+
+        # Geography bonus (10% weight)
+        geography = buybox.get("geography", "all")
+        if geography == "all":
+            score += 10
+        elif geography in GEOGRAPHY_STATES:
+            score += np.where(self.state_masks[GEOGRAPHY_STATES[geography]], 10, 0)
+
+        return np.minimum(score, 100)
+
+    def criteria_mask(self, buybox: Dict[str, Any]) -> np.ndarray:
+        """Hard buybox filters (revenue, EBITDA, multiple, geography, succession, digital)"""
+        mask = (self.revenue >= buybox.get("min_revenue", 0)) & (self.revenue <= buybox.get("max_revenue", 100000000))
+        mask &= self.ebitda >= buybox.get("min_ebitda", 0)
+        mask &= self.multiple <= buybox.get("max_multiple", 10)
+
+        geography = buybox.get("geography", "all")
+        if geography in GEOGRAPHY_STATES:
+            mask &= self.state_masks[GEOGRAPHY_STATES[geography]]
+
+        succession = buybox.get("succession_priority", "any")
+        if succession in ("high", "medium", "growth"):
+            mask &= self._succession_masks()[succession]
+
+        digital = buybox.get("digital_maturity", "any")
+        if digital in ("modern", "basic", "limited"):
+            mask &= self._digital_masks()[digital]
+
+        return mask
+
+    def top_matches(self, ids: np.ndarray, scores: np.ndarray, top_k: int) -> np.ndarray:
+        """Top ``top_k`` ids by score (ties keep source order) via partial selection"""
+        if ids.size > top_k:
+            keep = np.argpartition(-scores[ids], top_k - 1)[:top_k]
+            # Pull in every id tied with the cut-off so the tie-break stays stable
+            cutoff = scores[ids[keep]].min()
+            ids = ids[scores[ids] >= cutoff]
+        order = np.lexsort((ids, -scores[ids]))
+        return ids[order][:top_k]
+
+    def metro_fragmentation(self, ids: np.ndarray, scores: np.ndarray) -> Dict[str, Dict[str, Any]]:
+        """Per-metro HHI and top-5 share over the matched firms"""
+        if ids.size == 0:
+            return {}
+
+        n_metros = len(self.metros)
+        codes = self.metro_codes[ids]
+        revenue = self.revenue[ids]
+
+        counts = np.bincount(codes, minlength=n_metros)
+        metro_revenue = np.bincount(codes, weights=revenue, minlength=n_metros)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            shares = revenue / metro_revenue[codes]
+        hhi = np.bincount(codes, weights=shares ** 2, minlength=n_metros)
+
+        # Top-5 share: rank each firm inside its metro by descending share
+        order = np.lexsort((-shares, codes))
+        sorted_codes = codes[order]
+        group_start = np.searchsorted(sorted_codes, np.arange(n_metros))
+        rank = np.arange(order.size) - group_start[sorted_codes]
+        top5 = np.bincount(sorted_codes[rank < 5], weights=shares[order][rank < 5] * 100, minlength=n_metros)
+
+        # Order metros by where they first appear in the ranked match list
+        first_key = np.full(n_metros, -np.inf)
+        np.maximum.at(first_key, codes, scores[ids] * (self.store.size + 1) + (self.store.size - ids))
+
+        fragmentation_data = {}
+        for code in np.argsort(-first_key, kind="stable"):
+            if counts[code] < MIN_METRO_FIRMS:
+                continue
+            metro_hhi = float(hhi[code])
+            fragmentation_data[self.metros[code]] = {
+                "firm_count": int(counts[code]),
+                "hhi_index": metro_hhi,
+                "top5_share": float(top5[code]),
+                "fragmentation_score": round((1 - metro_hhi) * 100),
+                "opportunity": "High" if metro_hhi < 0.15 else "Medium" if metro_hhi < 0.25 else "Low"
+            }
+        return fragmentation_data
+
+    def analyze(self, buybox: Dict[str, Any], min_match_score: int = 50, top_k: int = 100) -> Dict[str, Any]:
+        """Score, filter, rank and roll up a buybox in a single vectorized pass"""
+        scores = self.match_scores(buybox)
+        ids = np.flatnonzero(self.criteria_mask(buybox) & (scores >= min_match_score))
+        match_count = int(ids.size)
+
+        total_tam = float(self.enterprise_value[ids].sum())
+        avg_multiple = float(self.multiple[ids].mean()) if match_count else 0
+
+        top_ids = self.top_matches(ids, scores, top_k)
+        matching_firms = self.store.rows(top_ids)
+        for firm, score in zip(matching_firms, scores[top_ids].tolist()):
+            firm["match_score"] = score
+
+        return {
+            "matching_firms": matching_firms,
+            "total_matches": match_count,
+            "tam_analysis": {
+                "total_tam": total_tam,
+                "firm_count": match_count,
+                "avg_deal_size": total_tam / match_count if match_count else 0,
+                "avg_multiple": avg_multiple
+            },
+            "fragmentation_analysis": self.metro_fragmentation(ids, scores),
+            "high_succession_count": int((self.succession[ids] >= 70).sum())
+        }
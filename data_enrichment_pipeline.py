@@ -31,6 +31,8 @@ from pathlib import Path
 import pandas as pd
 import numpy as np
 
+from geocode_cache import shared_geocode_cache
+
 # Enhanced imports
 try:
     import requests
@@ -194,41 +196,56 @@ class DataQualityValidator:
         
         return min(score, max_score)
 
+# Geocoding confidence by fix precision
+GEOCODING_CONFIDENCE = {"address": 0.8, "zip": 0.6, "city": 0.4}
+
 class LocationIntelligence:
     """Advanced location-based intelligence"""
     
     def __init__(self):
         self.geocoder = Nominatim(user_agent="okapiq_enrichment") if GEOPY_AVAILABLE else None
-        self.location_cache = {}
+        self.geocode_cache = shared_geocode_cache()
+    
+    async def geocode_many(self, addresses: List[str]) -> Dict[str, Optional[Dict[str, Any]]]:
+        """Resolve addresses in one pass - cache and centroids first, Nominatim (1 request at a time) for the rest"""
+        geocoder = self._nominatim_geocode if self.geocoder else None
+        return await self.geocode_cache.resolve_many(addresses, geocoder, concurrency=1)
+    
+    async def _nominatim_geocode(self, address: str) -> Optional[Dict[str, Any]]:
+        # geopy is blocking - keep it off the event loop
+        location = await asyncio.to_thread(self.geocoder.geocode, address, timeout=10)
+        if not location:
+            return None
+        return {
+            "lat": location.latitude,
+            "lng": location.longitude,
+            "formatted_address": location.address,
+            "source": "nominatim"
+        }
     
     async def enrich_location(self, address: str) -> Dict[str, Any]:
         """Enrich location data with geocoding and demographics"""
-        if not address or not GEOPY_AVAILABLE:
+        if not address:
             return {"error": "Location services not available"}
         
-        # Check cache first
-        cache_key = hashlib.md5(address.encode()).hexdigest()
-        if cache_key in self.location_cache:
-            return self.location_cache[cache_key]
-        
         try:
-            location = self.geocoder.geocode(address, timeout=10)
+            location = (await self.geocode_many([address])).get(address)
             if not location:
                 return {"error": "Address not found"}
             
+            formatted_address = location.get("formatted_address") or address
             result = {
-                "formatted_address": location.address,
-                "latitude": location.latitude,
-                "longitude": location.longitude,
-                "geocoding_confidence": getattr(location, 'confidence', 0.8),
-                "address_components": self._parse_address_components(location.address)
+                "formatted_address": formatted_address,
+                "latitude": location["lat"],
+                "longitude": location["lng"],
+                # Centroid fixes are only as precise as their ZIP or city
+                "geocoding_confidence": GEOCODING_CONFIDENCE.get(location.get("precision"), 0.8),
+                "geocoding_source": location.get("source"),
+                "address_components": self._parse_address_components(formatted_address)
             }
             
             # Add demographic data (simulated - in production, integrate with Census API)
-            result.update(await self._get_demographic_data(location.latitude, location.longitude))
-            
-            # Cache result
-            self.location_cache[cache_key] = result
+            result.update(await self._get_demographic_data(location["lat"], location["lng"]))
             return result
             
         except Exception as e:
@@ -743,6 +760,9 @@ class DataEnrichmentPipeline:
         # Sort by priority (1=high, 5=low)
         sorted_requests = sorted(requests, key=lambda x: x.priority)
         
+        # Geocode every address up front in one deduplicated pass; enrich_location then reads the cache
+        await self.location_intel.geocode_many([r.address for r in sorted_requests if r.address])
+        
         # Process in batches to avoid overwhelming APIs
         batch_size = min(self.max_workers, 20)
         results = []
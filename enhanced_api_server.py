@@ -40,6 +40,9 @@ import numpy as np
 import requests
 from openai import OpenAI
 
+from firm_columnar import ColumnarSnapshot, add_derived_fields, columnar_is_current, derive_firm_fields
+from firm_snapshot import FirmSnapshotManager
+
 # Enhanced imports for ML and analytics
 try:
     from sklearn.cluster import KMeans, DBSCAN
@@ -157,24 +160,38 @@ class EnhancedCache:
 cache = EnhancedCache()
 
 # Load enhanced firm database with error handling
+DATABASE_PATH = '/Users/osirislamon/Documents/GitHub/oc_startup/avilla_firms_database.json'
+SUMMARY_STATS_PATH = '/Users/osirislamon/Documents/GitHub/oc_startup/avilla_summary_stats.json'
+COLUMNAR_PATH = '/Users/osirislamon/Documents/GitHub/oc_startup/avilla_firms_database.bin'
+
+def read_database() -> Tuple[List[Dict], Dict]:
+    """Read, validate and enhance the firm database (raises on failure)"""
+    if columnar_is_current(COLUMNAR_PATH, DATABASE_PATH):
+        # Columnar snapshot carries precomputed derived fields - no JSON parse
+        firms_db = ColumnarSnapshot(COLUMNAR_PATH).records(include_derived=True)
+    else:
+        with open(DATABASE_PATH, 'r') as f:
+            firms_db = json.load(f)
+        # Same derived fields as the columnar snapshot, computed in one pass
+        add_derived_fields(firms_db)
+    
+    with open(SUMMARY_STATS_PATH, 'r') as f:
+        summary_stats = json.load(f)
+    
+    # Validate and enhance data
+    validated_firms = []
+    for firm in firms_db:
+        if validate_firm_data(firm):
+            enhanced_firm = enhance_firm_data(firm)
+            validated_firms.append(enhanced_firm)
+    
+    logger.info(f"✅ Loaded {len(validated_firms)} validated firms from database")
+    return validated_firms, summary_stats
+
 def load_database():
     """Load firm database with enhanced error handling and validation"""
     try:
-        with open('/Users/osirislamon/Documents/GitHub/oc_startup/avilla_firms_database.json', 'r') as f:
-            firms_db = json.load(f)
-        
-        with open('/Users/osirislamon/Documents/GitHub/oc_startup/avilla_summary_stats.json', 'r') as f:
-            summary_stats = json.load(f)
-        
-        # Validate and enhance data
-        validated_firms = []
-        for firm in firms_db:
-            if validate_firm_data(firm):
-                enhanced_firm = enhance_firm_data(firm)
-                validated_firms.append(enhanced_firm)
-        
-        logger.info(f"✅ Loaded {len(validated_firms)} validated firms from database")
-        return validated_firms, summary_stats
+        return read_database()
         
     except FileNotFoundError:
         logger.warning("⚠️ Database files not found, generating sample data")
@@ -192,28 +209,21 @@ def enhance_firm_data(firm: Dict) -> Dict:
     """Enhance firm data with additional computed fields"""
     enhanced = firm.copy()
     
-    # Add computed metrics
-    enhanced['revenue_per_employee'] = enhanced.get('revenue', 0) / max(1, enhanced.get('employees', 1))
-    enhanced['market_position'] = calculate_market_position(enhanced)
+    # Add computed metrics (kept when the loader already derived them)
+    if 'revenue_per_employee' not in enhanced:
+        enhanced['revenue_per_employee'] = derive_firm_fields([enhanced])['revenue_per_employee'][0]
+    if 'market_position' not in enhanced:
+        enhanced['market_position'] = calculate_market_position(enhanced)
     enhanced['growth_potential'] = calculate_growth_potential(enhanced)
-    enhanced['risk_score'] = calculate_risk_score(enhanced)
+    if 'risk_score' not in enhanced:
+        enhanced['risk_score'] = calculate_risk_score(enhanced)
     enhanced['last_updated'] = datetime.now().isoformat()
     
     return enhanced
 
 def calculate_market_position(firm: Dict) -> str:
     """Calculate market position based on multiple factors"""
-    score = firm.get('deal_score', 0)
-    revenue = firm.get('revenue', 0)
-    
-    if score >= 85 and revenue >= 5000000:
-        return "market_leader"
-    elif score >= 75 and revenue >= 2000000:
-        return "strong_player"
-    elif score >= 65:
-        return "emerging"
-    else:
-        return "developing"
+    return derive_firm_fields([firm])['market_position'][0]
 
 def calculate_growth_potential(firm: Dict) -> float:
     """Calculate growth potential score using ML if available"""
@@ -234,18 +244,7 @@ def calculate_growth_potential(firm: Dict) -> float:
 
 def calculate_risk_score(firm: Dict) -> float:
     """Calculate risk score based on various factors"""
-    age = firm.get('years_in_business', 5)
-    revenue = firm.get('revenue', 0)
-    debt_ratio = firm.get('debt_to_equity', 0.5)
-    
-    # Lower score = lower risk
-    risk = (
-        max(0, 30 - age) * 0.3 +  # Age risk
-        max(0, 50 - revenue / 100000) * 0.3 +  # Revenue risk
-        debt_ratio * 50 * 0.4  # Debt risk
-    )
-    
-    return min(100, max(0, risk))
+    return derive_firm_fields([firm])['risk_score'][0]
 
 def generate_sample_data() -> Tuple[List[Dict], Dict]:
     """Generate sample data if database files are missing"""
@@ -273,9 +272,6 @@ def generate_sample_data() -> Tuple[List[Dict], Dict]:
     
     return firms, stats
 
-# Load database
-FIRMS_DATABASE, SUMMARY_STATS = load_database()
-
 # API Configuration with environment variables
 API_CONFIG = {
     "YELP_API_KEY": os.getenv("YELP_API_KEY", "your_yelp_api_key_here"),
@@ -416,10 +412,22 @@ class MLAnalytics:
         else:
             return "Emerging businesses"
 
-# Initialize ML analytics
-ml_analytics = MLAnalytics()
-if FIRMS_DATABASE:
-    ml_analytics.train_models(FIRMS_DATABASE)
+# Load database into a hot-reloadable snapshot; ML models are retrained per snapshot
+def build_ml_analytics(records: List[Dict]) -> Dict[str, Any]:
+    """Train the ML analytics for one snapshot of the firm database"""
+    ml_analytics = MLAnalytics()
+    if records:
+        ml_analytics.train_models(records)
+    return {'ml_analytics': ml_analytics}
+
+FIRM_SNAPSHOTS = FirmSnapshotManager(
+    DATABASE_PATH,
+    stats_path=SUMMARY_STATS_PATH,
+    build=build_ml_analytics,
+    loader=read_database,
+    fallback=load_database
+)
+FIRM_SNAPSHOTS.start_watcher()
 
 # Enhanced decorators
 def monitor_performance(f):
@@ -449,7 +457,9 @@ def cache_result(ttl: int = 3600):
         @wraps(f)
         def decorated_function(*args, **kwargs):
             # Create cache key from function name and arguments
-            cache_key = f"{f.__name__}:{hashlib.md5(str(args + tuple(sorted(kwargs.items()))).encode()).hexdigest()}"
+            # Scope entries to the firm snapshot so a reload never serves stale results
+            snapshot_key = FIRM_SNAPSHOTS.current.info.get('loaded_at')
+            cache_key = f"{f.__name__}:{snapshot_key}:{hashlib.md5(str(args + tuple(sorted(kwargs.items()))).encode()).hexdigest()}"
             
             # Try to get from cache
             cached_result = cache.get(cache_key)
@@ -666,6 +676,7 @@ def main_hub():
 @monitor_performance
 def health_check():
     """Enhanced health check with detailed system status"""
+    snapshot = FIRM_SNAPSHOTS.current
     system_stats = monitor.get_stats()
     
     health_status = {
@@ -673,17 +684,19 @@ def health_check():
         "timestamp": datetime.now().isoformat(),
         "version": "2.0.0-enhanced",
         "system": {
-            "database_loaded": len(FIRMS_DATABASE) > 0,
-            "ml_models_trained": ml_analytics.is_trained if SKLEARN_AVAILABLE else False,
+            "database_loaded": len(snapshot.records) > 0,
+            "ml_models_trained": snapshot.ml_analytics.is_trained if SKLEARN_AVAILABLE else False,
             "cache_available": cache.use_redis if REDIS_AVAILABLE else True,
             "sklearn_available": SKLEARN_AVAILABLE,
             "redis_available": REDIS_AVAILABLE
         },
         "performance": system_stats,
         "data": {
-            "total_firms": len(FIRMS_DATABASE),
+            "total_firms": len(snapshot.records),
             "api_keys_configured": sum(1 for k, v in API_CONFIG.items() if v != f"your_{k.lower()}_here"),
-            "last_data_update": SUMMARY_STATS.get('last_updated', 'unknown')
+            "last_data_update": snapshot.summary_stats.get('last_updated', 'unknown'),
+            "snapshot": snapshot.info,
+            "last_reload": FIRM_SNAPSHOTS.last_reload
         }
     }
     
@@ -695,6 +708,7 @@ def health_check():
 @cache_result(ttl=1800)  # Cache for 30 minutes
 def get_market_clusters():
     """Get ML-powered market clustering analysis"""
+    snapshot = FIRM_SNAPSHOTS.current
     try:
         if not SKLEARN_AVAILABLE:
             return jsonify({
@@ -702,12 +716,12 @@ def get_market_clusters():
                 "message": "Install scikit-learn for advanced analytics"
             }), 503
         
-        clusters = ml_analytics.get_market_clusters(FIRMS_DATABASE)
+        clusters = snapshot.ml_analytics.get_market_clusters(snapshot.records)
         
         return jsonify({
             "success": True,
             "clusters": clusters,
-            "total_firms_analyzed": len(FIRMS_DATABASE),
+            "total_firms_analyzed": len(snapshot.records),
             "analysis_timestamp": datetime.now().isoformat()
         })
         
@@ -720,6 +734,7 @@ def get_market_clusters():
 @monitor_performance
 def predict_deal_score():
     """Predict deal score using ML models"""
+    snapshot = FIRM_SNAPSHOTS.current
     try:
         data = request.get_json()
         
@@ -735,7 +750,7 @@ def predict_deal_score():
             len(data.get('services', []))
         ]
         
-        predicted_score = ml_analytics.predict_deal_score(features)
+        predicted_score = snapshot.ml_analytics.predict_deal_score(features)
         confidence = random.uniform(0.7, 0.95)  # Placeholder confidence
         
         return jsonify({
@@ -743,7 +758,7 @@ def predict_deal_score():
             "predicted_deal_score": round(predicted_score, 2),
             "confidence": round(confidence, 3),
             "features_used": features,
-            "model_trained": ml_analytics.is_trained
+            "model_trained": snapshot.ml_analytics.is_trained
         })
         
     except Exception as e:
@@ -756,8 +771,9 @@ def predict_deal_score():
 @cache_result(ttl=3600)  # Cache for 1 hour
 def detect_anomalies():
     """Detect anomalous firms using ML"""
+    snapshot = FIRM_SNAPSHOTS.current
     try:
-        if not SKLEARN_AVAILABLE or not ml_analytics.is_trained:
+        if not SKLEARN_AVAILABLE or not snapshot.ml_analytics.is_trained:
             return jsonify({
                 "error": "Anomaly detection not available",
                 "message": "ML models not trained or unavailable"
@@ -767,7 +783,7 @@ def detect_anomalies():
         features = []
         firm_ids = []
         
-        for firm in FIRMS_DATABASE:
+        for firm in snapshot.records:
             feature_vector = [
                 firm.get('revenue', 0),
                 firm.get('employees', 0),
@@ -778,15 +794,15 @@ def detect_anomalies():
             features.append(feature_vector)
             firm_ids.append(firm.get('firm_id'))
         
-        X_scaled = ml_analytics.scaler.transform(features)
-        anomaly_scores = ml_analytics.anomaly_detector.decision_function(X_scaled)
-        is_anomaly = ml_analytics.anomaly_detector.predict(X_scaled)
+        X_scaled = snapshot.ml_analytics.scaler.transform(features)
+        anomaly_scores = snapshot.ml_analytics.anomaly_detector.decision_function(X_scaled)
+        is_anomaly = snapshot.ml_analytics.anomaly_detector.predict(X_scaled)
         
         # Find anomalous firms
         anomalous_firms = []
         for i, (firm_id, score, is_anom) in enumerate(zip(firm_ids, anomaly_scores, is_anomaly)):
             if is_anom == -1:  # Anomaly
-                firm_data = FIRMS_DATABASE[i]
+                firm_data = snapshot.records[i]
                 anomalous_firms.append({
                     "firm_id": firm_id,
                     "name": firm_data.get('name'),
@@ -798,7 +814,7 @@ def detect_anomalies():
             "success": True,
             "anomalous_firms": sorted(anomalous_firms, key=lambda x: x['anomaly_score'])[:10],
             "total_anomalies": len(anomalous_firms),
-            "total_firms_analyzed": len(FIRMS_DATABASE)
+            "total_firms_analyzed": len(snapshot.records)
         })
         
     except Exception as e:
@@ -837,13 +853,14 @@ def analyze_anomaly_reason(firm: Dict) -> str:
 @cache_result(ttl=300)  # Cache for 5 minutes
 def get_stats():
     """Enhanced statistics with ML insights"""
+    snapshot = FIRM_SNAPSHOTS.current
     try:
-        base_stats = SUMMARY_STATS.copy()
+        base_stats = snapshot.summary_stats.copy()
         
         # Add enhanced analytics
-        if FIRMS_DATABASE:
-            revenues = [f.get('revenue', 0) for f in FIRMS_DATABASE]
-            deal_scores = [f.get('deal_score', 0) for f in FIRMS_DATABASE]
+        if snapshot.records:
+            revenues = [f.get('revenue', 0) for f in snapshot.records]
+            deal_scores = [f.get('deal_score', 0) for f in snapshot.records]
             
             enhanced_stats = {
                 **base_stats,
@@ -856,11 +873,11 @@ def get_stats():
                         "q3": float(np.percentile(deal_scores, 75)),
                         "q4": float(np.percentile(deal_scores, 95))
                     },
-                    "market_segments": calculate_market_segments(),
-                    "growth_potential_avg": np.mean([f.get('growth_potential', 0) for f in FIRMS_DATABASE])
+                    "market_segments": calculate_market_segments(snapshot.records),
+                    "growth_potential_avg": np.mean([f.get('growth_potential', 0) for f in snapshot.records])
                 },
                 "ml_status": {
-                    "models_trained": ml_analytics.is_trained,
+                    "models_trained": snapshot.ml_analytics.is_trained,
                     "sklearn_available": SKLEARN_AVAILABLE,
                     "cache_enabled": cache.use_redis or True
                 },
@@ -875,11 +892,11 @@ def get_stats():
         logger.error(f"Error getting enhanced stats: {e}")
         return jsonify({"error": str(e)}), 500
 
-def calculate_market_segments() -> Dict:
+def calculate_market_segments(firms: List[Dict]) -> Dict:
     """Calculate market segmentation"""
     segments = {"small": 0, "medium": 0, "large": 0, "enterprise": 0}
     
-    for firm in FIRMS_DATABASE:
+    for firm in firms:
         revenue = firm.get('revenue', 0)
         if revenue < 1000000:
             segments["small"] += 1
@@ -897,6 +914,7 @@ def calculate_market_segments() -> Dict:
 @monitor_performance
 def get_firms():
     """Get firms with enhanced filtering and sorting"""
+    snapshot = FIRM_SNAPSHOTS.current
     try:
         page = int(request.args.get('page', 1))
         per_page = min(int(request.args.get('per_page', 25)), 100)  # Limit max per_page
@@ -907,7 +925,7 @@ def get_firms():
         min_score = request.args.get('min_score', type=int)
         
         # Filter firms
-        filtered_firms = FIRMS_DATABASE.copy()
+        filtered_firms = snapshot.records.copy()
         
         if filter_location:
             filtered_firms = [f for f in filtered_firms if filter_location.lower() in f.get('location', '').lower()]
@@ -953,8 +971,8 @@ def get_firms():
 
 if __name__ == '__main__':
     print("🚀 Starting Enhanced Okapiq API Server...")
-    print(f"📊 Loaded {len(FIRMS_DATABASE)} firms")
-    print(f"🤖 ML Models: {'✅ Trained' if ml_analytics.is_trained else '❌ Not available'}")
+    print(f"📊 Loaded {len(FIRM_SNAPSHOTS.current.records)} firms")
+    print(f"🤖 ML Models: {'✅ Trained' if FIRM_SNAPSHOTS.current.ml_analytics.is_trained else '❌ Not available'}")
     print(f"💾 Cache: {'✅ Redis' if cache.use_redis else '⚠️ Memory'}")
     print(f"🌐 Dashboard: http://localhost:5000")
     print(f"📡 API endpoints available at /api/*")
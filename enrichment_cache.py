@@ -0,0 +1,86 @@
+"""
+Shared caches for external enrichment lookups
+Census, search trends and LLM answers change slowly compared with how often
+the same geography or category is asked about, so lookups are cached with a
+TTL and concurrent identical requests share one in-flight call.
+"""
+
+import asyncio
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional, Tuple
+
+_MISSING = object()
+
+
+class TTLCache:
+    """Thread-safe LRU with per-entry expiry and single-flight async loading"""
+
+    def __init__(self, ttl_seconds: float, max_entries: int = 4096):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Hashable, Tuple[float, Any]]" = OrderedDict()
+        self._inflight: Dict[Hashable, asyncio.Future] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] < time.time():
+                if entry is not None:
+                    del self._entries[key]
+                return default
+            self._entries.move_to_end(key)
+            return entry[1]
+
+    def put(self, key: Hashable, value: Any):
+        with self._lock:
+            self._entries[key] = (time.time() + self.ttl_seconds, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    async def get_or_fetch(self, key: Hashable, fetch: Callable[[], Awaitable[Any]]) -> Any:
+        """Cached value for ``key``, else the result of ``fetch()`` (``None`` results are not cached)
+
+        Callers arriving while the same key is being fetched on the same event
+        loop wait for that call instead of issuing their own.
+        """
+        value = self.get(key, _MISSING)
+        if value is not _MISSING:
+            self.hits += 1
+            return value
+
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            future = self._inflight.get(key)
+            leader = future is None or future.get_loop() is not loop
+            if leader:
+                future = loop.create_future()
+                self._inflight[key] = future
+        if not leader:
+            self.hits += 1
+            return await asyncio.shield(future)
+
+        self.misses += 1
+        try:
+            value = await fetch()
+        except BaseException:
+            # Followers degrade to "no data"; the leader sees its own error or cancellation
+            future.set_result(None)
+            raise
+        else:
+            if value is not None:
+                self.put(key, value)
+            future.set_result(value)
+            return value
+        finally:
+            with self._lock:
+                if self._inflight.get(key) is future:
+                    del self._inflight[key]
+
+    def stats(self) -> Dict[str, Optional[float]]:
+        return {"entries": len(self._entries), "hits": self.hits, "misses": self.misses, "ttl_seconds": self.ttl_seconds}
@@ -0,0 +1,137 @@
+"""
+Precomputed aggregate snapshots over the firm store
+Global dashboard stats, per-zip heatmap cells and per-metro fragmentation
+rollups are computed once per store version so the polled dashboard
+endpoints become dictionary lookups
+"""
+
+from datetime import datetime
+from typing import Any, Dict, List
+
+import numpy as np
+
+from firm_store import FirmStore
+
+
+def _numeric(store: FirmStore, field: str) -> np.ndarray:
+    column = store.columns.get(field)
+    if column is None:
+        return np.zeros(store.size)
+    return column.astype(float)
+
+
+def _strings(store: FirmStore, field: str) -> np.ndarray:
+    column = store.columns.get(field)
+    if column is None:
+        return np.full(store.size, "", dtype=object)
+    return column
+
+
+class FirmAggregates:
+    """Global, per-zip and per-metro rollups for one immutable ``FirmStore``"""
+
+    def __init__(self, store: FirmStore):
+        self.version = store.version
+        self.built_at = datetime.now().isoformat()
+
+        self._deal_score = _numeric(store, "deal_score")
+        self._revenue = _numeric(store, "revenue_estimate")
+        self._succession = _numeric(store, "succession_risk_score")
+
+        self.stats = self._build_stats(store)
+        self.heatmap = self._build_heatmap(store)
+        self.metro_fragmentation = self._build_metro_fragmentation(store)
+
+    def _build_stats(self, store: FirmStore) -> Dict[str, Any]:
+        states = _strings(store, "state")
+        return {
+            "total_firms": store.size,
+            "high_score_firms": int((self._deal_score >= 80).sum()),
+            "succession_opportunities": int((self._succession >= 70).sum()),
+            "avg_deal_score": float(self._deal_score.mean()) if store.size else 0,
+            "ma_firms": int((states == "MA").sum()),
+            "fl_firms": int((states == "FL").sum()),
+            "last_updated": self.built_at,
+            "data_version": self.version
+        }
+
+    def _build_heatmap(self, store: FirmStore) -> Dict[str, Any]:
+        """Per-zip cells in the same shape and order as the live heatmap scan"""
+        heatmap_data: List[Dict[str, Any]] = []
+        if store.size:
+            zips = _strings(store, "zip_code").astype(str)
+            cities = _strings(store, "city")
+            states = _strings(store, "state")
+            metros = _strings(store, "metro")
+
+            values, first_index, inverse = np.unique(zips, return_index=True, return_inverse=True)
+            inverse = inverse.reshape(-1)
+            firm_count = np.bincount(inverse)
+            avg_deal_score = np.bincount(inverse, weights=self._deal_score) / firm_count
+            avg_revenue = np.bincount(inverse, weights=self._revenue) / firm_count
+            succession = np.bincount(inverse, weights=self._succession >= 70)
+            opportunity = (avg_deal_score + firm_count * 5) / 2
+
+            # Zips in order of first appearance, like the dict-based grouping
+            for code in np.argsort(first_index, kind="stable"):
+                row = first_index[code]
+                heatmap_data.append({
+                    "zip": str(values[code]),
+                    "city": cities[row],
+                    "state": states[row],
+                    "metro": metros[row],
+                    "firm_count": int(firm_count[code]),
+                    "avg_deal_score": round(float(avg_deal_score[code]), 1),
+                    "avg_revenue": round(float(avg_revenue[code]) / 1000000, 1),  # Convert to millions
+                    "succession_opportunities": int(succession[code]),
+                    "market_density": int(firm_count[code]),
+                    "opportunity_score": round(float(opportunity[code]), 1)
+                })
+
+        # Sort by opportunity score
+        heatmap_data.sort(key=lambda x: x["opportunity_score"], reverse=True)
+
+        return {
+            "heatmap_data": heatmap_data,
+            "total_zips": len(heatmap_data),
+            "total_firms": store.size,
+            "data_version": self.version
+        }
+
+    def _build_metro_fragmentation(self, store: FirmStore) -> Dict[str, Dict[str, Any]]:
+        """Fragmentation analysis for every metro, keyed by metro name"""
+        if not store.size or "metro" not in store.category_codes:
+            return {}
+
+        metros, codes = store.category_codes["metro"]
+        order = np.argsort(codes, kind="stable")
+        boundaries = np.flatnonzero(np.diff(codes[order])) + 1
+
+        analyses = {}
+        for rows in np.split(order, boundaries):
+            metro = metros[codes[rows[0]]]
+            revenue = self._revenue[rows]
+            total_revenue = float(revenue.sum())
+
+            # Calculate HHI
+            market_shares = revenue / total_revenue * 100
+            hhi = float(((market_shares / 100) ** 2).sum())
+
+            # Top 5 concentration
+            top5_share = float(np.sort(market_shares)[::-1][:5].sum())
+
+            analyses[metro] = {
+                "metro": metro,
+                "total_firms": int(rows.size),
+                "total_market_size": int(total_revenue) if total_revenue.is_integer() else total_revenue,
+                "hhi_index": hhi,
+                "top5_concentration": top5_share,
+                "fragmentation_score": min(100, (1 - hhi) * 100 + (100 - top5_share) * 0.5),
+                "avg_deal_score": float(self._deal_score[rows].mean()),
+                "succession_opportunities": int((self._succession[rows] >= 70).sum()),
+                "recommendation": "High fragmentation - strong roll-up opportunity" if hhi < 0.15 else
+                                  "Moderate fragmentation - selective acquisitions" if hhi < 0.25 else
+                                  "Concentrated market - focus on market leaders",
+                "data_version": self.version
+            }
+        return analyses
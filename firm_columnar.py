@@ -0,0 +1,226 @@
+"""
+Compact columnar binary snapshot of the firm database
+One file holds a JSON header, fixed-width numeric columns and an interned
+string table.  Loading memory-maps the file and decodes a column only when it
+is first read, so a worker starts without parsing JSON or building a dict
+per firm.  Derived fields used by the servers are precomputed at write time.
+"""
+
+import json
+import os
+from typing import Any, Dict, Iterable, List, Optional
+
+import numpy as np
+
+MAGIC = b"OKFIRMS1"
+ALIGNMENT = 64
+
+# Derived per-firm fields stored next to the source columns
+DERIVED_FIELDS = ("revenue_per_employee", "market_position", "risk_score")
+
+
+def _align(offset: int) -> int:
+    return (offset + ALIGNMENT - 1) // ALIGNMENT * ALIGNMENT
+
+
+def _column_kind(values: List[Any]) -> str:
+    """Storage kind for a column - matches ``FirmStore``'s dtype choice"""
+    if values and all(isinstance(v, int) and not isinstance(v, bool) for v in values):
+        return "int64"
+    if values and all(isinstance(v, (int, float)) and not isinstance(v, bool) for v in values):
+        return "float64"
+    if all(v is None or isinstance(v, str) for v in values):
+        return "str"
+    return "json"
+
+
+# Source fields behind the derived ones - generate_firm_data writes the first name,
+# enhanced_api_server's sample firms the second
+REVENUE_FIELDS = ("revenue_estimate", "revenue")
+EMPLOYEE_FIELDS = ("employee_count", "employees")
+YEARS_FIELDS = ("years_established", "years_in_business")
+
+
+def _source_value(firm: Dict[str, Any], names: Iterable[str], default: float) -> float:
+    for name in names:
+        value = firm.get(name)
+        if value is not None:
+            return value
+    return default
+
+
+def derive_firm_fields(firms: List[Dict[str, Any]]) -> Dict[str, List[Any]]:
+    """Revenue per employee, market position and risk score for every firm
+
+    The one implementation of these fields: the columnar snapshot stores
+    them at write time and the JSON loaders compute them with this too.
+    """
+    revenue = np.array([_source_value(f, REVENUE_FIELDS, 0) for f in firms], dtype=float)
+    employees = np.array([_source_value(f, EMPLOYEE_FIELDS, 1) for f in firms], dtype=float)
+    deal_score = np.array([f.get("deal_score") or 0 for f in firms], dtype=float)
+    years = np.array([_source_value(f, YEARS_FIELDS, 5) for f in firms], dtype=float)
+    debt_ratio = np.array([_source_value(f, ("debt_to_equity",), 0.5) for f in firms], dtype=float)
+
+    market_position = np.select(
+        [(deal_score >= 85) & (revenue >= 5000000), (deal_score >= 75) & (revenue >= 2000000), deal_score >= 65],
+        ["market_leader", "strong_player", "emerging"],
+        default="developing"
+    )
+
+    # Lower score = lower risk
+    risk = (
+        np.maximum(0, 30 - years) * 0.3 +  # Age risk
+        np.maximum(0, 50 - revenue / 100000) * 0.3 +  # Revenue risk
+        debt_ratio * 50 * 0.4  # Debt risk
+    )
+
+    return {
+        "revenue_per_employee": (revenue / np.maximum(1, employees)).tolist(),
+        "market_position": market_position.tolist(),
+        "risk_score": np.clip(risk, 0, 100).tolist()
+    }
+
+
+def add_derived_fields(firms: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Set the derived fields on each firm dict in place (as the columnar snapshot stores them)"""
+    derived = derive_firm_fields(firms)
+    for i, firm in enumerate(firms):
+        for name in DERIVED_FIELDS:
+            firm[name] = derived[name][i]
+    return firms
+
+
+def columnar_is_current(columnar_path: Optional[str], json_path: Optional[str] = None) -> bool:
+    """True when the columnar snapshot exists and is not older than the JSON database"""
+    if not columnar_path or not os.path.exists(columnar_path):
+        return False
+    if not json_path or not os.path.exists(json_path):
+        return True
+    return os.stat(columnar_path).st_mtime_ns >= os.stat(json_path).st_mtime_ns
+
+
+def write_columnar_snapshot(firms: List[Dict[str, Any]], path: str):
+    """Write ``firms`` (plus derived fields) as a columnar snapshot, atomically"""
+    fields: List[str] = []
+    for firm in firms:
+        for key in firm:
+            if key not in fields:
+                fields.append(key)
+
+    columns: Dict[str, List[Any]] = {name: [firm.get(name) for firm in firms] for name in fields}
+    columns.update(derive_firm_fields(firms))
+
+    # Interned string table shared by every string column
+    strings: Dict[str, int] = {}
+    arrays: Dict[str, np.ndarray] = {}
+    kinds: Dict[str, str] = {}
+    for name, values in columns.items():
+        kind = _column_kind(values)
+        kinds[name] = kind
+        if kind in ("int64", "float64"):
+            arrays[name] = np.asarray(values, dtype=kind)
+            continue
+        if kind == "json":
+            values = [json.dumps(v) for v in values]
+        arrays[name] = np.array(
+            [-1 if v is None else strings.setdefault(v, len(strings)) for v in values], dtype=np.int32
+        )
+
+    encoded = [s.encode("utf-8") for s in strings]
+    arrays["__string_offsets__"] = np.cumsum([0] + [len(b) for b in encoded], dtype=np.int64)
+    arrays["__string_blob__"] = np.frombuffer(b"".join(encoded), dtype=np.uint8)
+
+    # Lay out data blocks after the header, each 64-byte aligned
+    layout, offset = {}, 0
+    for name, array in arrays.items():
+        offset = _align(offset)
+        layout[name] = {"dtype": array.dtype.str, "offset": offset, "length": int(array.size)}
+        offset += array.nbytes
+
+    header = json.dumps({
+        "size": len(firms),
+        "fields": fields,
+        "derived_fields": list(DERIVED_FIELDS),
+        "kinds": kinds,
+        "layout": layout
+    }).encode("utf-8")
+    data_start = _align(len(MAGIC) + 8 + len(header))
+
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(MAGIC)
+        f.write(len(header).to_bytes(8, "little"))
+        f.write(header)
+        for name, array in arrays.items():
+            f.seek(data_start + layout[name]["offset"])
+            f.write(array.tobytes())
+    os.replace(tmp_path, path)
+
+
+class ColumnarSnapshot:
+    """Memory-mapped, lazily decoded view of a columnar firm snapshot"""
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(path, "rb") as f:
+            if f.read(len(MAGIC)) != MAGIC:
+                raise ValueError(f"{path} is not a columnar firm snapshot")
+            header_length = int.from_bytes(f.read(8), "little")
+            header = json.loads(f.read(header_length))
+
+        self.size: int = header["size"]
+        self.fields: List[str] = header["fields"]
+        self.derived_fields: List[str] = header["derived_fields"]
+        self.kinds: Dict[str, str] = header["kinds"]
+        self._layout: Dict[str, Dict[str, Any]] = header["layout"]
+        self._data_start = _align(len(MAGIC) + 8 + header_length)
+        self._buffer = np.memmap(path, dtype=np.uint8, mode="r")
+        self._strings: Optional[np.ndarray] = None
+        self._columns: Dict[str, np.ndarray] = {}
+
+    def __len__(self) -> int:
+        return self.size
+
+    def _raw(self, name: str) -> np.ndarray:
+        block = self._layout[name]
+        dtype = np.dtype(block["dtype"])
+        start = self._data_start + block["offset"]
+        return self._buffer[start:start + block["length"] * dtype.itemsize].view(dtype)
+
+    def _string_table(self) -> np.ndarray:
+        if self._strings is None:
+            offsets = self._raw("__string_offsets__")
+            blob = self._raw("__string_blob__").tobytes()
+            table = np.empty(len(offsets), dtype=object)  # trailing slot decodes code -1 as None
+            table[:-1] = [blob[offsets[i]:offsets[i + 1]].decode("utf-8") for i in range(len(offsets) - 1)]
+            self._strings = table
+        return self._strings
+
+    def column(self, name: str) -> np.ndarray:
+        """Decoded column array (numeric columns stay memory-mapped)"""
+        if name not in self._columns:
+            kind = self.kinds[name]
+            raw = self._raw(name)
+            if kind in ("int64", "float64"):
+                column = raw
+            else:
+                column = self._string_table()[raw]
+                if kind == "json":
+                    decoded = np.empty(self.size, dtype=object)
+                    decoded[:] = [None if v is None else json.loads(v) for v in column]
+                    column = decoded
+            self._columns[name] = column
+        return self._columns[name]
+
+    def columns(self, include_derived: bool = False) -> Dict[str, np.ndarray]:
+        names = self.fields + (self.derived_fields if include_derived else [])
+        return {name: self.column(name) for name in names}
+
+    def records(self, include_derived: bool = False) -> List[Dict[str, Any]]:
+        """Materialize plain dicts (only for callers that really need them)"""
+        names = self.fields + (self.derived_fields if include_derived else [])
+        values = [self.column(name).tolist() for name in names]
+        return [dict(zip(names, row)) for row in zip(*values)]
+
+    def __iter__(self) -> Iterable[Dict[str, Any]]:
+        return iter(self.records())
@@ -0,0 +1,115 @@
+"""
+Precomputed lookup tables for the firm detail view
+A firm-id hash index, per-metro deal score ranks and per-(metro, subindustry)
+competitor lists are materialized once per store version so a detail
+request is a handful of dictionary and array reads
+"""
+
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from firm_store import FirmStore
+
+# Competitors listed on a firm's detail card
+MAX_COMPETITORS = 5
+
+COMPETITOR_FIELDS = ("name", "revenue_estimate", "deal_score", "succession_risk_score")
+
+
+class FirmDetailIndex:
+    """Hash, rank and competitor tables for one immutable ``FirmStore``"""
+
+    def __init__(self, store: FirmStore):
+        self.store = store
+        self.version = store.version
+        size = store.size
+
+        # First row per firm_id, matching a front-to-back scan
+        self.row_by_id: Dict[Any, int] = {}
+        for row, firm_id in enumerate(store.columns["firm_id"].tolist() if "firm_id" in store.columns else []):
+            self.row_by_id.setdefault(firm_id, row)
+
+        deal_score = store.columns["deal_score"].astype(float) if "deal_score" in store.columns else np.zeros(size)
+        metros, metro_codes = store.category_codes.get("metro", ([], np.zeros(size, dtype=np.int64)))
+        self.metro_codes = metro_codes
+
+        # Per-metro counts, averages and 1-based deal score ranks (ties keep source order)
+        self.metro_counts = np.bincount(metro_codes, minlength=len(metros))
+        with np.errstate(divide="ignore", invalid="ignore"):
+            self.metro_avg_score = np.bincount(metro_codes, weights=deal_score, minlength=len(metros)) / self.metro_counts
+        order = np.lexsort((np.arange(size), -deal_score, metro_codes))
+        group_start = np.searchsorted(metro_codes[order], np.arange(len(metros)))
+        self.metro_rank = np.empty(size, dtype=np.int64)
+        self.metro_rank[order] = np.arange(size) - group_start[metro_codes[order]] + 1
+
+        # Rows per (metro, subindustry) in source order
+        _, subindustry_codes = store.category_codes.get("subindustry", ([], np.zeros(size, dtype=np.int64)))
+        self.peer_group = metro_codes * (int(subindustry_codes.max()) + 1 if size else 1) + subindustry_codes
+        self.peers: Dict[int, np.ndarray] = {}
+        if size:
+            peer_order = np.argsort(self.peer_group, kind="stable")
+            boundaries = np.flatnonzero(np.diff(self.peer_group[peer_order])) + 1
+            for rows in np.split(peer_order, boundaries):
+                self.peers[int(self.peer_group[rows[0]])] = rows
+
+        self._competitor_columns = {
+            name: store.columns[name].tolist() for name in COMPETITOR_FIELDS if name in store.columns
+        }
+        self._firm_ids = store.columns["firm_id"].tolist() if "firm_id" in store.columns else [None] * size
+
+    def row(self, firm_id: Any) -> Optional[int]:
+        """Row id for ``firm_id`` or ``None``"""
+        return self.row_by_id.get(firm_id)
+
+    def market_context(self, row: int) -> Dict[str, Any]:
+        code = self.metro_codes[row]
+        return {
+            "metro_firm_count": int(self.metro_counts[code]),
+            "metro_avg_score": float(self.metro_avg_score[code]),
+            "rank_in_metro": int(self.metro_rank[row])
+        }
+
+    def competitors(self, row: int) -> List[Dict[str, Any]]:
+        """First few same-metro, same-subindustry firms other than ``row``"""
+        firm_id = self._firm_ids[row]
+        competitors = []
+        for peer in self.peers.get(int(self.peer_group[row]), ()).tolist():
+            if self._firm_ids[peer] == firm_id:
+                continue
+            competitors.append({name: column[peer] for name, column in self._competitor_columns.items()})
+            if len(competitors) == MAX_COMPETITORS:
+                break
+        return competitors
+
+    def details(self, firm_id: Any) -> Optional[Dict[str, Any]]:
+        """Firm record enriched with market context, valuation and competitors"""
+        row = self.row(firm_id)
+        if row is None:
+            return None
+
+        enriched_firm = self.store.rows([row])[0]
+        enriched_firm["market_context"] = self.market_context(row)
+
+        # Add valuation estimates
+        ebitda = enriched_firm["estimated_ebitda"]
+        multiple = enriched_firm["estimated_multiple"]
+        enriched_firm["valuation_estimates"] = {
+            "enterprise_value": int(ebitda * multiple),
+            "equity_value_range": [int(ebitda * (multiple - 0.5)), int(ebitda * (multiple + 0.5))],
+            "price_per_employee": int((ebitda * multiple) / enriched_firm["employee_count"]) if enriched_firm["employee_count"] > 0 else 0
+        }
+
+        enriched_firm["competitors"] = self.competitors(row)
+        return enriched_firm
+
+    def batch_details(self, firm_ids: List[Any]) -> Tuple[List[Dict[str, Any]], List[Any]]:
+        """Details for many firms in request order, plus the ids that were not found"""
+        found, missing = [], []
+        for firm_id in firm_ids:
+            detail = self.details(firm_id)
+            if detail is None:
+                missing.append(firm_id)
+            else:
+                found.append(detail)
+        return found, missing
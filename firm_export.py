@@ -0,0 +1,95 @@
+"""
+Chunked CSV and Parquet export over the firm store
+Rows are rendered a slice at a time so an export of the whole database keeps
+memory bounded and the first bytes reach the client immediately
+"""
+
+from typing import Iterable, Iterator, Optional
+
+import numpy as np
+import pandas as pd
+
+from firm_store import FirmStore
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    PARQUET_AVAILABLE = True
+except ImportError:
+    PARQUET_AVAILABLE = False
+
+# Rows rendered per chunk / Parquet row group
+EXPORT_CHUNK_ROWS = 5000
+
+
+def stream_csv(store: FirmStore, ids: np.ndarray, fields: Optional[Iterable[str]] = None,
+               chunk_rows: int = EXPORT_CHUNK_ROWS) -> Iterator[str]:
+    """Yield CSV text for ``ids`` in chunks, header first (same output as one ``to_csv``)"""
+    fields = list(fields or store.fields)
+    if ids.size == 0:
+        yield pd.DataFrame(columns=fields).to_csv(index=False)
+        return
+    for start in range(0, ids.size, chunk_rows):
+        chunk = pd.DataFrame(store.column_slice(ids[start:start + chunk_rows], fields))
+        yield chunk.to_csv(index=False, header=start == 0)
+
+
+class _ChunkSink:
+    """Write-only file object whose buffered bytes are drained between row groups"""
+
+    def __init__(self):
+        self.buffer = bytearray()
+        self.position = 0
+        self.closed = False
+
+    def write(self, data) -> int:
+        self.buffer += data
+        self.position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self.position
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def drain(self) -> bytes:
+        data = bytes(self.buffer)
+        self.buffer.clear()
+        return data
+
+
+def _parquet_schema(store: FirmStore, fields: Iterable[str]):
+    """Arrow schema from whole columns so every row group agrees on types"""
+    columns = []
+    for name in fields:
+        column = store.columns[name]
+        if column.dtype != object:
+            columns.append(pa.field(name, pa.from_numpy_dtype(column.dtype)))
+            continue
+        sample = next((v for v in column if v is not None), None)
+        columns.append(pa.field(name, pa.infer_type([sample]) if sample is not None else pa.string()))
+    return pa.schema(columns)
+
+
+def stream_parquet(store: FirmStore, ids: np.ndarray, fields: Optional[Iterable[str]] = None,
+                   chunk_rows: int = EXPORT_CHUNK_ROWS) -> Iterator[bytes]:
+    """Yield a Parquet file for ``ids`` one row group at a time"""
+    if not PARQUET_AVAILABLE:
+        raise RuntimeError("Parquet export requires pyarrow")
+
+    fields = list(fields or store.fields)
+    schema = _parquet_schema(store, fields)
+    sink = _ChunkSink()
+    writer = pq.ParquetWriter(sink, schema)
+    for start in range(0, ids.size, chunk_rows):
+        chunk = store.column_slice(ids[start:start + chunk_rows], fields)
+        writer.write_table(pa.Table.from_pydict({name: chunk[name].tolist() for name in fields}, schema=schema))
+        data = sink.drain()
+        if data:
+            yield data
+    writer.close()
+    yield sink.drain()
@@ -0,0 +1,156 @@
+"""
+Inverted-index full-text search over firm text fields
+Trigram postings answer substring and fuzzy queries, token postings answer
+prefix queries; both are built once per firm store so a search-box keystroke
+only touches the postings for the typed characters
+"""
+
+import re
+from bisect import bisect_left
+from collections import defaultdict
+from typing import Dict, Iterable, List, Optional
+
+import numpy as np
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+
+# Relevance weights when a match lands in each field
+FIELD_WEIGHTS = {
+    "name": 10,
+    "owner_name": 6,
+    "city": 4,
+    "subindustry": 2,
+}
+
+
+def trigrams(text: str) -> List[str]:
+    """Distinct trigrams of an already lower-cased string"""
+    return list({text[i:i + 3] for i in range(len(text) - 2)})
+
+
+def tokens(text: str) -> List[str]:
+    """Alphanumeric tokens of an already lower-cased string"""
+    return TOKEN_PATTERN.findall(text)
+
+
+def _postings(lists: Dict[str, List[int]]) -> Dict[str, np.ndarray]:
+    return {key: np.array(rows, dtype=np.int64) for key, rows in lists.items()}
+
+
+class FirmSearchIndex:
+    """Trigram and token postings over pre-lowered text columns"""
+
+    def __init__(self, texts: Dict[str, np.ndarray]):
+        self.texts = texts
+        self.size = len(next(iter(texts.values()))) if texts else 0
+        self._empty = np.zeros(0, dtype=np.int64)
+
+        self._trigrams: Dict[str, Dict[str, np.ndarray]] = {}
+        self._tokens: Dict[str, Dict[str, np.ndarray]] = {}
+        self._vocab: Dict[str, List[str]] = {}
+
+        for field, column in texts.items():
+            trigram_lists: Dict[str, List[int]] = defaultdict(list)
+            token_lists: Dict[str, List[int]] = defaultdict(list)
+            for row, text in enumerate(column.tolist()):
+                for gram in trigrams(text):
+                    trigram_lists[gram].append(row)
+                for token in set(tokens(text)):
+                    token_lists[token].append(row)
+            self._trigrams[field] = _postings(trigram_lists)
+            self._tokens[field] = _postings(token_lists)
+            self._vocab[field] = sorted(token_lists)
+
+    def _fields(self, fields: Optional[Iterable[str]]) -> List[str]:
+        return [f for f in (fields or self.texts) if f in self.texts]
+
+    def _union(self, arrays: List[np.ndarray]) -> np.ndarray:
+        if not arrays:
+            return self._empty
+        if len(arrays) == 1:
+            return arrays[0]
+        return np.unique(np.concatenate(arrays))
+
+    def substring(self, query: str, fields: Optional[Iterable[str]] = None) -> np.ndarray:
+        """Row ids whose field contains ``query`` (case-insensitive), ascending"""
+        needle = query.lower()
+        matches = []
+        for field in self._fields(fields):
+            text = self.texts[field]
+            if len(needle) < 3:
+                # Too short for trigram postings - fall back to a vectorized scan
+                matches.append(np.flatnonzero(np.char.find(text, needle) != -1))
+                continue
+
+            postings = self._trigrams[field]
+            grams = sorted(trigrams(needle), key=lambda g: len(postings.get(g, self._empty)))
+            candidates = postings.get(grams[0], self._empty)
+            for gram in grams[1:]:
+                if candidates.size == 0:
+                    break
+                candidates = np.intersect1d(candidates, postings.get(gram, self._empty), assume_unique=True)
+
+            # Trigram containment is necessary, not sufficient - verify the survivors
+            if len(needle) > 3 and candidates.size:
+                candidates = candidates[np.char.find(text[candidates], needle) != -1]
+            matches.append(candidates)
+        return self._union(matches)
+
+    def prefix(self, query: str, fields: Optional[Iterable[str]] = None) -> np.ndarray:
+        """Row ids where every query token prefixes some token of one field"""
+        query_tokens = tokens(query.lower())
+        if not query_tokens:
+            return self._empty
+
+        matches = []
+        for field in self._fields(fields):
+            vocab = self._vocab[field]
+            postings = self._tokens[field]
+            rows = None
+            for token in query_tokens:
+                start = bisect_left(vocab, token)
+                hits = []
+                while start < len(vocab) and vocab[start].startswith(token):
+                    hits.append(postings[vocab[start]])
+                    start += 1
+                token_rows = self._union(hits)
+                rows = token_rows if rows is None else np.intersect1d(rows, token_rows, assume_unique=True)
+                if rows.size == 0:
+                    break
+            matches.append(rows)
+        return self._union(matches)
+
+    def fuzzy(self, query: str, fields: Optional[Iterable[str]] = None,
+              min_similarity: float = 0.5) -> np.ndarray:
+        """Row ids sharing at least ``min_similarity`` of the query trigrams, best first"""
+        grams = trigrams(query.lower())
+        if not grams:
+            return self.substring(query, fields)
+
+        best = np.zeros(self.size)
+        for field in self._fields(fields):
+            postings = self._trigrams[field]
+            hits = [postings[g] for g in grams if g in postings]
+            if hits:
+                best = np.maximum(best, np.bincount(np.concatenate(hits), minlength=self.size) / len(grams))
+
+        ids = np.flatnonzero(best >= min_similarity)
+        return ids[np.argsort(-best[ids], kind="stable")]
+
+    def rank(self, ids: np.ndarray, query: str) -> np.ndarray:
+        """Order ``ids`` by relevance to ``query`` (ties keep source order)"""
+        needle = query.lower()
+        if ids.size == 0 or not needle:
+            return ids
+
+        score = np.zeros(ids.size)
+        prefix_rows = {field: self.prefix(needle, [field]) for field in self.texts}
+        for field, weight in FIELD_WEIGHTS.items():
+            if field not in self.texts:
+                continue
+            text = self.texts[field][ids]
+            score += weight * (np.char.find(text, needle) != -1)
+            score += weight * np.isin(ids, prefix_rows[field])
+            score += 2 * weight * np.char.startswith(text, needle)
+            score += 4 * weight * (text == needle)
+        return ids[np.argsort(-score, kind="stable")]
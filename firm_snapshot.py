@@ -0,0 +1,182 @@
+"""
+Hot-reloadable firm database snapshots
+A background watcher notices when generate_firm_data.py rewrites the firm
+database, builds the new records and indexes off the request path and swaps
+the current snapshot in a single reference assignment.  Requests grab the
+snapshot once and keep reading it even if a reload lands mid-request.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from firm_columnar import ColumnarSnapshot, columnar_is_current
+
+logger = logging.getLogger(__name__)
+
+# Seconds between database file checks
+DEFAULT_POLL_INTERVAL = float(os.getenv("FIRM_DB_POLL_SECONDS", "30"))
+
+
+def _rss_bytes() -> int:
+    """Resident set size of this process (0 when it cannot be read)"""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        pass
+    try:
+        import resource
+        # ru_maxrss is a high-water mark (KiB on Linux, bytes on macOS) - best effort only
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+    except (ImportError, OSError):
+        return 0
+
+
+def _file_signature(path: Optional[str]) -> Optional[Tuple[int, int]]:
+    if not path:
+        return None
+    try:
+        stat = os.stat(path)
+        return stat.st_mtime_ns, stat.st_size
+    except OSError:
+        return None
+
+
+class FirmSnapshot:
+    """Immutable firm records plus the indexes derived from them"""
+
+    def __init__(self, records: List[Dict[str, Any]], summary_stats: Dict[str, Any],
+                 components: Dict[str, Any], info: Dict[str, Any]):
+        self.records = records
+        self.summary_stats = summary_stats
+        self.components = components
+        self.info = info
+
+    def __getattr__(self, name: str) -> Any:
+        # Derived components (store, aggregates, ...) read as attributes
+        try:
+            return self.__dict__["components"][name]
+        except KeyError:
+            raise AttributeError(name) from None
+
+
+class FirmSnapshotManager:
+    """Owns the current ``FirmSnapshot`` and rebuilds it when the database file changes"""
+
+    def __init__(self, database_path: str, stats_path: Optional[str] = None,
+                 build: Optional[Callable[[List[Dict[str, Any]]], Dict[str, Any]]] = None,
+                 loader: Optional[Callable[[], Tuple[List[Dict[str, Any]], Dict[str, Any]]]] = None,
+                 fallback: Optional[Callable[[], Tuple[List[Dict[str, Any]], Dict[str, Any]]]] = None,
+                 columnar_path: Optional[str] = None, records_as_columns: bool = False,
+                 poll_interval: float = DEFAULT_POLL_INTERVAL):
+        self.database_path = database_path
+        self.stats_path = stats_path
+        # Prefer the columnar snapshot written next to the JSON when it is current;
+        # with records_as_columns the snapshot itself is handed to ``build``
+        self.columnar_path = columnar_path
+        self.records_as_columns = records_as_columns
+        self.build = build or (lambda records: {})
+        self.loader = loader or self._load_json
+        self.poll_interval = poll_interval
+
+        self._reload_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._watcher: Optional[threading.Thread] = None
+        self._signature = None
+        self._failed_signature = None
+        self.last_reload: Dict[str, Any] = {}
+
+        self._current = FirmSnapshot([], {}, self.build([]), {"version": None, "loaded_at": None})
+        if not self.reload(force=True) and fallback is not None:
+            # Startup only - later reload failures keep the last good snapshot instead
+            records, summary_stats = fallback()
+            self._current = FirmSnapshot(records, summary_stats, self.build(records), {
+                "version": None,
+                "loaded_at": datetime.now().isoformat(),
+                "record_count": len(records),
+                "fallback": True,
+            })
+
+    @property
+    def current(self) -> FirmSnapshot:
+        """The snapshot new requests should read"""
+        return self._current
+
+    def _load_json(self) -> Tuple[List[Dict[str, Any]], Dict[str, Any]]:
+        if columnar_is_current(self.columnar_path, self.database_path):
+            columnar = ColumnarSnapshot(self.columnar_path)
+            records = columnar if self.records_as_columns else columnar.records()
+        else:
+            with open(self.database_path, "r") as f:
+                records = json.load(f)
+        summary_stats = {}
+        if self.stats_path:
+            with open(self.stats_path, "r") as f:
+                summary_stats = json.load(f)
+        return records, summary_stats
+
+    def _source_signature(self):
+        return (_file_signature(self.database_path), _file_signature(self.stats_path),
+                _file_signature(self.columnar_path))
+
+    def reload(self, force: bool = False) -> bool:
+        """Rebuild and swap the snapshot if the source files changed; True when swapped"""
+        with self._reload_lock:
+            signature = self._source_signature()
+            if not force and signature in (self._signature, self._failed_signature):
+                return False
+
+            start = time.perf_counter()
+            rss_before = _rss_bytes()
+            try:
+                records, summary_stats = self.loader()
+                components = self.build(records)
+            except Exception as e:
+                # Keep serving the old snapshot; a half-written file is retried next poll
+                logger.error(f"Firm database reload failed: {e}")
+                self.last_reload = {"error": str(e), "attempted_at": datetime.now().isoformat()}
+                self._failed_signature = signature
+                return False
+
+            build_seconds = time.perf_counter() - start
+            store = components.get("store")
+            info = {
+                "version": getattr(store, "version", None),
+                "stats_version": hashlib.sha1(json.dumps(summary_stats, sort_keys=True, default=str).encode()).hexdigest()[:16],
+                "loaded_at": datetime.now().isoformat(),
+                "record_count": len(records),
+                "build_seconds": round(build_seconds, 4),
+                "memory_delta_mb": round((_rss_bytes() - rss_before) / (1024 * 1024), 2),
+            }
+            self._current = FirmSnapshot(records, summary_stats, components, info)
+            self._signature = signature
+            self._failed_signature = None
+            self.last_reload = info
+            logger.info(f"Firm database snapshot loaded: {info}")
+            return True
+
+    def _watch(self):
+        while not self._stop.wait(self.poll_interval):
+            try:
+                self.reload()
+            except Exception as e:
+                logger.error(f"Firm database watcher error: {e}")
+
+    def start_watcher(self):
+        """Poll the database files from a daemon thread"""
+        if self._watcher and self._watcher.is_alive():
+            return
+        self._stop.clear()
+        self._watcher = threading.Thread(target=self._watch, name="firm-db-watcher", daemon=True)
+        self._watcher.start()
+
+    def stop_watcher(self):
+        self._stop.set()
+        if self._watcher:
+            self._watcher.join(timeout=self.poll_interval)
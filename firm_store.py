@@ -0,0 +1,290 @@
+"""
+Columnar in-memory firm store for the Avilla firm database
+Loads firm records once into typed column arrays with secondary indexes so
+dashboard filters become bitmap intersections and sorted-array range lookups
+"""
+
+import base64
+import hashlib
+import json
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from firm_search import FirmSearchIndex
+
+# Fields with an equality bitmap per distinct value
+CATEGORY_FIELDS = ("state", "subindustry", "metro")
+
+# Fields kept as sorted arrays for range lookups
+RANGE_FIELDS = ("deal_score", "revenue_estimate", "succession_risk_score")
+
+# Fields covered by the free-text search filter
+SEARCH_FIELDS = ("name", "city", "owner_name", "subindustry")
+
+# Succession risk buckets as half-open [low, high) score ranges
+SUCCESSION_BUCKETS = {
+    "low": (None, 40),
+    "medium": (40, 70),
+    "high": (70, None),
+}
+
+
+def _column_dtype(values: List[Any]):
+    """Pick the narrowest numpy dtype that round-trips a column's values"""
+    if values and all(isinstance(v, int) and not isinstance(v, bool) for v in values):
+        return np.int64
+    if values and all(isinstance(v, (int, float)) and not isinstance(v, bool) for v in values):
+        return np.float64
+    return object
+
+
+def encode_cursor(version: str, ids: np.ndarray, position: int) -> Optional[str]:
+    """Opaque keyset cursor continuing after ``ids[position - 1]``"""
+    if position <= 0 or position >= ids.size:
+        return None
+    payload = json.dumps({"v": version, "after": int(ids[position - 1]), "pos": position})
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Dict[str, Any]:
+    """Inverse of ``encode_cursor``; raises ``ValueError`` for malformed cursors"""
+    try:
+        payload = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+        return {"v": str(payload["v"]), "after": int(payload["after"]), "pos": int(payload["pos"])}
+    except (KeyError, TypeError, ValueError) as e:
+        raise ValueError(f"Invalid cursor: {e}") from None
+
+
+def cursor_position(ids: np.ndarray, after: int, position: int) -> int:
+    """Index in ``ids`` just past row ``after`` (``position`` is the fast-path hint)"""
+    if 0 < position <= ids.size and ids[position - 1] == after:
+        return position
+    found = np.flatnonzero(ids == after)
+    if found.size:
+        return int(found[0]) + 1
+    # Row dropped out of the ordering - fall back to the keyset on row id
+    return int(np.searchsorted(ids, after, side="right")) if np.all(ids[:-1] <= ids[1:]) else position
+
+
+class FirmStore:
+    """Immutable columnar firm table with bitmap and sorted-array indexes"""
+
+    def __init__(self, records: Sequence[Dict[str, Any]]):
+        self.size = len(records)
+
+        # Preserve the record key order so rebuilt dicts match the source JSON
+        self.fields: List[str] = []
+        seen = set()
+        for record in records:
+            for key in record:
+                if key not in seen:
+                    seen.add(key)
+                    self.fields.append(key)
+
+        self.columns: Dict[str, np.ndarray] = {}
+        for name in self.fields:
+            values = [record.get(name) for record in records]
+            dtype = _column_dtype(values)
+            column = np.empty(self.size, dtype=object) if dtype is object else np.array(values, dtype=dtype)
+            if dtype is object:
+                column[:] = values
+            self.columns[name] = column
+
+        self._build_indexes()
+
+    @classmethod
+    def from_columns(cls, fields: List[str], columns: Dict[str, np.ndarray]) -> "FirmStore":
+        """Build a store straight from column arrays (no per-firm dicts)"""
+        store = cls.__new__(cls)
+        store.fields = list(fields)
+        store.columns = {name: columns[name] for name in store.fields}
+        store.size = len(store.columns[store.fields[0]]) if store.fields else 0
+        store._build_indexes()
+        return store
+
+    @classmethod
+    def from_columnar(cls, snapshot) -> "FirmStore":
+        """Build a store from a ``firm_columnar.ColumnarSnapshot``"""
+        return cls.from_columns(snapshot.fields, snapshot.columns())
+
+    def _build_indexes(self):
+        self.version = self._fingerprint()
+
+        self._all_bits = self._pack(np.ones(self.size, dtype=bool))
+        self._none_bits = self._pack(np.zeros(self.size, dtype=bool))
+
+        # Dictionary-encoded codes and equality bitmaps per distinct value
+        self.category_codes: Dict[str, Tuple[List[str], np.ndarray]] = {}
+        self._category_bits: Dict[str, Dict[Any, np.ndarray]] = {}
+        for name in CATEGORY_FIELDS:
+            if name not in self.columns:
+                continue
+            column = self.columns[name]
+            values, inverse = np.unique(column.astype(str), return_inverse=True)
+            self.category_codes[name] = (values.tolist(), inverse.reshape(-1))
+            self._category_bits[name] = {
+                value: self._pack(inverse == code) for code, value in enumerate(values.tolist())
+            }
+
+        # Sorted arrays (row order + sorted values) for range lookups
+        self._sorted: Dict[str, Tuple[np.ndarray, np.ndarray]] = {}
+        for name in RANGE_FIELDS:
+            if name in self.columns and self.columns[name].dtype != object:
+                order = np.argsort(self.columns[name], kind="stable")
+                self._sorted[name] = (order, self.columns[name][order])
+
+        # Pre-lowered text columns so search never lower-cases per request
+        self._search_text: Dict[str, np.ndarray] = {}
+        for name in SEARCH_FIELDS:
+            if name in self.columns:
+                self._search_text[name] = np.array(
+                    [str(v).lower() if v is not None else "" for v in self.columns[name]], dtype=str
+                )
+        self.search_index = FirmSearchIndex(self._search_text)
+
+        self.has_website = (
+            np.array([v is not None for v in self.columns["website"]], dtype=bool)
+            if "website" in self.columns else np.zeros(self.size, dtype=bool)
+        )
+        self._website_bits = self._pack(self.has_website)
+
+    @classmethod
+    def from_json(cls, path: str) -> "FirmStore":
+        """Load a store from a firm database JSON file"""
+        with open(path, "r") as f:
+            return cls(json.load(f))
+
+    def __len__(self) -> int:
+        return self.size
+
+    def _fingerprint(self) -> str:
+        """Content hash of the columns, stable across processes and restarts"""
+        digest = hashlib.sha1()
+        for name in self.fields:
+            column = self.columns[name]
+            digest.update(name.encode())
+            digest.update(str(column.dtype).encode())
+            if column.dtype == object:
+                digest.update(json.dumps(column.tolist(), default=str).encode())
+            else:
+                digest.update(column.tobytes())
+        return digest.hexdigest()[:16]
+
+    # Bitmap primitives
+    def _pack(self, mask: np.ndarray) -> np.ndarray:
+        return np.packbits(mask)
+
+    def _unpack(self, bits: np.ndarray) -> np.ndarray:
+        return np.unpackbits(bits, count=self.size).astype(bool)
+
+    def category_bitmap(self, field: str, value: Any) -> np.ndarray:
+        """Packed bitmap of rows whose ``field`` equals ``value``"""
+        return self._category_bits.get(field, {}).get(str(value), self._none_bits)
+
+    def range_bitmap(self, field: str, low: Optional[float] = None, high: Optional[float] = None,
+                     closed: bool = True) -> np.ndarray:
+        """Packed bitmap of rows with ``low <= field <= high`` (``< high`` when not closed)"""
+        if field in self._sorted:
+            order, sorted_values = self._sorted[field]
+            start = 0 if low is None else np.searchsorted(sorted_values, low, side="left")
+            if high is None:
+                stop = self.size
+            else:
+                stop = np.searchsorted(sorted_values, high, side="right" if closed else "left")
+            if start == 0 and stop == self.size:
+                return self._all_bits
+            mask = np.zeros(self.size, dtype=bool)
+            mask[order[start:stop]] = True
+            return self._pack(mask)
+
+        column = self.columns[field].astype(float)
+        mask = np.ones(self.size, dtype=bool)
+        if low is not None:
+            mask &= column >= low
+        if high is not None:
+            mask &= column <= high if closed else column < high
+        return self._pack(mask)
+
+    def search_ids(self, query: str, fields: Iterable[str] = SEARCH_FIELDS,
+                   mode: str = "substring") -> np.ndarray:
+        """Row ids matching ``query`` in any of ``fields`` via the inverted index
+
+        ``mode`` is ``substring`` (default), ``prefix`` (token prefixes) or
+        ``fuzzy`` (trigram similarity, best match first)
+        """
+        if mode == "prefix":
+            return self.search_index.prefix(query, fields)
+        if mode == "fuzzy":
+            return self.search_index.fuzzy(query, fields)
+        return self.search_index.substring(query, fields)
+
+    def search_bitmap(self, query: str, fields: Iterable[str] = SEARCH_FIELDS,
+                      mode: str = "substring") -> np.ndarray:
+        """Packed bitmap of rows matching ``query`` in any of ``fields``"""
+        mask = np.zeros(self.size, dtype=bool)
+        mask[self.search_ids(query, fields, mode)] = True
+        return self._pack(mask)
+
+    # Query API
+    def select(self, state: Optional[str] = None, subindustry: Optional[str] = None,
+               metro: Optional[str] = None, min_score: Optional[float] = None,
+               max_score: Optional[float] = None, min_revenue: Optional[float] = None,
+               max_revenue: Optional[float] = None, succession_risk: Optional[str] = None,
+               website_status: Optional[str] = None, search: Optional[str] = None,
+               city_keywords: Optional[Iterable[str]] = None,
+               search_mode: str = "substring") -> np.ndarray:
+        """Return matching row ids (in source order); ``None`` skips a filter"""
+        bits = self._all_bits
+
+        if state is not None:
+            bits = bits & self.category_bitmap("state", state)
+        if subindustry is not None:
+            bits = bits & self.category_bitmap("subindustry", subindustry)
+        if metro is not None:
+            bits = bits & self.category_bitmap("metro", metro)
+
+        if min_score is not None or max_score is not None:
+            bits = bits & self.range_bitmap("deal_score", min_score, max_score)
+        if min_revenue is not None or max_revenue is not None:
+            bits = bits & self.range_bitmap("revenue_estimate", min_revenue, max_revenue)
+        if succession_risk in SUCCESSION_BUCKETS:
+            low, high = SUCCESSION_BUCKETS[succession_risk]
+            bits = bits & self.range_bitmap("succession_risk_score", low, high, closed=False)
+
+        if website_status == "has_website":
+            bits = bits & self._website_bits
+        elif website_status == "no_website":
+            bits = bits & ~self._website_bits
+
+        if search:
+            bits = bits & self.search_bitmap(search, mode=search_mode)
+        if city_keywords:
+            city_bits = self._none_bits
+            for keyword in city_keywords:
+                city_bits = city_bits | self.search_bitmap(keyword, fields=("city",))
+            bits = bits & city_bits
+
+        return np.flatnonzero(self._unpack(bits))
+
+    def rank_by_relevance(self, ids: np.ndarray, query: str) -> np.ndarray:
+        """Stable sort of row ids by text relevance to ``query``"""
+        return self.search_index.rank(ids, query)
+
+    def order_by(self, ids: np.ndarray, field: str, descending: bool = True) -> np.ndarray:
+        """Stable sort of row ids by a numeric column"""
+        values = self.columns[field][ids]
+        order = np.argsort(-values if descending else values, kind="stable")
+        return ids[order]
+
+    def column_slice(self, ids: np.ndarray, fields: Optional[Iterable[str]] = None) -> Dict[str, np.ndarray]:
+        """Column arrays restricted to ``ids`` (suitable for a DataFrame)"""
+        return {name: self.columns[name][ids] for name in (fields or self.fields)}
+
+    def rows(self, ids: Iterable[int]) -> List[Dict[str, Any]]:
+        """Materialize only the requested rows back into plain dicts"""
+        ids = np.asarray(ids, dtype=np.int64)
+        if ids.size == 0:
+            return []
+        values = [self.columns[name][ids].tolist() for name in self.fields]
+        return [dict(zip(self.fields, row)) for row in zip(*values)]
@@ -13,23 +13,22 @@ import os
 from datetime import datetime
 import random
 import numpy as np
+from firm_snapshot import FirmSnapshotManager
 
 app = Flask(__name__)
 CORS(app)
 
-# Load the generated firm database
-try:
-    with open('/Users/osirislamon/Documents/GitHub/oc_startup/avilla_firms_database.json', 'r') as f:
-        FIRMS_DATABASE = json.load(f)
-    
-    with open('/Users/osirislamon/Documents/GitHub/oc_startup/avilla_summary_stats.json', 'r') as f:
-        SUMMARY_STATS = json.load(f)
-        
-    print(f"✅ Loaded {len(FIRMS_DATABASE)} firms from database")
-except Exception as e:
-    print(f"❌ Error loading database: {e}")
-    FIRMS_DATABASE = []
-    SUMMARY_STATS = {}
+# Load the generated firm database into a hot-reloadable snapshot
+FIRM_SNAPSHOTS = FirmSnapshotManager(
+    '/Users/osirislamon/Documents/GitHub/oc_startup/avilla_firms_database.json',
+    stats_path='/Users/osirislamon/Documents/GitHub/oc_startup/avilla_summary_stats.json',
+    columnar_path='/Users/osirislamon/Documents/GitHub/oc_startup/avilla_firms_database.bin'
+)
+if FIRM_SNAPSHOTS.last_reload.get('error'):
+    print(f"❌ Error loading database: {FIRM_SNAPSHOTS.last_reload['error']}")
+else:
+    print(f"✅ Loaded {len(FIRM_SNAPSHOTS.current.records)} firms from database")
+FIRM_SNAPSHOTS.start_watcher()
 
 # API Configuration (using your existing keys)
 API_CONFIG = {
@@ -684,14 +683,15 @@ def serve_frontend():
 @app.route('/api/dashboard-stats')
 def get_dashboard_stats():
     """Get comprehensive dashboard statistics"""
+    snapshot = FIRM_SNAPSHOTS.current
     
     # Calculate stats from loaded firms
-    total_firms = len(FIRMS_DATABASE)
-    high_score_firms = len([f for f in FIRMS_DATABASE if f.get('deal_score', 0) >= 80])
-    succession_opportunities = len([f for f in FIRMS_DATABASE if f.get('succession_risk_score', 0) >= 70])
+    total_firms = len(snapshot.records)
+    high_score_firms = len([f for f in snapshot.records if f.get('deal_score', 0) >= 80])
+    succession_opportunities = len([f for f in snapshot.records if f.get('succession_risk_score', 0) >= 70])
     
     # Calculate TAM
-    total_tam = sum(f.get('estimated_ebitda', 0) * f.get('estimated_multiple', 3.0) for f in FIRMS_DATABASE)
+    total_tam = sum(f.get('estimated_ebitda', 0) * f.get('estimated_multiple', 3.0) for f in snapshot.records)
     
     # Product-specific metrics
     oppy_metrics = {
@@ -731,6 +731,7 @@ def get_dashboard_stats():
 @app.route('/api/comprehensive-search', methods=['POST'])
 def comprehensive_search_api():
     """Enhanced comprehensive search with real API integration"""
+    snapshot = FIRM_SNAPSHOTS.current
     
     data = request.get_json()
     industry = data.get('industry', '')
@@ -748,7 +749,7 @@ def comprehensive_search_api():
         census_data = get_census_data(location)
         
         # Filter and score results
-        filtered_firms = filter_firms_by_criteria(FIRMS_DATABASE, buybox_criteria, location)
+        filtered_firms = filter_firms_by_criteria(snapshot.records, buybox_criteria, location)
         
         # Combine with API results
         combined_results = combine_results(filtered_firms, yelp_results, census_data)
@@ -1013,9 +1014,10 @@ def calculate_market_analysis(businesses, industry, location):
 @app.route('/api/avilla-intelligence')
 def avilla_intelligence():
     """Avilla Peak Partners specific intelligence"""
+    snapshot = FIRM_SNAPSHOTS.current
     
     # Filter for accounting firms in MA/FL
-    avilla_firms = [f for f in FIRMS_DATABASE if 
+    avilla_firms = [f for f in snapshot.records if 
                    f.get('state') in ['MA', 'FL'] and 
                    'accounting' in f.get('subindustry', '').lower()]
     
@@ -1089,6 +1091,7 @@ def ybridge_intelligence():
 @app.route('/api/generate-cim', methods=['POST'])
 def generate_cim():
     """Generate AI-powered CIM for a business"""
+    snapshot = FIRM_SNAPSHOTS.current
     
     data = request.get_json()
     business_id = data.get('business_id')
@@ -1097,7 +1100,7 @@ def generate_cim():
         return jsonify({'error': 'Business ID required'}), 400
     
     # Find business
-    business = next((f for f in FIRMS_DATABASE if f.get('firm_id') == business_id), None)
+    business = next((f for f in snapshot.records if f.get('firm_id') == business_id), None)
     
     if not business:
         return jsonify({'error': 'Business not found'}), 404
@@ -1206,8 +1209,9 @@ def lbo_analysis():
 @app.route('/api/market-heatmap/<state>')
 def get_market_heatmap(state):
     """Get heatmap data for specific state"""
+    snapshot = FIRM_SNAPSHOTS.current
     
-    state_firms = [f for f in FIRMS_DATABASE if f.get('state', '').upper() == state.upper()]
+    state_firms = [f for f in snapshot.records if f.get('state', '').upper() == state.upper()]
     
     # Group by zip code
     zip_data = {}
@@ -1266,14 +1270,15 @@ def get_market_heatmap(state):
 @app.route('/api/stats')
 def get_enhanced_stats():
     """Enhanced dashboard statistics"""
+    snapshot = FIRM_SNAPSHOTS.current
     
     base_stats = {
-        'total_firms': len(FIRMS_DATABASE),
-        'high_score_firms': len([f for f in FIRMS_DATABASE if f.get('deal_score', 0) >= 80]),
-        'succession_opportunities': len([f for f in FIRMS_DATABASE if f.get('succession_risk_score', 0) >= 70]),
-        'avg_deal_score': sum(f.get('deal_score', 0) for f in FIRMS_DATABASE) / len(FIRMS_DATABASE) if FIRMS_DATABASE else 0,
-        'ma_firms': len([f for f in FIRMS_DATABASE if f.get('state') == 'MA']),
-        'fl_firms': len([f for f in FIRMS_DATABASE if f.get('state') == 'FL']),
+        'total_firms': len(snapshot.records),
+        'high_score_firms': len([f for f in snapshot.records if f.get('deal_score', 0) >= 80]),
+        'succession_opportunities': len([f for f in snapshot.records if f.get('succession_risk_score', 0) >= 70]),
+        'avg_deal_score': sum(f.get('deal_score', 0) for f in snapshot.records) / len(snapshot.records) if snapshot.records else 0,
+        'ma_firms': len([f for f in snapshot.records if f.get('state') == 'MA']),
+        'fl_firms': len([f for f in snapshot.records if f.get('state') == 'FL']),
         'last_updated': datetime.now().isoformat()
     }
     
@@ -1288,7 +1293,7 @@ def get_enhanced_stats():
     }
     
     base_stats['market_intelligence'] = {
-        'total_tam': sum(f.get('estimated_ebitda', 0) * f.get('estimated_multiple', 3.0) for f in FIRMS_DATABASE),
+        'total_tam': sum(f.get('estimated_ebitda', 0) * f.get('estimated_multiple', 3.0) for f in snapshot.records),
         'fragmented_markets': 47,
         'consolidation_opportunities': 234
     }
@@ -1298,6 +1303,7 @@ def get_enhanced_stats():
 @app.route('/api/firms')
 def get_enhanced_firms():
     """Enhanced firms endpoint with better filtering"""
+    snapshot = FIRM_SNAPSHOTS.current
     
     # Get query parameters
     page = int(request.args.get('page', 1))
@@ -1307,7 +1313,7 @@ def get_enhanced_firms():
     industry = request.args.get('industry', 'all')
     
     # Filter firms
-    filtered_firms = FIRMS_DATABASE.copy()
+    filtered_firms = snapshot.records.copy()
     
     if state != 'all':
         filtered_firms = [f for f in filtered_firms if f.get('state') == state]
@@ -1322,12 +1328,13 @@ def get_enhanced_firms():
     total_firms = len(filtered_firms)
     start_idx = (page - 1) * per_page
     end_idx = start_idx + per_page
-    paginated_firms = filtered_firms[start_idx:end_idx]
+    # Copy the page so the shared snapshot records stay immutable
+    paginated_firms = [dict(f) for f in filtered_firms[start_idx:end_idx]]
     
     # Add market context
     for firm in paginated_firms:
         firm['market_context'] = {
-            'rank_in_state': get_firm_rank_in_state(firm),
+            'rank_in_state': get_firm_rank_in_state(firm, snapshot.records),
             'succession_probability': calculate_succession_probability(firm),
             'acquisition_readiness': calculate_acquisition_readiness(firm)
         }
@@ -1346,9 +1353,9 @@ def get_enhanced_firms():
         }
     })
 
-def get_firm_rank_in_state(firm):
+def get_firm_rank_in_state(firm, firms):
     """Calculate firm's rank within its state"""
-    same_state_firms = [f for f in FIRMS_DATABASE if f.get('state') == firm.get('state')]
+    same_state_firms = [f for f in firms if f.get('state') == firm.get('state')]
     sorted_firms = sorted(same_state_firms, key=lambda x: x.get('deal_score', 0), reverse=True)
     
     try:
@@ -1400,7 +1407,7 @@ def calculate_acquisition_readiness(firm):
 
 if __name__ == '__main__':
     print(f"🚀 Starting Okapiq Integrated Platform...")
-    print(f"📊 Loaded {len(FIRMS_DATABASE)} firms")
+    print(f"📊 Loaded {len(FIRM_SNAPSHOTS.current.records)} firms")
     print(f"🌐 Frontend: http://localhost:5000")
     print(f"📡 API endpoints: http://localhost:5000/api/*")
     print(f"🎯 Client dashboards: /api/avilla-intelligence, /api/ybridge-intelligence")
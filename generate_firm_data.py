@@ -9,6 +9,8 @@ import csv
 from typing import List, Dict
 import uuid
 
+from firm_columnar import write_columnar_snapshot
+
 # Real zip codes with demographic data
 MA_ZIP_CODES = [
     # Greater Boston
@@ -371,6 +373,9 @@ def save_firms_to_files(firms: List[Dict]):
     with open('/Users/osirislamon/Documents/GitHub/oc_startup/avilla_firms_database.json', 'w') as f:
         json.dump(firms, f, indent=2)
     
+    # Save as a columnar snapshot (memory-mappable, with derived fields) for fast server startup
+    write_columnar_snapshot(firms, '/Users/osirislamon/Documents/GitHub/oc_startup/avilla_firms_database.bin')
+    
     # Save as CSV
     csv_fields = [
         'firm_id', 'name', 'owner_name', 'owner_age_estimate', 'address', 'city', 'state', 
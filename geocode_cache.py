@@ -0,0 +1,242 @@
+"""
+Shared, persistent geocode cache
+Addresses are normalized and their coordinates kept in a SQLite file shared
+by every process, including "not found" answers so failing addresses are
+not retried all day.  Bare ZIP codes and "City, ST" strings resolve offline
+from the bundled geo_centroids.csv before any geocoding service is asked,
+and when a service is unavailable the same table gives an approximate fix.
+"""
+
+import asyncio
+import csv
+import logging
+import os
+import re
+import sqlite3
+import threading
+import time
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CACHE_PATH = os.getenv("GEOCODE_CACHE_PATH", "geocode_cache.db")
+CENTROIDS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "geo_centroids.csv")
+
+# Found addresses barely move; "not found" is retried daily and service errors after a few minutes
+POSITIVE_TTL_SECONDS = 180 * 86400
+NEGATIVE_TTL_SECONDS = 86400
+ERROR_TTL_SECONDS = 300
+
+# GEOCODE_OFFLINE=true never calls a geocoding service
+OFFLINE = os.getenv("GEOCODE_OFFLINE", "false").lower() == "true"
+
+ZIP_PATTERN = re.compile(r"\b(\d{5})(?:-\d{4})?\b")
+COUNTRY_SUFFIX = re.compile(r"\s+(usa|us|united states( of america)?)$")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS geocodes (
+    key TEXT PRIMARY KEY,
+    found INTEGER NOT NULL,
+    lat REAL,
+    lng REAL,
+    formatted_address TEXT,
+    source TEXT,
+    precision TEXT,
+    expires_at REAL NOT NULL
+);
+"""
+
+# Async geocoder: address -> {"lat", "lng", "formatted_address"}, None when not found; raises on service errors
+Geocoder = Callable[[str], Awaitable[Optional[Dict[str, Any]]]]
+
+
+def normalize_address(address: str) -> str:
+    """Cache key for an address - case, punctuation, spacing and country suffix insensitive"""
+    text = re.sub(r"[^\w\s#-]", " ", address.lower())
+    text = " ".join(text.split())
+    return COUNTRY_SUFFIX.sub("", text)
+
+
+def load_centroids(path: str = CENTROIDS_PATH) -> Tuple[Dict[str, Dict[str, Any]], Dict[str, Dict[str, Any]]]:
+    """ZIP and normalized "city st" centroids from a kind,key,city,state,lat,lng CSV"""
+    zips: Dict[str, Dict[str, Any]] = {}
+    cities: Dict[str, Dict[str, Any]] = {}
+    try:
+        with open(path, newline="") as f:
+            for row in csv.DictReader(f):
+                entry = {"lat": float(row["lat"]), "lng": float(row["lng"]), "city": row["city"], "state": row["state"]}
+                if row["kind"] == "zip":
+                    entry["formatted_address"] = f"{row['city']}, {row['state']} {row['key']}, United States"
+                    entry["precision"] = "zip"
+                    zips[row["key"]] = entry
+                else:
+                    entry["formatted_address"] = f"{row['city']}, {row['state']}, United States"
+                    entry["precision"] = "city"
+                    cities.setdefault(normalize_address(f"{row['city']} {row['state']}"), entry)
+    except (OSError, KeyError, ValueError) as e:
+        logger.warning(f"Geo centroid table unavailable ({path}): {e}")
+    return zips, cities
+
+
+class GeocodeCache:
+    """SQLite geocode cache in front of the centroid table and an optional geocoding service"""
+
+    def __init__(self, path: str = DEFAULT_CACHE_PATH, centroids_path: str = CENTROIDS_PATH, offline: bool = OFFLINE):
+        self.path = path
+        self.offline = offline
+        self.zip_centroids, self.city_centroids = load_centroids(centroids_path)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._lock = threading.Lock()
+        with self._lock, self._conn:
+            if path != ":memory:":
+                self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.executescript(SCHEMA)
+        self.stats = {"cache_hits": 0, "negative_hits": 0, "seed_hits": 0, "remote_lookups": 0, "approximate": 0}
+
+    def _cached(self, keys: List[str]) -> Dict[str, Optional[Dict[str, Any]]]:
+        """Fresh cache rows for ``keys`` - a dict for found addresses, None for cached failures"""
+        now = time.time()
+        rows = {}
+        with self._lock:
+            # Stay under SQLite's bound-parameter limit
+            for start in range(0, len(keys), 500):
+                chunk = keys[start:start + 500]
+                rows.update((row[0], row) for row in self._conn.execute(
+                    "SELECT key, found, lat, lng, formatted_address, source, precision, expires_at "
+                    f"FROM geocodes WHERE key IN ({','.join('?' * len(chunk))})", chunk
+                ))
+        return {
+            key: {"lat": lat, "lng": lng, "formatted_address": formatted, "source": source, "precision": precision}
+            if found else None
+            for key, found, lat, lng, formatted, source, precision, expires_at in rows.values()
+            if expires_at > now
+        }
+
+    def _store(self, entries: Iterable[Tuple[str, Optional[Dict[str, Any]], float]]):
+        """Write (key, location or None, ttl) rows in one transaction"""
+        now = time.time()
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO geocodes (key, found, lat, lng, formatted_address, source, precision, expires_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                [(key, int(location is not None),
+                  location and location["lat"], location and location["lng"],
+                  location and location.get("formatted_address"), location and location.get("source"),
+                  location and location.get("precision"), now + ttl)
+                 for key, location, ttl in entries]
+            )
+
+    def seed_lookup(self, address: str, exact: bool = True) -> Optional[Dict[str, Any]]:
+        """Centroid for an address that is just a ZIP or "City, ST" (``exact``) or merely contains one"""
+        key = normalize_address(address)
+        if exact:
+            zip_match = ZIP_PATTERN.fullmatch(key)
+            location = self.zip_centroids.get(zip_match.group(1)) if zip_match else self.city_centroids.get(key)
+            if location is None:
+                # "City, ST 12345" and "12345, City, ST" are as precise as the ZIP itself
+                zip_match = ZIP_PATTERN.search(key)
+                if zip_match and normalize_address(ZIP_PATTERN.sub(" ", key)) in self.city_centroids:
+                    location = self.zip_centroids.get(zip_match.group(1))
+        else:
+            zip_match = ZIP_PATTERN.search(key)
+            location = self.zip_centroids.get(zip_match.group(1)) if zip_match else None
+            if location is None:
+                # Longest city name mentioned in the address, e.g. "12 Main St, Miami Beach, FL"
+                padded = f" {key} "
+                matches = [city for city in self.city_centroids if f" {city} " in padded]
+                if not matches:
+                    # City named without its state, e.g. "Downtown Dallas"
+                    matches = [city for city, entry in self.city_centroids.items()
+                               if f" {normalize_address(entry['city'])} " in padded]
+                location = self.city_centroids[max(matches, key=len)] if matches else None
+        return {**location, "source": "seed"} if location else None
+
+    async def resolve(self, address: str, geocoder: Optional[Geocoder] = None) -> Optional[Dict[str, Any]]:
+        """Coordinates for one address (see ``resolve_many``)"""
+        return (await self.resolve_many([address], geocoder)).get(address)
+
+    async def resolve_many(self, addresses: Iterable[str], geocoder: Optional[Geocoder] = None,
+                           concurrency: int = 8) -> Dict[str, Optional[Dict[str, Any]]]:
+        """Coordinates for many addresses: cache, then the centroid table, then ``geocoder``
+
+        Addresses are deduplicated by normalized key and the cache is read in
+        one query.  Whatever the geocoder cannot place (or every remaining
+        address when offline) falls back to a centroid the address mentions.
+        Results are dicts with lat, lng, formatted_address, source and precision.
+        """
+        by_key: Dict[str, List[str]] = {}
+        for address in addresses:
+            if address:
+                by_key.setdefault(normalize_address(address), []).append(address)
+
+        resolved: Dict[str, Optional[Dict[str, Any]]] = {}
+        cached = self._cached(list(by_key))
+        for key, location in cached.items():
+            resolved[key] = location
+            self.stats["cache_hits" if location else "negative_hits"] += 1
+
+        pending = []
+        for key, originals in by_key.items():
+            if key in resolved:
+                continue
+            location = self.seed_lookup(originals[0])
+            if location is not None:
+                resolved[key] = location
+                self.stats["seed_hits"] += 1
+            else:
+                pending.append(key)
+
+        if pending and geocoder is not None and not self.offline:
+            limit = asyncio.Semaphore(concurrency)
+
+            async def lookup(key: str) -> Tuple[str, Optional[Dict[str, Any]], float]:
+                async with limit:
+                    try:
+                        location = await geocoder(by_key[key][0])
+                    except Exception as e:
+                        logger.error(f"Geocoding error for {by_key[key][0]}: {e}")
+                        return key, None, ERROR_TTL_SECONDS
+                if location is None:
+                    return key, None, NEGATIVE_TTL_SECONDS
+                return key, {"source": "remote", "precision": "address", **location}, POSITIVE_TTL_SECONDS
+
+            self.stats["remote_lookups"] += len(pending)
+            entries = await asyncio.gather(*[lookup(key) for key in pending])
+            self._store(entries)
+            resolved.update((key, location) for key, location, _ in entries)
+
+        # Approximate fallback for anything still unplaced (not cached - a later online run may do better)
+        for key, originals in by_key.items():
+            if resolved.get(key) is None:
+                location = self.seed_lookup(originals[0], exact=False)
+                if location is not None:
+                    resolved[key] = location
+                    self.stats["approximate"] += 1
+
+        return {address: resolved.get(key) for key, originals in by_key.items() for address in originals}
+
+    def cache_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            entries, failures = self._conn.execute("SELECT COUNT(*), COUNT(*) - SUM(found) FROM geocodes").fetchone()
+        return {
+            "path": self.path,
+            "entries": entries,
+            "negative_entries": failures or 0,
+            "zip_centroids": len(self.zip_centroids),
+            "city_centroids": len(self.city_centroids),
+            "offline": self.offline,
+            **self.stats
+        }
+
+
+_shared: Optional[GeocodeCache] = None
+_shared_lock = threading.Lock()
+
+
+def shared_geocode_cache() -> GeocodeCache:
+    """Process-wide cache on GEOCODE_CACHE_PATH, opened on first use"""
+    global _shared
+    with _shared_lock:
+        if _shared is None:
+            _shared = GeocodeCache()
+        return _shared
@@ -0,0 +1,151 @@
+"""
+Compact heatmap grids
+A heatmap is a regular lat/lng lattice, so it is sent as its bounds and step
+plus one typed array per metric (base64 float32, or uint8 when quantized)
+instead of per-point dicts or a serialized Plotly figure.  Clients rebuild
+cell coordinates from the bounds; the Plotly figure is built only on request.
+"""
+
+import base64
+import json
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterable, Optional
+
+import numpy as np
+
+# uint8 layers map min..max onto 0..254; 255 marks a cell with no data
+QUANTIZED_LEVELS = 254
+QUANTIZED_MISSING = 255
+
+
+@dataclass
+class HeatmapGrid:
+    """Metric layers over a rows x cols lattice, row 0 at ``south`` and column 0 at ``west``"""
+    south: float
+    west: float
+    lat_step: float
+    lng_step: float
+    layers: Dict[str, np.ndarray] = field(default_factory=dict)
+
+    @property
+    def shape(self):
+        return next(iter(self.layers.values())).shape if self.layers else (0, 0)
+
+    def coordinates(self):
+        """Latitude of each row and longitude of each column"""
+        rows, cols = self.shape
+        return self.south + self.lat_step * np.arange(rows), self.west + self.lng_step * np.arange(cols)
+
+    @classmethod
+    def from_cells(cls, cells: Iterable[Dict[str, Any]], rows: int, cols: int, south: float, west: float,
+                   lat_step: float, lng_step: float, layer_keys: Dict[str, str]) -> "HeatmapGrid":
+        """Grid from cell dicts with ``row``/``col``; cells that never arrived are NaN"""
+        layers = {name: np.full((rows, cols), np.nan, dtype=np.float32) for name in layer_keys}
+        for cell in cells:
+            for name, key in layer_keys.items():
+                layers[name][cell["row"], cell["col"]] = cell[key]
+        return cls(south, west, lat_step, lng_step, layers)
+
+    def to_payload(self, quantize: bool = False) -> Dict[str, Any]:
+        """JSON-ready grid: bounds, step and each layer as a base64 little-endian typed array (row-major)"""
+        rows, cols = self.shape
+        lats, lngs = self.coordinates()
+        payload = {
+            "rows": rows,
+            "cols": cols,
+            "bounds": {
+                "south": round(float(self.south), 6),
+                "west": round(float(self.west), 6),
+                "north": round(float(lats[-1]), 6) if rows else None,
+                "east": round(float(lngs[-1]), 6) if cols else None
+            },
+            "step": {"lat": float(self.lat_step), "lng": float(self.lng_step)},
+            "layers": {}
+        }
+        for name, values in self.layers.items():
+            values = np.asarray(values, dtype=np.float32)
+            known = values[np.isfinite(values)]
+            low = float(known.min()) if known.size else 0.0
+            high = float(known.max()) if known.size else 0.0
+            layer = {"min": low, "max": high}
+            if quantize:
+                scale = (high - low) / QUANTIZED_LEVELS or 1.0
+                levels = np.rint((np.nan_to_num(values, nan=low) - low) / scale)
+                data = np.where(np.isfinite(values), levels, QUANTIZED_MISSING).astype(np.uint8)
+                layer.update({"dtype": "uint8", "scale": scale, "missing": QUANTIZED_MISSING})
+            else:
+                data = values.astype("<f4")
+                layer["dtype"] = "float32"
+            layer["data"] = base64.b64encode(data.tobytes()).decode("ascii")
+            payload["layers"][name] = layer
+        return payload
+
+    def plotly_json(self, layer: str, title: str = "Business Opportunity Heatmap",
+                    colorbar_title: str = "Opportunity Score") -> str:
+        """Plotly density map figure of one layer, as JSON"""
+        lats, lngs = self.coordinates()
+        lat_grid, lng_grid = np.meshgrid(lats, lngs, indexing="ij")
+        values = np.asarray(self.layers[layer], dtype=float)
+        known = np.isfinite(values)
+        figure = {
+            "data": [{
+                "type": "densitymapbox",
+                "lat": lat_grid[known].round(6).tolist(),
+                "lon": lng_grid[known].round(6).tolist(),
+                "z": values[known].round(4).tolist(),
+                "radius": 20,
+                "colorscale": "Viridis",
+                "showscale": True,
+                "colorbar": {"title": colorbar_title}
+            }],
+            "layout": {
+                "mapbox": {
+                    "style": "open-street-map",
+                    "center": {"lat": float(lats.mean()), "lon": float(lngs.mean())},
+                    "zoom": 10
+                },
+                "height": 600,
+                "title": title
+            }
+        }
+        return json.dumps(figure)
+
+
+def decode_layer(payload: Dict[str, Any], name: str) -> np.ndarray:
+    """A layer of a ``to_payload`` grid back as a rows x cols float array (NaN where no data)"""
+    layer = payload["layers"][name]
+    raw = base64.b64decode(layer["data"])
+    if layer["dtype"] == "uint8":
+        levels = np.frombuffer(raw, dtype=np.uint8)
+        values = np.where(levels == layer["missing"], np.nan, layer["min"] + levels * layer["scale"])
+    else:
+        values = np.frombuffer(raw, dtype="<f4").astype(float)
+    return values.reshape(payload["rows"], payload["cols"])
+
+
+def sample_opportunity_grid(center_coords: Dict[str, float], size: int = 11, step: float = 0.02,
+                            rng: Optional[np.random.Generator] = None) -> HeatmapGrid:
+    """Simulated density/TAM/TSM/succession/digital-gap layers around a center (demo data)"""
+    rng = rng or np.random.default_rng()
+    shape = (size, size)
+    density = np.maximum(0, rng.normal(0.5, 0.2, shape))
+    tam_value = rng.uniform(1e6, 10e6, shape)  # $1M - $10M TAM per point
+    tsm_value = tam_value * rng.uniform(0.1, 0.3, shape)  # 10-30% of TAM
+    succession_risk = rng.uniform(0.2, 0.8, shape)
+    digital_gap = rng.uniform(0.3, 0.9, shape)
+    half = (size - 1) / 2
+    return HeatmapGrid(
+        south=center_coords["lat"] - half * step,
+        west=center_coords["lng"] - half * step,
+        lat_step=step,
+        lng_step=step,
+        layers={
+            "business_density": density,
+            "tam_potential": tam_value,
+            "tsm_opportunity": tsm_value,
+            "succession_risk": succession_risk,
+            "digital_gaps": digital_gap,
+            "opportunity": succession_risk * 0.4 + digital_gap * 0.3 + density * 0.3,
+            "business_count": np.floor(density * 20)  # Estimate business count
+        }
+    )
@@ -0,0 +1,82 @@
+"""
+Conditional GET support for the polled dashboard endpoints
+ETags are derived from the firm snapshot version and a fingerprint of the
+request path and query string, so a repeat poll is answered with
+304 Not Modified before any filtering or JSON serialization happens.
+"""
+
+import hashlib
+import threading
+from collections import OrderedDict
+from functools import wraps
+from typing import Any, Callable, Hashable, Optional
+
+from flask import Response, make_response, request
+
+
+class LRUCache:
+    """Small thread-safe LRU mapping"""
+
+    def __init__(self, max_entries: int = 256):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Hashable, Any]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        with self._lock:
+            if key not in self._entries:
+                return default
+            self._entries.move_to_end(key)
+            return self._entries[key]
+
+    def put(self, key: Hashable, value: Any):
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+def request_fingerprint() -> str:
+    """Stable hash of the request path and its (sorted) query arguments"""
+    args = sorted(request.args.items(multi=True))
+    return hashlib.sha1(repr((request.path, args)).encode()).hexdigest()
+
+
+def conditional_get(version: Callable[[], str], body_cache: Optional[LRUCache] = None):
+    """Decorate a GET view with ETag / If-None-Match handling
+
+    ``version`` returns the identity of the data the view reads; when it
+    changes every ETag changes with it.  Rendered 200 bodies are optionally
+    kept in ``body_cache`` so clients without an ETag skip re-rendering too.
+    """
+    def decorator(f):
+        @wraps(f)
+        def decorated_function(*args, **kwargs):
+            data_version = version()
+            etag = hashlib.sha1(f"{data_version}:{request_fingerprint()}".encode()).hexdigest()[:24]
+
+            if request.if_none_match.contains_weak(etag):
+                response = Response(status=304)
+                response.set_etag(etag)
+                return response
+
+            cached = body_cache.get(etag) if body_cache is not None else None
+            if cached is not None:
+                response = Response(cached, mimetype="application/json")
+            else:
+                response = make_response(f(*args, **kwargs))
+                # A reload mid-request means the body may not match this ETag
+                if response.status_code != 200 or version() != data_version:
+                    return response
+                if body_cache is not None and not response.is_streamed:
+                    body_cache.put(etag, response.get_data())
+
+            response.set_etag(etag)
+            response.headers["Cache-Control"] = "no-cache"
+            return response
+        return decorated_function
+    return decorator
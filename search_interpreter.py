@@ -0,0 +1,238 @@
+"""
+Natural-language query interpretation for /api/ai-search
+A deterministic rule parser handles the common "CPA firms in Boston over
+$2M" style of query; anything it cannot fully account for goes to the LLM,
+whose answers are kept in a normalized-query LRU that can persist to disk.
+"""
+
+import json
+import os
+import re
+import tempfile
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+STATE_NAMES = {
+    "ma": "MA",
+    "mass": "MA",
+    "massachusetts": "MA",
+    "fl": "FL",
+    "fla": "FL",
+    "florida": "FL",
+}
+
+# Keyword stems -> subindustry as stored in the firm database
+SUBINDUSTRY_KEYWORDS = {
+    "cpa": "CPA Firms",
+    "cpas": "CPA Firms",
+    "tax": "Tax Preparation",
+    "taxes": "Tax Preparation",
+    "bookkeeping": "Bookkeeping Services",
+    "bookkeeper": "Bookkeeping Services",
+    "bookkeepers": "Bookkeeping Services",
+    "payroll": "Payroll Services",
+    "forensic": "Forensic Accounting",
+    "estate": "Estate Planning",
+}
+
+# Checked in order - the bare "succession" catch-all must come last
+SUCCESSION_PHRASES = [
+    (r"\blow succession( risk)?\b", "low"),
+    (r"\b(medium|moderate) succession( risk)?\b", "medium"),
+    (r"\b(high|strong) succession( risk)?\b|\bretir\w*\b|\bsuccession\b|\b(older|aging) owners?\b", "high"),
+]
+
+WEBSITE_PHRASES = [
+    (r"\b(without|no|missing|lacking)( a)? websites?\b", "no_website"),
+    (r"\b(with|has|having)( a)? websites?\b", "has_website"),
+]
+
+# Longest units first so "million" is not read as "m" plus a stray "illion"
+UNIT_WORDS = "billion|million|mil|bn|mm|k|m|b"
+UNIT = rf"({UNIT_WORDS})"
+# A revenue amount needs a "$" or a unit - "over 2" is not a revenue filter
+AMOUNT = rf"(?=\$|\d+(?:\.\d+)?\s*(?:{UNIT_WORDS})\b)\$?\s*(\d+(?:\.\d+)?)\s*{UNIT}?\b"
+UNITS = {"k": 1e3, "m": 1e6, "mm": 1e6, "mil": 1e6, "million": 1e6, "b": 1e9, "bn": 1e9, "billion": 1e9}
+
+# Words that carry no filter meaning in a firm search
+STOPWORDS = {
+    "a", "accounting", "accountants", "all", "an", "and", "any", "are", "area", "at", "based", "businesses",
+    "companies", "company", "find", "firm", "firms", "for", "from", "get", "give", "in", "list", "located",
+    "me", "near", "of", "offices", "on", "or", "owner", "owners", "practice", "practices", "preparation", "preparers", "revenue",
+    "revenues", "risk", "sales", "search", "services", "show", "that", "the", "to", "top", "with", "which",
+    "who", "planning", "annual", "per", "year", "plus", "than", "more", "less",
+}
+
+
+def normalize_query(query: str) -> str:
+    """Cache key for a query - case, punctuation and spacing insensitive"""
+    text = query.lower().replace(",", "")
+    text = re.sub(r"[^\w$.+\s]", " ", text)
+    return " ".join(text.split()).strip(".")
+
+
+def _amount(number: str, unit: Optional[str]) -> int:
+    return int(float(number) * UNITS.get(unit or "", 1))
+
+
+class RuleBasedParser:
+    """Deterministic parser for states, cities, revenue, score, subindustry and succession terms"""
+
+    def __init__(self, cities: Dict[str, str], subindustries: Iterable[str]):
+        # City name (lower) -> state, longest names first so "north miami beach" wins over "miami"
+        self.cities = dict(sorted(cities.items(), key=lambda item: -len(item[0])))
+        self.subindustries = {s.lower(): s for s in subindustries}
+
+    @classmethod
+    def from_store(cls, store) -> "RuleBasedParser":
+        cities: Dict[str, str] = {}
+        if "city" in store.columns and "state" in store.columns:
+            for city, state in zip(store.columns["city"].tolist(), store.columns["state"].tolist()):
+                if city:
+                    cities.setdefault(city.lower(), state)
+        if "metro" in store.columns and "state" in store.columns:
+            for metro, state in zip(store.columns["metro"].tolist(), store.columns["state"].tolist()):
+                if metro:
+                    cities.setdefault(metro.lower(), state)
+        subindustries = store.category_codes.get("subindustry", ([], None))[0]
+        return cls(cities, subindustries)
+
+    def parse(self, query: str) -> Optional[Dict[str, Any]]:
+        """Search params for ``query``, or ``None`` when any part of it is not understood"""
+        text = f" {normalize_query(query)} "
+        params: Dict[str, Any] = {}
+
+        def consume(pattern: str) -> Optional[re.Match]:
+            nonlocal text
+            match = re.search(pattern, text)
+            if match:
+                text = text[:match.start()] + " " + text[match.end():]
+            return match
+
+        # Deal score first so "score over 80" is never read as revenue
+        match = consume(r"\b(?:deal )?score (?:of )?(?:over|above|at least|>=?)\s*(\d+)\b|\b(\d+)\+? (?:deal )?score\b")
+        if match:
+            params["min_deal_score"] = int(match.group(1) or match.group(2))
+
+        # Revenue ranges and bounds
+        # "between 1 and 2 million": a bare lower bound takes the upper bound's unit
+        match = consume(rf"\bbetween (\$)?\s*(\d+(?:\.\d+)?)\s*{UNIT}?\b (?:and|to|-) {AMOUNT}")
+        if match:
+            lower_unit = match.group(3) or (None if match.group(1) else match.group(5))
+            params["min_revenue"] = _amount(match.group(2), lower_unit)
+            params["max_revenue"] = _amount(match.group(4), match.group(5))
+        match = consume(rf"\b(?:over|above|more than|greater than|at least|min(?:imum)?|>=?)\s*{AMOUNT}")
+        if match:
+            params["min_revenue"] = _amount(match.group(1), match.group(2))
+        match = consume(rf"\b(?:under|below|less than|at most|max(?:imum)?|<=?)\s*{AMOUNT}")
+        if match:
+            params["max_revenue"] = _amount(match.group(1), match.group(2))
+        match = consume(rf"\$\s*(\d+(?:\.\d+)?)\s*{UNIT}?\s*\+")
+        if match:
+            params["min_revenue"] = _amount(match.group(1), match.group(2))
+
+        for pattern, value in WEBSITE_PHRASES:
+            if consume(pattern):
+                params["website_status"] = value
+                break
+        for pattern, value in SUCCESSION_PHRASES:
+            if consume(pattern):
+                params["succession_risk"] = value
+                break
+
+        # Subindustries: full names first, then keyword stems
+        for name, subindustry in self.subindustries.items():
+            if consume(rf"\b{re.escape(name)}\b"):
+                params["subindustry"] = subindustry
+                break
+        if "subindustry" not in params:
+            for keyword, subindustry in SUBINDUSTRY_KEYWORDS.items():
+                if subindustry in self.subindustries.values() and consume(rf"\b{keyword}\b"):
+                    params["subindustry"] = subindustry
+                    break
+
+        # Cities imply their state; explicit states override
+        city_keywords = []
+        for city, state in self.cities.items():
+            if consume(rf"\b{re.escape(city)}\b"):
+                city_keywords.append(city.title())
+                params["state"] = state
+        if city_keywords:
+            params["city_keywords"] = city_keywords
+        for name, state in STATE_NAMES.items():
+            if consume(rf"\b{name}\b"):
+                params["state"] = state
+
+        leftover = [word for word in text.split() if word not in STOPWORDS]
+        if leftover or not params:
+            return None
+
+        params["additional_context"] = "Parsed by rules: " + ", ".join(f"{k}={v}" for k, v in params.items())
+        return params
+
+
+class QueryInterpreter:
+    """Rule fast path, then a normalized-query LRU, then the LLM"""
+
+    def __init__(self, llm: Callable[[str], Optional[Dict[str, Any]]], max_entries: int = 1024,
+                 cache_path: Optional[str] = None):
+        self.llm = llm
+        self.max_entries = max_entries
+        self.cache_path = cache_path
+        self._cache: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._save_lock = threading.Lock()
+        if cache_path and os.path.exists(cache_path):
+            try:
+                with open(cache_path, "r") as f:
+                    self._cache.update(json.load(f))
+            except (OSError, ValueError) as e:
+                print(f"Query cache load error: {e}")
+
+    def _remember(self, key: str, params: Dict[str, Any]):
+        with self._lock:
+            self._cache[key] = params
+            self._cache.move_to_end(key)
+            while len(self._cache) > self.max_entries:
+                self._cache.popitem(last=False)
+        if self.cache_path:
+            self._save()
+
+    def _save(self):
+        """Write the cache to ``cache_path`` - one writer at a time, newest snapshot last"""
+        with self._save_lock:
+            with self._lock:
+                snapshot = dict(self._cache)
+            directory = os.path.dirname(os.path.abspath(self.cache_path))
+            try:
+                # Unique temp file, so other processes sharing the path never write into ours
+                fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=f".{os.path.basename(self.cache_path)}.")
+                try:
+                    with os.fdopen(fd, "w") as f:
+                        json.dump(snapshot, f)
+                    os.replace(tmp_path, self.cache_path)
+                except BaseException:
+                    os.unlink(tmp_path)
+                    raise
+            except OSError as e:
+                print(f"Query cache save error: {e}")
+
+    def interpret(self, query: str, parser: Optional[RuleBasedParser] = None) -> Tuple[Optional[Dict[str, Any]], str]:
+        """Search params for ``query`` and the path that produced them (rules, cache or llm)"""
+        if parser is not None:
+            params = parser.parse(query)
+            if params is not None:
+                return params, "rules"
+
+        key = normalize_query(query)
+        with self._lock:
+            cached = self._cache.get(key)
+            if cached is not None:
+                self._cache.move_to_end(key)
+                return dict(cached), "cache"
+
+        params = self.llm(query)
+        if params is not None:
+            self._remember(key, params)
+        return params, "llm"
@@ -15,21 +15,32 @@ FEATURES:
 """
 
 import os
+import io
 import json
+import hashlib
+import time
 import numpy as np
 import pandas as pd
 import logging
 import asyncio
 import aiohttp
 from datetime import datetime, timedelta
-from typing import Dict, List, Optional, Any, Tuple, Union
-from dataclasses import dataclass, asdict, field
+from typing import AsyncIterator, Dict, List, Optional, Any, Tuple, Union
+from dataclasses import MISSING, dataclass, asdict, field, fields, replace
 from enum import Enum
 import re
-from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+import multiprocessing
+import pickle
+import uuid
 import requests
 from openai import OpenAI
 
+from enrichment_cache import TTLCache
+from valuation_cache import ValuationResultCache
+from valuation_store import ValuationStore
+
 # Enhanced imports
 try:
     from scipy import stats
@@ -38,10 +49,29 @@ try:
 except ImportError:
     SCIPY_AVAILABLE = False
 
+try:
+    from scipy.stats import qmc
+    QMC_AVAILABLE = True
+except ImportError:
+    QMC_AVAILABLE = False
+
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Bump whenever valuation math or priors change - invalidates cached results and seeds
+ENGINE_VERSION = "1.2.0"
+
+def _canonical(value: Any) -> Any:
+    """Numbers as floats so 50000 and 50000.0 fingerprint the same"""
+    if isinstance(value, dict):
+        return {key: _canonical(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_canonical(item) for item in value]
+    if isinstance(value, (int, float, np.number)) and not isinstance(value, bool):
+        return float(value)
+    return value
+
 class BusinessCategory(Enum):
     """Business category enumeration"""
     HVAC = "HVAC"
@@ -199,33 +229,252 @@ CATEGORY_PRIORS = {
     )
 }
 
+# Per-source enrichment timeouts (seconds); a source that misses its deadline counts as unavailable
+ENRICHMENT_TIMEOUTS = {"yelp": 5.0, "census": 8.0, "trends": 8.0, "competition": 20.0}
+
+# Signal field <- response key filled in by each enrichment source
+ENRICHMENT_FIELDS = {
+    "yelp": {"R_total": "review_count", "stars": "rating"},
+    "census": {"median_income": "median_income", "population": "population"},
+    "trends": {"trends_now": "current_interest"},
+    "competition": {"competitors_density": "density"}
+}
+
+# Shared across engine instances: Census by geography, trends by (category, geo, ISO week),
+# LLM answers by prompt hash
+CENSUS_CACHE = TTLCache(ttl_seconds=30 * 86400, max_entries=50000)
+TRENDS_CACHE = TTLCache(ttl_seconds=7 * 86400, max_entries=10000)
+LLM_CACHE = TTLCache(ttl_seconds=7 * 86400, max_entries=10000)
+# Business listings by ZIP for territory reports, as plain signal dicts (Census is already cached per ZCTA)
+ZIP_CACHE = TTLCache(ttl_seconds=86400, max_entries=20000)
+
+# Territory reports: concurrent listing fetches and valuations across all ZIPs, businesses valued per ZIP
+ZIP_REPORT_CONCURRENCY = int(os.getenv("VALUATION_ZIP_CONCURRENCY", "16"))
+ZIP_BUSINESS_LIMIT = 20
+
+# Sensitivity analysis: shared draws per run (and the accepted range - every variant holds n floats),
+# ad-level knobs (scale every ads_data entry), and the grid used when none is given (relative changes;
+# only inputs the model reads - R_total and ads CPC would always show a zero delta)
+SENSITIVITY_SAMPLES = 4096
+SENSITIVITY_MIN_SAMPLES = 2
+SENSITIVITY_MAX_SAMPLES = 65536
+SENSITIVITY_AD_PARAMETERS = {"ads_volume": "vol", "ads_cpc": "cpc", "ads_competition": "competition"}
+DEFAULT_SENSITIVITY_GRID = {
+    "R_12": [-0.2, 0.2],
+    "stars": [-0.1, 0.1],
+    "median_income": [-0.1, 0.1],
+    "competitors_density": [-0.2, 0.2],
+    "ads_volume": [-0.2, 0.2]
+}
+
+# Enrichment HTTP connection pool
+HTTP_CONNECTION_LIMIT = int(os.getenv("VALUATION_HTTP_CONNECTIONS", "100"))
+HTTP_CONNECTIONS_PER_HOST = 20
+
+# Businesses per Monte Carlo matrix in batch valuation (rows x samples floats per array)
+BATCH_MATRIX_ROWS = 250
+
+# Streaming batch valuation: CSV rows read per chunk, rows per worker task, worker processes
+BATCH_CSV_CHUNK_ROWS = 500
+BATCH_TASK_ROWS = 100
+BATCH_WORKERS = int(os.getenv("VALUATION_BATCH_WORKERS", "0")) or (os.cpu_count() or 2)
+
+def business_signals_from_dict(data: Dict[str, Any]) -> BusinessSignals:
+    """BusinessSignals from a request body, with the API's defaults for missing fields"""
+    signals = BusinessSignals(
+        business_id=data.get("business_id", "unknown"),
+        name=data.get("name", "Unknown Business"),
+        category=data.get("category", "HVAC"),
+        geo=data.get("geo", "Unknown Location"),
+        R_total=data.get("R_total", 0),
+        R_12=data.get("R_12", 0),
+        stars=data.get("stars", 3.5),
+        rating_volatility=data.get("rating_volatility", 0.3),
+        trends_now=data.get("trends_now", 1.0),
+        trends_avg=data.get("trends_avg", 1.0),
+        pop_times_index=data.get("pop_times_index", 1.0),
+        competitors_density=data.get("competitors_density", 0.5),
+        median_income=data.get("median_income", 50000),
+        population=data.get("population", 10000),
+        years_in_business=data.get("years_in_business", 5),
+        website_quality=data.get("website_quality", 0.7),
+        social_presence=data.get("social_presence", 0.5)
+    )
+    
+    # Parse ads data
+    ads_data = data.get("ads_data", [])
+    if isinstance(ads_data, list):
+        signals.ads_data = ads_data
+    
+    return signals
+
+def grade_distribution(scores: List[float]) -> Dict[str, int]:
+    """Count of AOA scores per letter band"""
+    scores = np.asarray(scores, dtype=float)
+    
+    distribution = {
+        "A": int((scores >= 80).sum()),
+        "B": int(((scores >= 65) & (scores < 80)).sum()),
+        "C": int(((scores >= 50) & (scores < 65)).sum())
+    }
+    distribution["D"] = len(scores) - sum(distribution.values())
+    return distribution
+
+class BatchSummaryAccumulator:
+    """Batch summary statistics updated one chunk of results at a time
+    
+    Keeps running totals, grade and risk counts and the current top five;
+    only the p50 valuations are retained (for the exact median).
+    """
+    
+    def __init__(self):
+        self.count = 0
+        self.valuation_total = 0.0
+        self.aoa_total = 0.0
+        self.valuations: List[np.ndarray] = []
+        self.grade_distribution = {"A": 0, "B": 0, "C": 0, "D": 0}
+        self.high_transition_risk = 0
+        self.acquisition_targets = 0
+        self.top: List[Tuple[float, int, Dict[str, Any]]] = []  # (p50, arrival order, entry)
+    
+    def add(self, names: List[str], arrays: Dict[str, np.ndarray]):
+        valuations = arrays["valuation_p50"]
+        aoa_scores = arrays["aoa_score"]
+        transition_risk = arrays["transition_risk"]
+        if not len(valuations):
+            return
+        
+        # Top opportunities by valuation (stable, so ties keep CSV order)
+        for i in np.argsort(-valuations, kind="stable")[:5]:
+            self.top.append((float(valuations[i]), self.count + int(i), {
+                "name": names[i],
+                "valuation_p50": float(valuations[i]),
+                "aoa_score": float(aoa_scores[i]),
+                "transition_risk": float(transition_risk[i])
+            }))
+        self.top = sorted(self.top, key=lambda item: (-item[0], item[1]))[:5]
+        
+        self.count += len(valuations)
+        self.valuation_total += float(valuations.sum())
+        self.aoa_total += float(aoa_scores.sum())
+        self.valuations.append(valuations)
+        for grade, count in grade_distribution(aoa_scores).items():
+            self.grade_distribution[grade] += count
+        # High transition risk opportunities
+        self.high_transition_risk += int((transition_risk > 60).sum())
+        self.acquisition_targets += int((aoa_scores > 70).sum())
+    
+    def summary(self) -> Dict[str, Any]:
+        if not self.count:
+            return {}
+        return {
+            "valuation_stats": {
+                "mean": self.valuation_total / self.count,
+                "median": float(np.median(np.concatenate(self.valuations))),
+                "total_market_value": self.valuation_total
+            },
+            "aoa_stats": {
+                "mean_score": self.aoa_total / self.count,
+                "grade_distribution": dict(self.grade_distribution)
+            },
+            "top_opportunities": [entry for _, _, entry in self.top],
+            "high_transition_risk": self.high_transition_risk,
+            "acquisition_targets": self.acquisition_targets
+        }
+
 class SMBValuationEngine:
     """Advanced SMB Valuation Engine with probabilistic modeling"""
     
-    def __init__(self, api_keys: Dict[str, str]):
+    def __init__(self, api_keys: Dict[str, str], result_cache: Optional[ValuationResultCache] = None,
+                 store: Optional[ValuationStore] = None):
         self.api_keys = api_keys
         self.openai_client = OpenAI(api_key=api_keys.get("OPENAI_API_KEY")) if api_keys.get("OPENAI_API_KEY") else None
-        self.session = aiohttp.ClientSession()
+        self._session: Optional[aiohttp.ClientSession] = None  # Opened on first use, inside the running loop
+        self._session_loop: Optional[asyncio.AbstractEventLoop] = None
+        self._process_pool: Optional[ProcessPoolExecutor] = None
         
         # Valuation parameters
-        self.n_monte_carlo = 1000
+        self.n_monte_carlo = 1000  # Fixed sample size (also the batch matrix width)
         self.confidence_levels = [0.1, 0.5, 0.9]  # P10, P50, P90
         
+        # Adaptive sampling: blocks until the p10/p50/p90 relative standard error is within tolerance
+        self.adaptive_sampling = os.getenv("VALUATION_ADAPTIVE_SAMPLING", "true").lower() == "true"
+        self.mc_block_size = 128
+        self.mc_min_blocks = 4
+        self.mc_tolerance = float(os.getenv("VALUATION_MC_TOLERANCE", "0.05"))
+        self.mc_max_samples = 8192
+        self.use_qmc = os.getenv("VALUATION_QMC", "false").lower() == "true"  # Scrambled Sobol draws
+        
+        # Results keyed by valuation fingerprint
+        self.result_cache = result_cache if result_cache is not None else ValuationResultCache()
+        # Valuation history of portfolio businesses (None: results are not persisted)
+        self.store = store
+        
         logger.info("🏦 SMB Valuation Engine initialized")
     
-    async def valuate_business(self, signals: BusinessSignals) -> Dict[str, Any]:
+    async def valuate_business(self, signals: BusinessSignals, use_cache: bool = True) -> Dict[str, Any]:
         """Main valuation method using Monte Carlo ensemble"""
-        logger.info(f"💰 Valuating {signals.name} ({signals.category}) in {signals.geo}")
-        
         # Get category prior
         prior = CATEGORY_PRIORS.get(signals.category, CATEGORY_PRIORS["HVAC"])
         
+        # Fingerprint the caller's inputs (enrichment works on a copy)
+        fingerprint = self.valuation_fingerprint(signals, prior)
+        if use_cache:
+            cached = self.result_cache.get(fingerprint)
+            if cached is not None:
+                logger.info(f"💾 Cached valuation for {signals.name} ({fingerprint[:12]})")
+                self._persist([(signals, fingerprint, cached)])
+                return cached
+        
+        logger.info(f"💰 Valuating {signals.name} ({signals.category}) in {signals.geo}")
+        
         # Enrich signals with external APIs
-        enriched_signals = await self._enrich_business_signals(signals)
+        enriched_signals, signal_sources = await self._enrich_business_signals(signals)
         
         # Run Monte Carlo valuation
-        valuation_result = self._monte_carlo_valuation(enriched_signals, prior)
+        # Simulate on a worker thread so the shared event loop keeps serving other requests
+        valuation_result = await asyncio.to_thread(
+            self._monte_carlo_valuation, enriched_signals, prior, self._seeded_rng(fingerprint)
+        )
         
+        result = await self._build_valuation_report(signals, enriched_signals, prior, valuation_result, signal_sources)
+        result["fingerprint"] = fingerprint
+        self.result_cache.put(fingerprint, result)
+        self._persist([(signals, fingerprint, result)])
+        return result
+    
+    def _persist(self, entries: List[Tuple[BusinessSignals, str, Dict[str, Any]]], portfolio_only: bool = True) -> int:
+        """Record valuations in the store - by default only for businesses already in the portfolio"""
+        if self.store is None or not entries:
+            return 0
+        try:
+            return self.store.record_many(entries, ENGINE_VERSION, portfolio_only=portfolio_only)
+        except Exception as e:
+            logger.error(f"Valuation store error: {e}")
+            return 0
+    
+    def valuation_fingerprint(self, signals: BusinessSignals, prior: Optional[CategoryPrior] = None) -> str:
+        """Stable hash of everything a valuation depends on"""
+        prior = prior or self._category_prior(signals)
+        # Which enrichment sources are configured changes the enriched signals
+        sources = sorted(name for name, value in self.api_keys.items() if value)
+        payload = {
+            "engine_version": ENGINE_VERSION,
+            "sampling": self.sampling_settings(),
+            "enrichment_sources": sources,
+            "signals": asdict(signals),
+            "prior": asdict(prior)
+        }
+        return hashlib.sha256(json.dumps(_canonical(payload), sort_keys=True, default=str).encode()).hexdigest()
+    
+    def _seeded_rng(self, fingerprint: str) -> np.random.Generator:
+        """Generator seeded from a valuation fingerprint - same inputs, same draws"""
+        return np.random.default_rng(int(fingerprint[:16], 16))
+    
+    async def _build_valuation_report(self, signals: BusinessSignals, enriched_signals: BusinessSignals,
+                                      prior: CategoryPrior, valuation_result: Dict[str, Any],
+                                      signal_sources: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """AOA, TMP and ad spend analysis around a finished Monte Carlo valuation"""
         # Calculate AOA (Automated Operational Assessment)
         aoa_result = self._calculate_aoa(enriched_signals, prior)
         
@@ -246,43 +495,194 @@ class SMBValuationEngine:
             "ad_spend_plan": ad_spend_plan,
             "confidence_score": self._calculate_confidence_score(enriched_signals),
             "key_drivers": self._identify_key_drivers(valuation_result, aoa_result),
+            "signal_sources": signal_sources,
             "timestamp": datetime.now().isoformat()
         }
     
-    async def _enrich_business_signals(self, signals: BusinessSignals) -> BusinessSignals:
-        """Enrich business signals using external APIs"""
-        enriched = signals
+    def sensitivity_analysis(self, signals: BusinessSignals, perturbations: Optional[Dict[str, Any]] = None,
+                             n_samples: Optional[int] = None) -> Dict[str, Any]:
+        """Valuation response to perturbed inputs, every variant evaluated on one shared set of draws
+        
+        ``perturbations`` maps a numeric signal - or ``ads_volume``, ``ads_cpc``,
+        ``ads_competition``, which scale every ads_data entry - to relative
+        changes (``[-0.1, 0.1]`` is -/+10%) or to ``{"values": [...]}`` for
+        absolute settings.  With common random numbers a delta reflects the
+        input change, not sampling noise, so it is precise at few samples.
+        """
+        prior = self._category_prior(signals)
+        grid = perturbations if perturbations is not None else {
+            parameter: changes for parameter, changes in DEFAULT_SENSITIVITY_GRID.items()
+            if signals.ads_data or parameter not in SENSITIVITY_AD_PARAMETERS
+        }
+        n = int(n_samples or SENSITIVITY_SAMPLES)
+        if not SENSITIVITY_MIN_SAMPLES <= n <= SENSITIVITY_MAX_SAMPLES:
+            raise ValueError(f"n_samples must be between {SENSITIVITY_MIN_SAMPLES} and {SENSITIVITY_MAX_SAMPLES}")
+        
+        variants = []  # (parameter, base value, relative change or None, value, perturbed signals)
+        for parameter, spec in grid.items():
+            base_value = self._sensitivity_value(signals, parameter)
+            if isinstance(spec, dict):
+                settings = [(None, float(value)) for value in spec.get("values", [])]
+            else:
+                settings = [(float(change), base_value * (1 + float(change))) for change in spec]
+            for change, value in settings:
+                variants.append((parameter, base_value, change, value, self._perturbed_signals(signals, parameter, value)))
+        
+        # One draw of the sampled parameters, broadcast across the base row and every variant
+        rng = self._seeded_rng(self.valuation_fingerprint(signals, prior))
+        if self._qmc_enabled():
+            p_rev, ats, multiple = (column[np.newaxis, :] for column in
+                                    self._sample_monte_carlo_parameters_qmc(prior, signals.geo, n, self._sobol_sampler(rng)))
+        else:
+            p_rev, ats, multiple = self._sample_monte_carlo_parameters(prior, signals.geo, (1, n), rng)
+        valuations = self._evaluate_monte_carlo([signals] + [v[4] for v in variants], prior, p_rev, ats, multiple)["valuations"]
+        
+        base = valuations[0]
+        base_mean = float(base.mean())
+        means = valuations.mean(axis=1)
+        p10, p50, p90 = np.percentile(valuations, [10, 50, 90], axis=1)
+        variances = valuations.var(axis=1, ddof=1)
+        
+        results = []
+        for row, (parameter, base_value, change, value, _) in enumerate(variants, start=1):
+            differences = valuations[row] - base
+            delta = float(differences.mean())
+            input_change = (value - base_value) / base_value if base_value else None
+            results.append({
+                "parameter": parameter,
+                "base_value": base_value,
+                "value": value,
+                "relative_change": change if change is not None else input_change,
+                "valuation": {"mean": float(means[row]), "p10": float(p10[row]), "p50": float(p50[row]), "p90": float(p90[row])},
+                "delta_mean": delta,
+                "delta_p50": float(p50[row] - p50[0]),
+                "delta_percent": delta / base_mean * 100 if base_mean else None,
+                # Paired vs independent-run standard error of the delta - what sharing the draws saved
+                "delta_standard_error": float(differences.std(ddof=1) / np.sqrt(n)),
+                "independent_standard_error": float(np.sqrt((variances[0] + variances[row]) / n)),
+                "elasticity": (delta / base_mean) / input_change if input_change and base_mean else None
+            })
+        
+        # Tornado bars: each parameter's lowest and highest setting, widest swing first
+        tornado = []
+        elasticities = {}
+        for parameter in grid:
+            rows = [r for r in results if r["parameter"] == parameter]
+            if not rows:
+                continue
+            low = min(rows, key=lambda r: r["value"])
+            high = max(rows, key=lambda r: r["value"])
+            tornado.append({
+                "parameter": parameter,
+                "base_value": low["base_value"],
+                "low": {"value": low["value"], "delta_mean": low["delta_mean"]},
+                "high": {"value": high["value"], "delta_mean": high["delta_mean"]},
+                # The base valuation is the bar's origin, so a one-sided perturbation still has width
+                "swing": max(0.0, *(r["delta_mean"] for r in rows)) - min(0.0, *(r["delta_mean"] for r in rows))
+            })
+            measured = [r["elasticity"] for r in rows if r["elasticity"] is not None]
+            elasticities[parameter] = float(np.mean(measured)) if measured else None
+        tornado.sort(key=lambda bar: bar["swing"], reverse=True)
         
+        return {
+            "business_id": signals.business_id,
+            "business_name": signals.name,
+            "category": signals.category,
+            "samples": n,
+            "method": "sobol" if self._qmc_enabled() else "pseudo_random",
+            "common_random_numbers": True,
+            "base": {"mean": base_mean, "p10": float(p10[0]), "p50": float(p50[0]), "p90": float(p90[0])},
+            "perturbations": results,
+            "tornado": tornado,
+            "elasticities": elasticities,
+            "timestamp": datetime.now().isoformat()
+        }
+    
+    def _sensitivity_value(self, signals: BusinessSignals, parameter: str) -> float:
+        """Current value of a perturbable input (ad knobs are the total volume / mean CPC or competition)"""
+        if parameter in SENSITIVITY_AD_PARAMETERS:
+            if not signals.ads_data:
+                raise ValueError(f"{parameter} needs ads_data on the business")
+            values = [float(ad.get(SENSITIVITY_AD_PARAMETERS[parameter], 0)) for ad in signals.ads_data]
+            return float(sum(values)) if parameter == "ads_volume" else float(np.mean(values))
+        value = getattr(signals, parameter, None)
+        if parameter.startswith("_") or isinstance(value, bool) or not isinstance(value, (int, float)):
+            raise ValueError(f"{parameter} is not a numeric business signal")
+        return float(value)
+    
+    def _perturbed_signals(self, signals: BusinessSignals, parameter: str, value: float) -> BusinessSignals:
+        if parameter in SENSITIVITY_AD_PARAMETERS:
+            key = SENSITIVITY_AD_PARAMETERS[parameter]
+            base_value = self._sensitivity_value(signals, parameter)
+            scale = value / base_value if base_value else 0.0
+            ads_data = [{**ad, key: float(ad.get(key, 0)) * scale} for ad in signals.ads_data]
+            return replace(signals, ads_data=ads_data)
+        return replace(signals, **{parameter: value})
+    
+    async def _enrich_business_signals(self, signals: BusinessSignals) -> Tuple[BusinessSignals, Dict[str, Any]]:
+        """Enrich business signals using external APIs, all sources concurrently
+        
+        Returns the enriched signals and a report of each source's outcome and
+        where every signal value came from (caller input, default or a source).
+        """
+        # Enrich a copy - the caller's signals are fingerprinted, cached and persisted as given
+        enriched = replace(signals)
+        
+        fetches = {}
+        if self.api_keys.get("YELP_API_KEY"):
+            fetches["yelp"] = self._get_yelp_data(signals.name, signals.geo)
+        if self.api_keys.get("CENSUS_API_KEY"):
+            fetches["census"] = self._get_census_data(signals.geo)
+        if self.api_keys.get("SERPAPI_API_KEY"):
+            fetches["trends"] = self._get_trends_data(signals.category, signals.geo)
+        if self.openai_client:
+            fetches["competition"] = self._get_competitive_analysis(signals)
+        
+        outcomes = await asyncio.gather(*[self._fetch_enrichment(source, fetch) for source, fetch in fetches.items()])
+        
+        # Start from caller input vs defaults, then credit each source that answered
+        provenance = self._signal_provenance(signals)
+        sources = {source: {"status": "not_configured"} for source in ENRICHMENT_FIELDS}
+        for source, (data, outcome) in zip(fetches, outcomes):
+            sources[source] = outcome
+            if not data:
+                continue
+            for field_name, key in ENRICHMENT_FIELDS[source].items():
+                if data.get(key) is not None:
+                    setattr(enriched, field_name, data[key])
+                    provenance[field_name] = source
+        
+        return enriched, {"sources": sources, "signals": provenance}
+    
+    def _signal_provenance(self, signals: BusinessSignals) -> Dict[str, str]:
+        """"input" for values the caller supplied, "default" for values left at the dataclass default"""
+        provenance = {}
+        for f in fields(BusinessSignals):
+            if f.name in ("business_id", "name", "category", "geo"):
+                continue
+            if f.default is not MISSING:
+                default = f.default
+            elif f.default_factory is not MISSING:
+                default = f.default_factory()
+            else:
+                provenance[f.name] = "input"
+                continue
+            provenance[f.name] = "default" if getattr(signals, f.name) == default else "input"
+        return provenance
+    
+    async def _fetch_enrichment(self, source: str, fetch) -> Tuple[Optional[Dict], Dict[str, Any]]:
+        """Await one enrichment source under its timeout - failures degrade to no data"""
+        start = time.perf_counter()
         try:
-            # Enrich with Yelp data
-            if self.api_keys.get("YELP_API_KEY"):
-                yelp_data = await self._get_yelp_data(signals.name, signals.geo)
-                if yelp_data:
-                    enriched.R_total = yelp_data.get("review_count", signals.R_total)
-                    enriched.stars = yelp_data.get("rating", signals.stars)
-                    
-            # Enrich with Census demographic data
-            if self.api_keys.get("CENSUS_API_KEY"):
-                census_data = await self._get_census_data(signals.geo)
-                if census_data:
-                    enriched.median_income = census_data.get("median_income", signals.median_income)
-                    enriched.population = census_data.get("population", signals.population)
-            
-            # Enrich with Google Trends via SERP API
-            if self.api_keys.get("SERPAPI_API_KEY"):
-                trends_data = await self._get_trends_data(signals.category, signals.geo)
-                if trends_data:
-                    enriched.trends_now = trends_data.get("current_interest", signals.trends_now)
-                    
-            # Enrich with competitive analysis using OpenAI
-            if self.openai_client:
-                competitive_analysis = await self._get_competitive_analysis(signals)
-                enriched.competitors_density = competitive_analysis.get("density", signals.competitors_density)
-                
+            data = await asyncio.wait_for(fetch, ENRICHMENT_TIMEOUTS[source])
+            status = "ok" if data else "no_data"
+        except asyncio.TimeoutError:
+            logger.warning(f"{source} enrichment timed out after {ENRICHMENT_TIMEOUTS[source]}s")
+            data, status = None, "timeout"
         except Exception as e:
-            logger.error(f"Error enriching signals: {e}")
-        
-        return enriched
+            logger.error(f"Error enriching signals from {source}: {e}")
+            data, status = None, "error"
+        return data, {"status": status, "seconds": round(time.perf_counter() - start, 3)}
     
     async def _get_yelp_data(self, business_name: str, location: str) -> Optional[Dict]:
         """Get business data from Yelp API"""
@@ -309,33 +709,47 @@ class SMBValuationEngine:
     
     async def _get_census_data(self, location: str) -> Optional[Dict]:
         """Get demographic data from Census API"""
+        geography = self._census_geography(location)
+        if not geography:
+            return None
+        return await CENSUS_CACHE.get_or_fetch(geography, lambda: self._fetch_census_data(*geography))
+    
+    def _census_geography(self, location: str) -> Optional[Tuple[str, str]]:
+        """Narrowest Census geography a location string identifies: ("zcta", ZIP) or ("state", FIPS)"""
+        zip_match = re.search(r"\b(\d{5})(?:-\d{4})?\b", location)
+        if zip_match:
+            return ("zcta", zip_match.group(1))
+        state_code = self._get_state_code(location)
+        if state_code:
+            return ("state", state_code)
+        return None
+    
+    async def _fetch_census_data(self, level: str, code: str) -> Optional[Dict]:
+        """Request the ACS profile row for exactly one geography"""
         try:
-            # Extract state/county from location
-            state_code = self._get_state_code(location)
-            if not state_code:
-                return None
-            
             params = {
                 "get": "DP02_0001E,DP03_0062E,DP03_0088E",  # Population, median income, business counts
-                "for": f"county:*",
-                "in": f"state:{state_code}",
                 "key": self.api_keys.get("CENSUS_API_KEY")
             }
+            if level == "zcta":
+                # ZIP areas are only published in the 5-year estimates
+                url = "https://api.census.gov/data/2021/acs/acs5/profile"
+                params["for"] = f"zip code tabulation area:{code}"
+            else:
+                url = "https://api.census.gov/data/2021/acs/acs1/profile"
+                params["for"] = f"state:{code}"
             
-            async with self.session.get(
-                "https://api.census.gov/data/2021/acs/acs1/profile",
-                params=params
-            ) as response:
+            async with self.session.get(url, params=params) as response:
                 data = await response.json()
                 if data and len(data) > 1:
                     # Parse census data
-                    headers = data[0]
                     values = data[1]
                     return {
                         "population": int(values[0]) if values[0] != "-666666666" else 10000,
                         "median_income": int(values[1]) if values[1] != "-666666666" else 50000,
                         "business_count": int(values[2]) if values[2] != "-666666666" else 100
                     }
+                return None
                     
         except Exception as e:
             logger.error(f"Census API error: {e}")
@@ -343,11 +757,17 @@ class SMBValuationEngine:
     
     async def _get_trends_data(self, category: str, location: str) -> Optional[Dict]:
         """Get market trends using SERP API"""
+        geo_code = self._get_geo_code(location)
+        year, week, _ = datetime.now().isocalendar()
+        key = (category, geo_code, f"{year}-W{week:02d}")
+        return await TRENDS_CACHE.get_or_fetch(key, lambda: self._fetch_trends_data(category, geo_code))
+    
+    async def _fetch_trends_data(self, category: str, geo_code: str) -> Optional[Dict]:
         try:
             params = {
                 "engine": "google_trends",
                 "q": f"{category} services",
-                "geo": self._get_geo_code(location),
+                "geo": geo_code,
                 "api_key": self.api_keys.get("SERPAPI_API_KEY")
             }
             
@@ -368,12 +788,13 @@ class SMBValuationEngine:
                         "average_interest": avg_interest / 100,
                         "trend_slope": self._calculate_trend_slope(timeline)
                     }
+                return None
                     
         except Exception as e:
             logger.error(f"SERP API error: {e}")
             return None
     
-    async def _get_competitive_analysis(self, signals: BusinessSignals) -> Dict[str, Any]:
+    async def _get_competitive_analysis(self, signals: BusinessSignals) -> Optional[Dict[str, Any]]:
         """Get competitive analysis using OpenAI"""
         if not self.openai_client:
             return {"density": 0.5}
@@ -394,121 +815,325 @@ class SMBValuationEngine:
             Return as JSON with keys: density, advantages, risks, transition_risk
             """
             
-            response = await asyncio.to_thread(
-                self.openai_client.chat.completions.create,
-                model="gpt-4",
-                messages=[{"role": "user", "content": prompt}],
-                temperature=0.3
-            )
-            
-            content = response.choices[0].message.content
-            # Parse JSON from response
-            analysis = json.loads(content)
-            return analysis
+            # Same model and prompt -> same answer; keyed by content hash
+            key = hashlib.sha256(f"gpt-4:{prompt}".encode()).hexdigest()
+            return await LLM_CACHE.get_or_fetch(key, lambda: self._complete_json(prompt))
             
         except Exception as e:
             logger.error(f"OpenAI analysis error: {e}")
-            return {"density": 0.5}
+            return None
     
-    def _monte_carlo_valuation(self, signals: BusinessSignals, prior: CategoryPrior) -> Dict[str, Any]:
-        """Monte Carlo ensemble valuation with three models"""
-        logger.info(f"🎲 Running Monte Carlo valuation ({self.n_monte_carlo} iterations)")
+    async def _complete_json(self, prompt: str) -> Optional[Dict[str, Any]]:
+        """GPT-4 completion parsed as JSON (``None`` when it does not parse)"""
+        response = await asyncio.to_thread(
+            self.openai_client.chat.completions.create,
+            model="gpt-4",
+            messages=[{"role": "user", "content": prompt}],
+            temperature=0.3
+        )
         
-        valuations = []
-        revenues = []
-        ebitdas = []
+        content = response.choices[0].message.content
+        # Parse JSON from response
+        try:
+            return json.loads(content)
+        except json.JSONDecodeError as e:
+            logger.error(f"OpenAI analysis returned invalid JSON: {e}")
+            return None
+    
+    def _monte_carlo_valuation(self, signals: BusinessSignals, prior: CategoryPrior, rng=None) -> Dict[str, Any]:
+        """Monte Carlo ensemble valuation with three models"""
+        method = "sobol" if self._qmc_enabled() else "pseudo_random"
+        if self.adaptive_sampling:
+            logger.info(f"🎲 Running adaptive Monte Carlo valuation ({method}, tolerance {self.mc_tolerance:.1%})")
+        else:
+            logger.info(f"🎲 Running Monte Carlo valuation ({self.n_monte_carlo} iterations, {method})")
         
-        for _ in range(self.n_monte_carlo):
-            # Sample parameters
-            p_rev = np.random.beta(prior.review_propensity_alpha, prior.review_propensity_beta)
-            ats = self._sample_ats(prior.ats_mixture, signals.geo)
-            multiple = np.random.lognormal(np.log(prior.multiple_mean), prior.multiple_std)
-            
-            # Model 1: Review-driven revenue
-            if signals.R_12 > 0:
-                annual_customers_r = signals.R_12 / p_rev
-                revenue_r = annual_customers_r * ats
-            else:
-                revenue_r = 0
-            
-            # Model 2: Ads funnel revenue
-            revenue_a = self._calculate_ads_revenue(signals, prior, ats)
-            
-            # Model 3: Foot traffic revenue (for physical businesses)
-            revenue_f = self._calculate_foot_traffic_revenue(signals, prior, ats)
-            
-            # Ensemble revenue (weighted by model confidence)
-            weights = self._calculate_model_weights(signals, [revenue_r, revenue_a, revenue_f])
-            ensemble_revenue = np.average([revenue_r, revenue_a, revenue_f], weights=weights)
-            
-            # Apply geo adjustment
-            geo_multiplier = self._get_geo_multiplier(signals.geo, signals.median_income)
-            adjusted_revenue = ensemble_revenue * geo_multiplier
-            
-            # Calculate EBITDA
-            ebitda = adjusted_revenue * prior.operating_margin
-            
-            # Apply AOA adjustment
-            aoa_score = self._quick_aoa_score(signals, prior)
-            aoa_multiplier = 0.7 + (aoa_score / 100) * 0.6  # 0.7 to 1.3 range
-            adjusted_ebitda = ebitda * aoa_multiplier
-            
-            # Calculate valuation
-            valuation = adjusted_ebitda * multiple
+        draws = self._simulate_monte_carlo([signals], prior, [rng])[0]
+        return self._summarize_monte_carlo(draws)
+    
+    def _simulate_monte_carlo(self, signals_list: List[BusinessSignals], prior: CategoryPrior,
+                              rngs: Optional[List[Any]] = None) -> List[Dict[str, Any]]:
+        """Draws for each business - fixed size or adaptive, pseudo-random or Sobol
+        
+        Every business samples from its own generator (or Sobol sequence) in the
+        same block sequence, so it gets identical draws whether it is valued
+        alone or as a row of a batch.  Adaptive mode starts with
+        ``mc_min_blocks`` blocks and doubles the sample count for the rows whose
+        p10/p50/p90 relative standard error is still above ``mc_tolerance``.
+        """
+        rngs = rngs if rngs is not None else [None] * len(signals_list)
+        samplers = [self._sobol_sampler(rng) for rng in rngs] if self._qmc_enabled() else None
+        
+        if self.adaptive_sampling:
+            first_round = self.mc_min_blocks * self.mc_block_size
+            max_samples = max(first_round, self.mc_max_samples)
+        else:
+            first_round = max_samples = self.n_monte_carlo
+        
+        parts: List[List[Dict[str, Any]]] = [[] for _ in signals_list]
+        converged = [False] * len(signals_list)
+        active = list(range(len(signals_list)))
+        drawn = 0
+        while active and drawn < max_samples:
+            n = min(first_round if drawn == 0 else drawn, max_samples - drawn)
+            draws = self._monte_carlo_matrix(
+                [signals_list[i] for i in active], prior, n, [rngs[i] for i in active],
+                [samplers[i] for i in active] if samplers is not None else None
+            )
+            for row, i in enumerate(active):
+                parts[i].append({key: draws[key][row] for key in ("valuations", "revenues", "ebitdas")})
+            drawn += n
+            if not self.adaptive_sampling:
+                break
             
-            valuations.append(valuation)
-            revenues.append(adjusted_revenue)
-            ebitdas.append(adjusted_ebitda)
-        
-        # Calculate percentiles
-        val_percentiles = np.percentile(valuations, [10, 25, 50, 75, 90])
-        rev_percentiles = np.percentile(revenues, [10, 25, 50, 75, 90])
-        ebitda_percentiles = np.percentile(ebitdas, [10, 25, 50, 75, 90])
+            valuations = np.vstack([np.concatenate([part["valuations"] for part in parts[i]]) for i in active])
+            _, relative_errors = self._quantile_standard_errors(valuations, self.mc_block_size)
+            for i, relative_error in zip(active, relative_errors):
+                converged[i] = bool(relative_error <= self.mc_tolerance)
+            active = [i for i in active if not converged[i]]
+        
+        results = []
+        for i, signals in enumerate(signals_list):
+            draws = {
+                "valuations": np.concatenate([part["valuations"] for part in parts[i]]),
+                "revenues": np.concatenate([part["revenues"] for part in parts[i]]),
+                "ebitdas": np.concatenate([part["ebitdas"] for part in parts[i]]),
+                "model_weights": self._normalized_model_weights(signals),
+                "n": sum(len(part["valuations"]) for part in parts[i]),
+                "mode": "adaptive" if self.adaptive_sampling else "fixed",
+                "method": "sobol" if samplers is not None else "pseudo_random"
+            }
+            if self.adaptive_sampling:
+                draws["converged"] = converged[i]
+            results.append(draws)
+        return results
+    
+    def _monte_carlo_kernel(self, signals: BusinessSignals, prior: CategoryPrior, n: int,
+                            rng=None, sobol=None) -> Dict[str, Any]:
+        """Draw ``n`` ensemble samples for one business as 1-D arrays"""
+        draws = self._monte_carlo_matrix([signals], prior, n, [rng], [sobol] if sobol is not None else None)
+        return {
+            "valuations": draws["valuations"][0],
+            "revenues": draws["revenues"][0],
+            "ebitdas": draws["ebitdas"][0],
+            "model_weights": draws["model_weights"][0].tolist(),
+            "n": n,
+            "method": "sobol" if sobol is not None else "pseudo_random"
+        }
+    
+    def _monte_carlo_matrix(self, signals_list: List[BusinessSignals], prior: CategoryPrior, n: int,
+                            rngs: List[Any], samplers: Optional[List[Any]] = None) -> Dict[str, Any]:
+        """Draw a businesses x samples matrix for businesses sharing one category prior
+        
+        ``rngs`` holds one generator per business, which makes every row
+        reproducible on its own and samples it for its own geo.  With
+        ``samplers`` (one Sobol sequence per business) the draws are
+        quasi-random instead.
+        """
+        if samplers is not None:
+            rows = [self._sample_monte_carlo_parameters_qmc(prior, s.geo, n, sampler)
+                    for s, sampler in zip(signals_list, samplers)]
+        else:
+            rows = [self._sample_monte_carlo_parameters(prior, s.geo, n, rng)
+                    for s, rng in zip(signals_list, rngs)]
+        p_rev, ats, multiple = (np.vstack(column) for column in zip(*rows))
+        return self._evaluate_monte_carlo(signals_list, prior, p_rev, ats, multiple)
+    
+    def _normalized_model_weights(self, signals: BusinessSignals) -> List[float]:
+        weights = np.array(self._calculate_model_weights(signals, []), dtype=float)
+        return (weights / weights.sum()).tolist()
+    
+    def _evaluate_monte_carlo(self, signals_list: List[BusinessSignals], prior: CategoryPrior,
+                              p_rev: np.ndarray, ats: np.ndarray, multiple: np.ndarray) -> Dict[str, Any]:
+        """Ensemble revenue, EBITDA and valuation for businesses x samples parameter draws"""
+        # Per-business invariants as column vectors so they broadcast across samples;
+        # the ads and foot traffic models are linear in the ticket size, so evaluate them per unit ATS
+        reviews = np.array([[s.R_12] for s in signals_list], dtype=float)
+        ads_per_ats = np.array([[self._calculate_ads_revenue(s, prior, 1.0)] for s in signals_list], dtype=float)
+        foot_per_ats = np.array([[self._calculate_foot_traffic_revenue(s, prior, 1.0)] for s in signals_list], dtype=float)
+        weights = np.array([self._normalized_model_weights(s) for s in signals_list], dtype=float)
+        geo_multiplier = np.array([[self._get_geo_multiplier(s.geo, s.median_income)] for s in signals_list])
+        aoa_multiplier = np.array([[0.7 + (self._quick_aoa_score(s, prior) / 100) * 0.6]  # 0.7 to 1.3 range
+                                   for s in signals_list])
+        
+        # Model 1: Review-driven revenue
+        revenue_r = np.where(reviews > 0, reviews / p_rev * ats, 0.0)
+        
+        # Models 2 and 3: Ads funnel and foot traffic revenue
+        revenue_a = ads_per_ats * ats
+        revenue_f = foot_per_ats * ats
+        
+        # Ensemble revenue (weighted by model confidence), geo adjustment, EBITDA, valuation
+        ensemble_revenue = weights[:, 0:1] * revenue_r + weights[:, 1:2] * revenue_a + weights[:, 2:3] * revenue_f
+        revenues = ensemble_revenue * geo_multiplier
+        ebitdas = revenues * prior.operating_margin * aoa_multiplier
+        valuations = ebitdas * multiple
         
         return {
-            "valuation": {
-                "p10": val_percentiles[0],
-                "p25": val_percentiles[1],
-                "p50": val_percentiles[2],
-                "p75": val_percentiles[3],
-                "p90": val_percentiles[4],
-                "mean": np.mean(valuations),
-                "std": np.std(valuations)
-            },
-            "revenue": {
-                "p10": rev_percentiles[0],
-                "p25": rev_percentiles[1],
-                "p50": rev_percentiles[2],
-                "p75": rev_percentiles[3],
-                "p90": rev_percentiles[4],
-                "mean": np.mean(revenues)
-            },
-            "ebitda": {
-                "p10": ebitda_percentiles[0],
-                "p25": ebitda_percentiles[1],
-                "p50": ebitda_percentiles[2],
-                "p75": ebitda_percentiles[3],
-                "p90": ebitda_percentiles[4],
-                "mean": np.mean(ebitdas)
-            },
+            "valuations": valuations,
+            "revenues": revenues,
+            "ebitdas": ebitdas,
             "model_weights": weights,
-            "monte_carlo_runs": self.n_monte_carlo
+            "n": p_rev.shape[1]
         }
     
+    def _sample_monte_carlo_parameters(self, prior: CategoryPrior, geo: str, size, rng=None) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Review propensity, ticket size and exit multiple draws - one call per distribution"""
+        rng = rng if rng is not None else np.random
+        p_rev = rng.beta(prior.review_propensity_alpha, prior.review_propensity_beta, size=size)
+        ats = self._sample_ats_array(prior.ats_mixture, geo, size, rng)  # COLA uses default income
+        multiple = rng.lognormal(np.log(prior.multiple_mean), prior.multiple_std, size=size)
+        return p_rev, ats, multiple
+    
+    def _qmc_enabled(self) -> bool:
+        if self.use_qmc and not QMC_AVAILABLE:
+            logger.warning("Sobol sampling requested but scipy.stats.qmc is unavailable - using pseudo-random draws")
+        return self.use_qmc and QMC_AVAILABLE
+    
+    def _sobol_sampler(self, rng=None):
+        """Scrambled Sobol sequence over the four sampled dimensions"""
+        return qmc.Sobol(d=4, scramble=True, seed=rng if isinstance(rng, np.random.Generator) else None)
+    
+    def _sample_monte_carlo_parameters_qmc(self, prior: CategoryPrior, geo: str, n: int,
+                                           sobol) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Same parameter distributions as ``_sample_monte_carlo_parameters`` from Sobol points via inverse CDFs"""
+        u = np.clip(sobol.random(n), 1e-12, 1 - 1e-12)
+        
+        p_rev = beta.ppf(u[:, 0], prior.review_propensity_alpha, prior.review_propensity_beta)
+        
+        # Job type from the mixture CDF, then the same COLA and 20% lognormal price noise
+        weights = np.array([job["weight"] for job in prior.ats_mixture], dtype=float)
+        prices = np.array([job["price"] for job in prior.ats_mixture], dtype=float)
+        job_idx = np.minimum(np.searchsorted(np.cumsum(weights) / weights.sum(), u[:, 1], side="right"), len(prices) - 1)
+        ats = prices[job_idx] * self._get_geo_multiplier(geo, 50000) * np.exp(0.2 * norm.ppf(u[:, 2]))
+        
+        multiple = np.exp(np.log(prior.multiple_mean) + prior.multiple_std * norm.ppf(u[:, 3]))
+        return p_rev, ats, multiple
+    
+    def _quantile_standard_errors(self, values: np.ndarray, block_size: int,
+                                  pooled: Optional[np.ndarray] = None) -> Tuple[Optional[np.ndarray], np.ndarray]:
+        """Batch-means standard errors of p10/p50/p90 per row, and the largest relative error per row
+        
+        ``values`` is businesses x samples; rows are split into blocks of
+        ``block_size`` and the spread of the per-block percentiles estimates
+        the standard error of the pooled ones (``pooled``, rows x 3, when the
+        caller already has them).
+        """
+        n_blocks = values.shape[1] // block_size
+        if n_blocks < 2:
+            return None, np.full(values.shape[0], np.inf)
+        blocks = values[:, :n_blocks * block_size].reshape(values.shape[0], n_blocks, block_size)
+        block_percentiles = np.percentile(blocks, [10, 50, 90], axis=2)  # 3 x rows x blocks
+        standard_errors = block_percentiles.std(axis=2, ddof=1).T / np.sqrt(n_blocks)  # rows x 3
+        if pooled is None:
+            pooled = np.percentile(values, [10, 50, 90], axis=1).T
+        relative = np.max(standard_errors / np.maximum(np.abs(pooled), 1e-9), axis=1)
+        return standard_errors, relative
+    
+    def _summarize_monte_carlo(self, draws: Dict[str, Any]) -> Dict[str, Any]:
+        """Percentile summary of one business's Monte Carlo draws"""
+        return self._summarize_draws([draws])[0]
+    
+    def _summarize_draws(self, draws_list: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Percentile summaries for many businesses - rows with equal sample counts share one matrix pass"""
+        by_size: Dict[int, List[int]] = {}
+        for i, draws in enumerate(draws_list):
+            by_size.setdefault(len(draws["valuations"]), []).append(i)
+        
+        summaries: List[Optional[Dict[str, Any]]] = [None] * len(draws_list)
+        for indices in by_size.values():
+            rows = [draws_list[i] for i in indices]
+            matrix = {key: np.vstack([draws[key] for draws in rows]) for key in ("valuations", "revenues", "ebitdas")}
+            matrix["rows"] = rows
+            for i, summary in zip(indices, self._summarize_monte_carlo_rows(matrix)):
+                summaries[i] = summary
+        return summaries
+    
+    def _summarize_monte_carlo_rows(self, draws: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """Percentile summary for every row of a businesses x samples matrix
+        
+        ``draws["rows"]`` carries each row's weights and sampling metadata.
+        """
+        quantiles = [10, 25, 50, 75, 90]
+        
+        # Calculate percentiles along the sample axis - one pass per metric
+        val_percentiles = np.percentile(draws["valuations"], quantiles, axis=1).T
+        rev_percentiles = np.percentile(draws["revenues"], quantiles, axis=1).T
+        ebitda_percentiles = np.percentile(draws["ebitdas"], quantiles, axis=1).T
+        standard_errors, relative_errors = self._quantile_standard_errors(
+            draws["valuations"], self.mc_block_size, val_percentiles[:, [0, 2, 4]]
+        )
+        val_mean = draws["valuations"].mean(axis=1)
+        val_std = draws["valuations"].std(axis=1)
+        rev_mean = draws["revenues"].mean(axis=1)
+        ebitda_mean = draws["ebitdas"].mean(axis=1)
+        
+        summaries = []
+        for i, row in enumerate(draws["rows"]):
+            summaries.append({
+                "valuation": {
+                    "p10": val_percentiles[i][0],
+                    "p25": val_percentiles[i][1],
+                    "p50": val_percentiles[i][2],
+                    "p75": val_percentiles[i][3],
+                    "p90": val_percentiles[i][4],
+                    "mean": val_mean[i],
+                    "std": val_std[i]
+                },
+                "revenue": {
+                    "p10": rev_percentiles[i][0],
+                    "p25": rev_percentiles[i][1],
+                    "p50": rev_percentiles[i][2],
+                    "p75": rev_percentiles[i][3],
+                    "p90": rev_percentiles[i][4],
+                    "mean": rev_mean[i]
+                },
+                "ebitda": {
+                    "p10": ebitda_percentiles[i][0],
+                    "p25": ebitda_percentiles[i][1],
+                    "p50": ebitda_percentiles[i][2],
+                    "p75": ebitda_percentiles[i][3],
+                    "p90": ebitda_percentiles[i][4],
+                    "mean": ebitda_mean[i]
+                },
+                "model_weights": list(row["model_weights"]),
+                "monte_carlo_runs": row["n"],
+                "sampling": {
+                    "mode": row.get("mode", "fixed"),
+                    "method": row.get("method", "pseudo_random"),
+                    "samples_used": row["n"],
+                    "standard_error": {
+                        "p10": standard_errors[i][0],
+                        "p50": standard_errors[i][1],
+                        "p90": standard_errors[i][2]
+                    } if standard_errors is not None else None,
+                    "relative_standard_error": relative_errors[i] if standard_errors is not None else None,
+                    "tolerance": self.mc_tolerance,
+                    "converged": row.get("converged", bool(relative_errors[i] <= self.mc_tolerance))
+                }
+            })
+        return summaries
+    
     def _sample_ats(self, ats_mixture: List[Dict], geo: str) -> float:
         """Sample average ticket size from mixture model"""
-        # Sample job type based on weights
+        return float(self._sample_ats_array(ats_mixture, geo, 1, np.random)[0])
+    
+    def _sample_ats_array(self, ats_mixture: List[Dict], geo: str, size, rng=None) -> np.ndarray:
+        """Sample an array of average ticket sizes (``size`` may be a shape) from the mixture model"""
+        rng = rng if rng is not None else np.random
+        
+        # Sample job types based on weights
         weights = [job["weight"] for job in ats_mixture]
-        job_idx = np.random.choice(len(ats_mixture), p=weights)
-        base_price = ats_mixture[job_idx]["price"]
+        prices = np.array([job["price"] for job in ats_mixture], dtype=float)
+        job_idx = rng.choice(len(ats_mixture), size=size, p=weights)
         
         # Apply geo adjustment (COLA)
         geo_multiplier = self._get_geo_multiplier(geo, 50000)  # Default income
         
         # Add noise
-        noise_factor = np.random.lognormal(0, 0.2)  # 20% price variance
+        noise_factor = rng.lognormal(0, 0.2, size=size)  # 20% price variance
         
-        return base_price * geo_multiplier * noise_factor
+        return prices[job_idx] * geo_multiplier * noise_factor
     
     def _calculate_ads_revenue(self, signals: BusinessSignals, prior: CategoryPrior, ats: float) -> float:
         """Calculate revenue from ads funnel model"""
@@ -1196,70 +1821,47 @@ class SMBValuationEngine:
         else:
             return "D"
     
-    async def batch_valuate_csv(self, csv_content: str, default_category: str = "HVAC") -> Dict[str, Any]:
+    def _category_prior(self, signals: BusinessSignals) -> CategoryPrior:
+        return CATEGORY_PRIORS.get(signals.category, CATEGORY_PRIORS["HVAC"])
+    
+    def _batch_monte_carlo_valuation(self, signals_list: List[BusinessSignals],
+                                     rngs: Optional[List[np.random.Generator]] = None) -> List[Dict[str, Any]]:
+        """Monte Carlo summaries for many businesses, one matrix evaluation per category prior"""
+        groups: Dict[str, List[int]] = {}
+        for i, signals in enumerate(signals_list):
+            groups.setdefault(self._category_prior(signals).category, []).append(i)
+        
+        sampling = f"adaptive, tolerance {self.mc_tolerance:.1%}" if self.adaptive_sampling else f"{self.n_monte_carlo} iterations"
+        logger.info(f"🎲 Running batch Monte Carlo valuation ({len(signals_list)} businesses, "
+                    f"{len(groups)} categories, {sampling})")
+        
+        summaries: List[Optional[Dict[str, Any]]] = [None] * len(signals_list)
+        for indices in groups.values():
+            prior = self._category_prior(signals_list[indices[0]])
+            # Bound the matrix size so portfolios of thousands of rows keep memory flat
+            for start in range(0, len(indices), BATCH_MATRIX_ROWS):
+                chunk = indices[start:start + BATCH_MATRIX_ROWS]
+                chunk_rngs = [rngs[i] for i in chunk] if rngs is not None else None
+                draws_list = self._simulate_monte_carlo([signals_list[i] for i in chunk], prior, chunk_rngs)
+                for i, summary in zip(chunk, self._summarize_draws(draws_list)):
+                    summaries[i] = summary
+        return summaries
+    
+    async def batch_valuate_csv(self, csv_content: str, default_category: str = "HVAC",
+                                use_cache: bool = True) -> Dict[str, Any]:
         """Batch valuate businesses from CSV"""
         logger.info("📊 Starting batch valuation from CSV")
         
         # Parse CSV
         try:
-            df = pd.read_csv(pd.StringIO(csv_content))
-            businesses = []
-            
-            for _, row in df.iterrows():
-                # Map CSV columns to BusinessSignals
-                signals = BusinessSignals(
-                    business_id=str(row.get("business_id", f"batch_{len(businesses)}")),
-                    name=str(row.get("name", "Unknown Business")),
-                    category=str(row.get("category", default_category)),
-                    geo=str(row.get("geo", "Unknown Location")),
-                    R_total=int(row.get("R_total", 0)),
-                    R_12=int(row.get("R_12", 0)),
-                    stars=float(row.get("stars", 3.5)),
-                    rating_volatility=float(row.get("rating_volatility", 0.3)),
-                    trends_now=float(row.get("trends_now", 1.0)),
-                    trends_avg=float(row.get("trends_avg", 1.0)),
-                    pop_times_index=float(row.get("pop_times_index", 1.0)),
-                    competitors_density=float(row.get("competitors_density", 0.5)),
-                    median_income=float(row.get("median_income", 50000)),
-                    population=int(row.get("population", 10000)),
-                    years_in_business=int(row.get("years_in_business", 5))
-                )
-                
-                # Parse ads data if available
-                ads_data = []
-                for i in range(1, 7):  # Support up to 6 ad groups
-                    vol_col = f"ads_vol_{i}"
-                    cpc_col = f"ads_cpc_{i}"
-                    comp_col = f"ads_comp_{i}"
-                    
-                    if vol_col in row and pd.notna(row[vol_col]):
-                        ads_data.append({
-                            "vol": float(row[vol_col]),
-                            "cpc": float(row.get(cpc_col, 0)),
-                            "competition": float(row.get(comp_col, 0.5))
-                        })
-                
-                signals.ads_data = ads_data
-                businesses.append(signals)
+            businesses = self.parse_batch_csv(csv_content, default_category)
             
             logger.info(f"📋 Parsed {len(businesses)} businesses from CSV")
             
-            # Process in parallel batches
-            batch_size = 10
-            results = []
+            batch_results, _ = await self._valuate_batch(businesses, use_cache)
             
-            for i in range(0, len(businesses), batch_size):
-                batch = businesses[i:i + batch_size]
-                batch_results = await asyncio.gather(
-                    *[self.valuate_business(business) for business in batch],
-                    return_exceptions=True
-                )
-                
-                for result in batch_results:
-                    if isinstance(result, Exception):
-                        logger.error(f"Batch processing error: {result}")
-                    else:
-                        results.append(result)
+            # Keep CSV order
+            results = [result for result in batch_results if result is not None]
             
             # Generate batch summary
             summary = self._generate_batch_summary(results)
@@ -1276,94 +1878,351 @@ class SMBValuationEngine:
             logger.error(f"Batch processing error: {e}")
             return {"success": False, "error": str(e)}
     
-    def _generate_batch_summary(self, results: List[Dict]) -> Dict[str, Any]:
-        """Generate summary statistics for batch processing"""
-        if not results:
-            return {}
+    async def stream_batch_valuation(self, csv_content: str, default_category: str = "HVAC",
+                                     use_cache: bool = True, job_id: Optional[str] = None) -> AsyncIterator[Dict[str, Any]]:
+        """Batch valuate a CSV chunk by chunk, yielding events as results arrive
+        
+        Events are dicts with a ``type`` of ``started``, ``result`` (one per
+        business, with its CSV row index), ``progress`` (after every chunk),
+        ``summary`` (last) or ``error``.  Monte Carlo simulation runs in the
+        worker process pool; the summary is accumulated chunk by chunk.
+        """
+        job_id = job_id or uuid.uuid4().hex
+        progress = {"parsed": 0, "processed": 0, "cached": 0, "failed": 0}
+        accumulator = BatchSummaryAccumulator()
+        yield {"type": "started", "job_id": job_id, "chunk_rows": BATCH_CSV_CHUNK_ROWS}
+        
+        try:
+            for df in pd.read_csv(io.StringIO(csv_content), chunksize=BATCH_CSV_CHUNK_ROWS):
+                start = progress["parsed"]
+                businesses = self._parse_batch_frame(df, default_category, start)
+                progress["parsed"] += len(businesses)
+                
+                batch_results, cached = await self._valuate_batch(businesses, use_cache, in_pool=True)
+                results = [result for result in batch_results if result is not None]
+                for offset, result in enumerate(batch_results):
+                    if result is not None:
+                        yield {"type": "result", "job_id": job_id, "index": start + offset, "result": result}
+                
+                accumulator.add([r.get("business_name") for r in results], self._batch_summary_arrays(results))
+                progress["processed"] += len(results)
+                progress["cached"] += cached
+                progress["failed"] += len(batch_results) - len(results)
+                yield {"type": "progress", "job_id": job_id, **progress}
+                
+        except Exception as e:
+            logger.error(f"Batch processing error: {e}")
+            yield {"type": "error", "job_id": job_id, "error": str(e), **progress}
+            return
+        
+        yield {"type": "summary", "job_id": job_id, **progress, "summary": accumulator.summary(),
+               "processing_time": datetime.now().isoformat()}
+    
+    def parse_batch_csv(self, csv_content: str, default_category: str = "HVAC") -> List[BusinessSignals]:
+        """BusinessSignals for every row of a batch CSV"""
+        return self._parse_batch_frame(pd.read_csv(io.StringIO(csv_content)), default_category)
+    
+    def _parse_batch_frame(self, df: pd.DataFrame, default_category: str, start: int = 0) -> List[BusinessSignals]:
+        """Map CSV rows to BusinessSignals (``start`` is the frame's offset in the whole CSV)"""
+        businesses = []
         
-        valuations = [r["valuation"]["valuation"]["p50"] for r in results if "valuation" in r]
-        aoa_scores = [r["aoa"]["total_score"] for r in results if "aoa" in r]
+        for row in df.to_dict("records"):
+            # Map CSV columns to BusinessSignals
+            signals = BusinessSignals(
+                business_id=str(row.get("business_id", f"batch_{start + len(businesses)}")),
+                name=str(row.get("name", "Unknown Business")),
+                category=str(row.get("category", default_category)),
+                geo=str(row.get("geo", "Unknown Location")),
+                R_total=int(row.get("R_total", 0)),
+                R_12=int(row.get("R_12", 0)),
+                stars=float(row.get("stars", 3.5)),
+                rating_volatility=float(row.get("rating_volatility", 0.3)),
+                trends_now=float(row.get("trends_now", 1.0)),
+                trends_avg=float(row.get("trends_avg", 1.0)),
+                pop_times_index=float(row.get("pop_times_index", 1.0)),
+                competitors_density=float(row.get("competitors_density", 0.5)),
+                median_income=float(row.get("median_income", 50000)),
+                population=int(row.get("population", 10000)),
+                years_in_business=int(row.get("years_in_business", 5))
+            )
+            
+            # Parse ads data if available
+            ads_data = []
+            for i in range(1, 7):  # Support up to 6 ad groups
+                vol_col = f"ads_vol_{i}"
+                cpc_col = f"ads_cpc_{i}"
+                comp_col = f"ads_comp_{i}"
+                
+                if vol_col in row and pd.notna(row[vol_col]):
+                    ads_data.append({
+                        "vol": float(row[vol_col]),
+                        "cpc": float(row.get(cpc_col, 0)),
+                        "competition": float(row.get(comp_col, 0.5))
+                    })
+            
+            signals.ads_data = ads_data
+            businesses.append(signals)
         
-        # Top opportunities by valuation
-        top_valuations = sorted(results, key=lambda x: x.get("valuation", {}).get("valuation", {}).get("p50", 0), reverse=True)[:10]
+        return businesses
+    
+    async def _valuate_batch(self, businesses: List[BusinessSignals], use_cache: bool = True,
+                             in_pool: bool = False, persist: bool = True) -> Tuple[List[Optional[Dict[str, Any]]], int]:
+        """Valuation reports for ``businesses`` in order (``None`` where one failed) and the cache hit count"""
+        # Fingerprint before enrichment; cached businesses skip enrichment and simulation
+        fingerprints = [self.valuation_fingerprint(business) for business in businesses]
+        cached_results = [self.result_cache.get(fp) if use_cache else None for fp in fingerprints]
+        pending = [i for i, cached in enumerate(cached_results) if cached is None]
+        cached = len(businesses) - len(pending)
+        logger.info(f"💾 {cached} cached, {len(pending)} to valuate")
+        
+        # Enrich in parallel batches; the valuation itself runs as one matrix per category
+        batch_size = 10
+        enriched = []
+        
+        for i in range(0, len(pending), batch_size):
+            batch = pending[i:i + batch_size]
+            batch_results = await asyncio.gather(
+                *[self._enrich_business_signals(businesses[j]) for j in batch],
+                return_exceptions=True
+            )
+            
+            for j, result in zip(batch, batch_results):
+                if isinstance(result, Exception):
+                    logger.error(f"Batch processing error: {result}")
+                else:
+                    enriched.append((j, *result))
+        
+        # One seeded generator per business, so a row matches its single valuation exactly
+        signals_list = [signals for _, signals, _ in enriched]
+        if in_pool:
+            valuation_results = await self._pool_monte_carlo_valuation(signals_list, [fingerprints[j] for j, _, _ in enriched])
+        else:
+            valuation_results = await asyncio.to_thread(
+                self._batch_monte_carlo_valuation,
+                signals_list, [self._seeded_rng(fingerprints[j]) for j, _, _ in enriched]
+            )
         
-        # High transition risk opportunities
-        high_risk = [r for r in results if r.get("aoa", {}).get("owner_transition_risk", {}).get("risk_score", 0) > 60]
+        report_results = await asyncio.gather(
+            *[self._build_valuation_report(businesses[j], signals, self._category_prior(signals), valuation, sources)
+              for (j, signals, sources), valuation in zip(enriched, valuation_results)],
+            return_exceptions=True
+        )
+        for (j, _, _), result in zip(enriched, report_results):
+            if isinstance(result, Exception):
+                logger.error(f"Batch processing error: {result}")
+            else:
+                result["fingerprint"] = fingerprints[j]
+                self.result_cache.put(fingerprints[j], result)
+                cached_results[j] = result
+        
+        if persist:
+            self._persist([(business, fp, result) for business, fp, result in zip(businesses, fingerprints, cached_results)
+                           if result is not None])
+        return cached_results, cached
+    
+    async def revalue_portfolio(self, businesses: Optional[List[BusinessSignals]] = None,
+                                business_ids: Optional[List[str]] = None, force: bool = False,
+                                in_pool: bool = True) -> Dict[str, Any]:
+        """Revalue the stored portfolio, recomputing only businesses whose fingerprint changed
+        
+        ``businesses`` are added to (or updated in) the portfolio first; without
+        them the stored signals are used, optionally limited to ``business_ids``.
+        A fingerprint covers the signals, category prior, sampling settings and
+        engine version, so a prior or engine upgrade revalues everything it touches.
+        """
+        if self.store is None:
+            raise ValueError("Portfolio revaluation needs a valuation store")
+        
+        started = time.time()
+        if businesses is not None:
+            self.store.add_businesses(businesses)
+            portfolio = iter(businesses)
+        else:
+            portfolio = (BusinessSignals(**signals) for signals in self.store.business_signals(business_ids))
+        
+        counts = {"total": 0, "unchanged": 0, "revalued": 0, "failed": 0}
+        while True:
+            chunk = [signals for _, signals in zip(range(BATCH_CSV_CHUNK_ROWS), portfolio)]
+            if not chunk:
+                break
+            counts["total"] += len(chunk)
+            
+            # Signals and fingerprints as the caller gave them - enrichment works on copies, so the
+            # stored signals reproduce the stored fingerprint on the next run
+            latest = self.store.latest_fingerprints([signals.business_id for signals in chunk])
+            fingerprints = [self.valuation_fingerprint(signals) for signals in chunk]
+            changed = [(signals, fingerprint) for signals, fingerprint in zip(chunk, fingerprints)
+                       if force or latest.get(signals.business_id) != fingerprint]
+            counts["unchanged"] += len(chunk) - len(changed)
+            if not changed:
+                continue
+            
+            results, _ = await self._valuate_batch([signals for signals, _ in changed], use_cache=not force,
+                                                   in_pool=in_pool, persist=False)
+            entries = [(signals, fingerprint, result) for (signals, fingerprint), result in zip(changed, results)
+                       if result is not None]
+            self._persist(entries, portfolio_only=False)
+            counts["revalued"] += len(entries)
+            counts["failed"] += len(changed) - len(entries)
+            logger.info(f"📒 Portfolio revaluation: {counts}")
         
         return {
-            "valuation_stats": {
-                "mean": np.mean(valuations) if valuations else 0,
-                "median": np.median(valuations) if valuations else 0,
-                "total_market_value": sum(valuations) if valuations else 0
-            },
-            "aoa_stats": {
-                "mean_score": np.mean(aoa_scores) if aoa_scores else 0,
-                "grade_distribution": self._calculate_grade_distribution(aoa_scores)
-            },
-            "top_opportunities": [
-                {
-                    "name": r["business_name"],
-                    "valuation_p50": r["valuation"]["valuation"]["p50"],
-                    "aoa_score": r["aoa"]["total_score"],
-                    "transition_risk": r["aoa"]["owner_transition_risk"]["risk_score"]
-                }
-                for r in top_valuations[:5]
-            ],
-            "high_transition_risk": len(high_risk),
-            "acquisition_targets": len([r for r in results if r.get("aoa", {}).get("total_score", 0) > 70])
+            "success": True,
+            **counts,
+            "engine_version": ENGINE_VERSION,
+            "seconds": round(time.time() - started, 3),
+            "completed_at": datetime.now().isoformat()
+        }
+    
+    async def _pool_monte_carlo_valuation(self, signals_list: List[BusinessSignals],
+                                          fingerprints: List[str]) -> List[Dict[str, Any]]:
+        """``_batch_monte_carlo_valuation`` spread over the worker process pool by category"""
+        groups: Dict[str, List[int]] = {}
+        for i, signals in enumerate(signals_list):
+            groups.setdefault(self._category_prior(signals).category, []).append(i)
+        tasks = [indices[start:start + BATCH_TASK_ROWS]
+                 for indices in groups.values() for start in range(0, len(indices), BATCH_TASK_ROWS)]
+        
+        summaries: List[Optional[Dict[str, Any]]] = [None] * len(signals_list)
+        try:
+            loop = asyncio.get_running_loop()
+            pool = self._batch_pool()
+            task_results = await asyncio.gather(*[
+                loop.run_in_executor(pool, _simulate_batch_rows, [(asdict(signals_list[i]), fingerprints[i]) for i in task])
+                for task in tasks
+            ])
+        except (BrokenProcessPool, OSError, pickle.PicklingError) as e:
+            # No usable worker pool - simulate on this process instead
+            logger.error(f"Valuation worker pool unavailable ({e}) - simulating in-process")
+            self._process_pool = None
+            return await asyncio.to_thread(
+                self._batch_monte_carlo_valuation, signals_list, [self._seeded_rng(fp) for fp in fingerprints]
+            )
+        
+        for task, task_summaries in zip(tasks, task_results):
+            for i, summary in zip(task, task_summaries):
+                summaries[i] = summary
+        return summaries
+    
+    def _batch_pool(self) -> ProcessPoolExecutor:
+        """Worker processes for batch simulation, started on first use with this engine's sampling settings"""
+        if self._process_pool is None:
+            self._process_pool = ProcessPoolExecutor(
+                max_workers=BATCH_WORKERS,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_init_batch_worker,
+                initargs=(self.sampling_settings(),)
+            )
+        return self._process_pool
+    
+    def sampling_settings(self) -> Dict[str, Any]:
+        """Monte Carlo settings a worker engine needs to reproduce this engine's draws"""
+        return {
+            "n_monte_carlo": self.n_monte_carlo,
+            "adaptive_sampling": self.adaptive_sampling,
+            "mc_block_size": self.mc_block_size,
+            "mc_min_blocks": self.mc_min_blocks,
+            "mc_tolerance": self.mc_tolerance,
+            "mc_max_samples": self.mc_max_samples,
+            "use_qmc": self.use_qmc
+        }
+    
+    def _batch_summary_arrays(self, results: List[Dict]) -> Dict[str, np.ndarray]:
+        """Column arrays of the per-business figures the batch summary reads"""
+        return {
+            "valuation_p50": np.array([r.get("valuation", {}).get("valuation", {}).get("p50", 0) for r in results], dtype=float),
+            "aoa_score": np.array([r.get("aoa", {}).get("total_score", 0) for r in results], dtype=float),
+            "transition_risk": np.array([r.get("aoa", {}).get("owner_transition_risk", {}).get("risk_score", 0) for r in results], dtype=float)
         }
     
+    def _generate_batch_summary(self, results: List[Dict], arrays: Optional[Dict[str, np.ndarray]] = None) -> Dict[str, Any]:
+        """Generate summary statistics for batch processing"""
+        accumulator = BatchSummaryAccumulator()
+        accumulator.add([r.get("business_name") for r in results],
+                        arrays if arrays is not None else self._batch_summary_arrays(results))
+        return accumulator.summary()
+    
     def _calculate_grade_distribution(self, scores: List[float]) -> Dict[str, int]:
         """Calculate distribution of AOA grades"""
-        distribution = {"A": 0, "B": 0, "C": 0, "D": 0}
-        
-        for score in scores:
-            if score >= 80:
-                distribution["A"] += 1
-            elif score >= 65:
-                distribution["B"] += 1
-            elif score >= 50:
-                distribution["C"] += 1
-            else:
-                distribution["D"] += 1
-        
-        return distribution
+        return grade_distribution(scores)
     
     async def generate_zip_opportunity_report(self, zip_codes: List[str]) -> Dict[str, Any]:
         """Generate top ZIP code opportunities report"""
+        async for event in self.stream_zip_opportunity_report(zip_codes):
+            if event["type"] == "summary":
+                return {k: v for k, v in event.items() if k != "type"}
+    
+    async def stream_zip_opportunity_report(self, zip_codes: List[str]) -> AsyncIterator[Dict[str, Any]]:
+        """ZIP opportunity report as events: one ``zip`` (or ``error``) per ZIP as it finishes, then ``summary``
+        
+        ZIPs and the businesses in them are valued concurrently, with at most
+        ZIP_REPORT_CONCURRENCY listing fetches and valuations in flight.
+        """
         logger.info(f"🏆 Generating ZIP opportunity report for {len(zip_codes)} ZIP codes")
         
-        zip_analyses = []
+        limit = asyncio.Semaphore(ZIP_REPORT_CONCURRENCY)
+        zip_analyses: Dict[int, Dict[str, Any]] = {}
         
-        for zip_code in zip_codes:
+        async def analyze(index: int, zip_code: str):
             try:
-                # Get businesses in ZIP code (simulated - integrate with your APIs)
-                businesses = await self._get_businesses_in_zip(zip_code)
-                
-                if businesses:
-                    # Analyze each business
-                    business_analyses = []
-                    for business in businesses[:20]:  # Limit to top 20 per ZIP
-                        analysis = await self.valuate_business(business)
-                        business_analyses.append(analysis)
-                    
-                    # Calculate ZIP-level metrics
-                    zip_analysis = self._analyze_zip_opportunity(zip_code, business_analyses)
-                    zip_analyses.append(zip_analysis)
-                    
+                return index, zip_code, await self._analyze_zip(zip_code, limit), None
             except Exception as e:
-                logger.error(f"Error analyzing ZIP {zip_code}: {e}")
+                return index, zip_code, None, e
         
-        # Rank ZIP codes by opportunity score
-        ranked_zips = sorted(zip_analyses, key=lambda x: x.get("opportunity_score", 0), reverse=True)
-        
-        return {
+        tasks = [asyncio.ensure_future(analyze(i, zip_code)) for i, zip_code in enumerate(zip_codes)]
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                index, zip_code, zip_analysis, error = await next_done
+                if error is not None:
+                    logger.error(f"Error analyzing ZIP {zip_code}: {error}")
+                    yield {"type": "error", "zip_code": zip_code, "error": str(error)}
+                elif zip_analysis is not None:
+                    zip_analyses[index] = zip_analysis
+                    yield {"type": "zip", "zip_analysis": zip_analysis}
+        finally:
+            for task in tasks:
+                task.cancel()
+        
+        # Rank ZIP codes by opportunity score (ties keep request order)
+        analyses = [zip_analyses[i] for i in sorted(zip_analyses)]
+        ranked_zips = sorted(analyses, key=lambda x: x.get("opportunity_score", 0), reverse=True)
+        
+        yield {
+            "type": "summary",
             "top_zip_codes": ranked_zips[:10],
-            "total_zips_analyzed": len(zip_analyses),
-            "total_businesses_analyzed": sum(len(z.get("businesses", [])) for z in zip_analyses),
+            "total_zips_analyzed": len(analyses),
+            "total_businesses_analyzed": sum(z.get("total_businesses", 0) for z in analyses),
             "analysis_timestamp": datetime.now().isoformat()
         }
     
+    async def _analyze_zip(self, zip_code: str, limit: asyncio.Semaphore) -> Optional[Dict[str, Any]]:
+        """Value the businesses in one ZIP concurrently; ``None`` when the ZIP has none"""
+        async with limit:
+            listings = await ZIP_CACHE.get_or_fetch(("businesses", zip_code),
+                                                    lambda: self._get_zip_listings(zip_code))
+        if not listings:
+            return None
+        # Fresh signals per report, so nothing a valuation does reaches the cached listing
+        businesses = [BusinessSignals(**{**row, "ads_data": [dict(ad) for ad in row["ads_data"]]}) for row in listings]
+        
+        async def valuate(business: BusinessSignals) -> Dict[str, Any]:
+            async with limit:
+                return await self.valuate_business(business)
+        
+        # Limit to top ZIP_BUSINESS_LIMIT per ZIP; one failure fails the ZIP, so stop its siblings
+        # rather than let them hold report-wide semaphore slots
+        tasks = [asyncio.ensure_future(valuate(b)) for b in businesses[:ZIP_BUSINESS_LIMIT]]
+        try:
+            business_analyses = await asyncio.gather(*tasks)
+        finally:
+            for task in tasks:
+                task.cancel()
+        return self._analyze_zip_opportunity(zip_code, list(business_analyses))
+    
+    async def _get_zip_listings(self, zip_code: str) -> List[Dict[str, Any]]:
+        """Businesses in a ZIP as plain dicts, the form ZIP_CACHE keeps them in"""
+        return [asdict(business) for business in await self._get_businesses_in_zip(zip_code)]
+    
     async def _get_businesses_in_zip(self, zip_code: str) -> List[BusinessSignals]:
         """Get businesses in ZIP code (integrate with your APIs)"""
         # This is where you'd integrate with Yelp, Google Places, etc.
@@ -1465,9 +2324,45 @@ class SMBValuationEngine:
         }
         return zip_mapping.get(zip_code, f"City for {zip_code}")
     
+    @property
+    def session(self) -> aiohttp.ClientSession:
+        # A session is bound to the loop it was opened on; callers using asyncio.run get a new loop each time
+        loop = asyncio.get_running_loop()
+        if self._session is None or self._session.closed or self._session_loop is not loop:
+            # Pooled keep-alive connections, reused across valuations while the loop lives
+            connector = aiohttp.TCPConnector(limit=HTTP_CONNECTION_LIMIT, limit_per_host=HTTP_CONNECTIONS_PER_HOST,
+                                             ttl_dns_cache=300)
+            self._session = aiohttp.ClientSession(connector=connector)
+            self._session_loop = loop
+        return self._session
+    
+    @session.setter
+    def session(self, session: aiohttp.ClientSession):
+        self._session = session
+        self._session_loop = getattr(session, "_loop", None)
+    
     async def close(self):
-        """Close HTTP session"""
-        await self.session.close()
+        """Close HTTP session and batch workers"""
+        if self._session is not None:
+            await self._session.close()
+        if self._process_pool is not None:
+            self._process_pool.shutdown(wait=False, cancel_futures=True)
+            self._process_pool = None
+
+# Batch worker processes - one engine per process, configured once
+_BATCH_WORKER_ENGINE: Optional[SMBValuationEngine] = None
+
+def _init_batch_worker(sampling: Dict[str, Any]):
+    global _BATCH_WORKER_ENGINE
+    _BATCH_WORKER_ENGINE = SMBValuationEngine({})
+    for name, value in sampling.items():
+        setattr(_BATCH_WORKER_ENGINE, name, value)
+
+def _simulate_batch_rows(rows: List[Tuple[Dict[str, Any], str]]) -> List[Dict[str, Any]]:
+    """Monte Carlo summaries for (signals dict, fingerprint) rows, seeded like in-process valuations"""
+    engine = _BATCH_WORKER_ENGINE
+    signals_list = [BusinessSignals(**signals) for signals, _ in rows]
+    return engine._batch_monte_carlo_valuation(signals_list, [engine._seeded_rng(fp) for _, fp in rows])
 
 # Flask API Integration
 from flask import Flask, request, jsonify
@@ -1475,7 +2370,9 @@ from flask import Flask, request, jsonify
 def create_valuation_api(api_keys: Dict[str, str]) -> Flask:
     """Create Flask API for valuation engine"""
     app = Flask(__name__)
-    engine = SMBValuationEngine(api_keys)
+    store = ValuationStore(os.getenv("VALUATION_DB_PATH")) if os.getenv("VALUATION_DB_PATH") else None
+    engine = SMBValuationEngine(api_keys, result_cache=ValuationResultCache(directory=os.getenv("VALUATION_CACHE_DIR")),
+                                store=store)
     
     @app.route('/api/valuate', methods=['POST'])
     async def valuate_single():
@@ -1483,19 +2380,10 @@ def create_valuation_api(api_keys: Dict[str, str]) -> Flask:
         try:
             data = request.get_json()
             
-            signals = BusinessSignals(
-                business_id=data.get("business_id", "unknown"),
-                name=data.get("name", "Unknown Business"),
-                category=data.get("category", "HVAC"),
-                geo=data.get("geo", "Unknown Location"),
-                R_total=data.get("R_total", 0),
-                R_12=data.get("R_12", 0),
-                stars=data.get("stars", 3.5),
-                ads_data=data.get("ads_data", []),
-                years_in_business=data.get("years_in_business", 5)
-            )
+            # Same mapping as the sensitivity route, so its base matches this valuation
+            signals = business_signals_from_dict(data)
             
-            result = await engine.valuate_business(signals)
+            result = await engine.valuate_business(signals, use_cache=data.get("use_cache", True))
             return jsonify(result)
             
         except Exception as e:
@@ -1512,7 +2400,7 @@ def create_valuation_api(api_keys: Dict[str, str]) -> Flask:
             if not csv_content:
                 return jsonify({"error": "CSV content required"}), 400
             
-            result = await engine.batch_valuate_csv(csv_content, default_category)
+            result = await engine.batch_valuate_csv(csv_content, default_category, use_cache=data.get("use_cache", True))
             return jsonify(result)
             
         except Exception as e:
@@ -1534,6 +2422,20 @@ def create_valuation_api(api_keys: Dict[str, str]) -> Flask:
         except Exception as e:
             return jsonify({"error": str(e)}), 500
     
+    @app.route('/api/valuate/sensitivity', methods=['POST'])
+    def valuate_sensitivity():
+        """Valuation deltas, tornado data and elasticities for perturbed inputs"""
+        try:
+            data = request.get_json()
+            signals = business_signals_from_dict(data.get("business", {}))
+            result = engine.sensitivity_analysis(signals, data.get("perturbations"), data.get("n_samples"))
+            return jsonify(result)
+            
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+        except Exception as e:
+            return jsonify({"error": str(e)}), 500
+    
     @app.route('/api/priors', methods=['GET'])
     def get_priors():
         """Get category priors"""
@@ -14,23 +14,26 @@ FEATURES:
 
 import os
 import json
+import math
 import asyncio
 import aiohttp
 import numpy as np
 import pandas as pd
 from datetime import datetime, timedelta
-from typing import Dict, List, Optional, Any, Tuple
+from typing import AsyncIterator, Dict, List, Optional, Any, Tuple
 from dataclasses import dataclass, asdict
-from flask import Flask, request, jsonify, render_template_string, send_from_directory
+from flask import Flask, Response, request, jsonify, render_template_string, send_from_directory, stream_with_context
 from flask_cors import CORS
 import logging
 import requests
 from concurrent.futures import ThreadPoolExecutor
 import folium
 from folium.plugins import HeatMap
-import plotly.graph_objects as go
-import plotly.express as px
 from plotly.utils import PlotlyJSONEncoder
+from background_loop import BackgroundEventLoop
+from enrichment_cache import TTLCache
+from geocode_cache import shared_geocode_cache
+from heatmap_grid import HeatmapGrid, sample_opportunity_grid
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -52,6 +55,27 @@ API_CONFIG = {
     "APIFY_API_TOKEN": os.getenv("APIFY_API_TOKEN", "your_apify_api_token_here"),
 }
 
+# Area heatmaps: grid points per side, cells analyzed at once, and analyzed cells by
+# (lat, lng, radius, category) - grids snap to a fixed lattice so panned maps share cells
+HEATMAP_GRID_SIZE = 11
+HEATMAP_CONCURRENCY = int(os.getenv("HEATMAP_CONCURRENCY", "16"))
+HEATMAP_TILE_CACHE = TTLCache(ttl_seconds=6 * 3600, max_entries=50000)
+MILES_PER_DEGREE_LAT = 69.0
+
+# Compact heatmap layers and the grid-cell field each one carries
+HEATMAP_LAYER_KEYS = {
+    "business_density": "density",
+    "tam_potential": "tam_value",
+    "tsm_opportunity": "tsm_value",
+    "succession_risk": "succession_risk",
+    "digital_gaps": "digital_gap",
+    "opportunity": "opportunity"
+}
+
+# Batch analysis: businesses analyzed at once (requests may ask for fewer) and the per-business time limit
+BATCH_ANALYSIS_CONCURRENCY = int(os.getenv("BATCH_ANALYSIS_CONCURRENCY", "8"))
+BATCH_ANALYSIS_TIMEOUT_SECONDS = float(os.getenv("BATCH_ANALYSIS_TIMEOUT_SECONDS", "60"))
+
 @dataclass
 class BusinessData:
     """Unified business data structure"""
@@ -99,7 +123,8 @@ class UnifiedOkapiqEngine:
         self.session = None
         logger.info("🚀 Unified Okapiq Engine initialized")
     
-    async def analyze_business_comprehensive(self, business_name: str, location: str) -> Dict[str, Any]:
+    async def analyze_business_comprehensive(self, business_name: str, location: str,
+                                             include_plotly: bool = False, quantize: bool = False) -> Dict[str, Any]:
         """Comprehensive business analysis combining all algorithms"""
         logger.info(f"🔍 Comprehensive analysis: {business_name} in {location}")
         
@@ -117,7 +142,7 @@ class UnifiedOkapiqEngine:
             opportunity_analysis = await self._analyze_opportunities(business_data)
             
             # Step 5: Generate heatmap data
-            heatmap_data = await self._generate_area_heatmap(location, business_data["category"])
+            heatmap_data = await self._generate_area_heatmap(location, business_data["category"], include_plotly, quantize)
             
             return {
                 "business": business_data,
@@ -133,55 +158,316 @@ class UnifiedOkapiqEngine:
             logger.error(f"Comprehensive analysis failed: {e}")
             return {"error": str(e)}
     
-    async def generate_area_heatmap(self, center_location: str, category: str, radius_miles: int = 25) -> Dict[str, Any]:
-        """Generate instant heatmap for business density, TAM, TSM in any area"""
+    async def stream_batch_analysis(self, businesses: List[Dict[str, Any]], generate_heatmap: bool = True,
+                                    concurrency: int = BATCH_ANALYSIS_CONCURRENCY,
+                                    timeout_seconds: float = BATCH_ANALYSIS_TIMEOUT_SECONDS,
+                                    heatmap_options: Optional[Dict[str, bool]] = None) -> AsyncIterator[Dict[str, Any]]:
+        """Batch analysis as events: ``started``, a ``result`` or ``error`` per business as it finishes, then ``summary``
+        
+        Businesses are analyzed concurrently (at most ``concurrency`` at once),
+        each under its own ``timeout_seconds``; a failed, timed out or invalid
+        business is reported inline and the rest of the batch carries on.  The
+        optional area heatmap around the first business is built alongside and
+        sent as a ``heatmap`` event before the summary (``heatmap_options`` as
+        for ``stream_area_heatmap``).
+        """
+        valid = [(index, business) for index, business in enumerate(businesses)
+                 if isinstance(business, dict) and business.get("business_name") and business.get("location")]
+        yield {"type": "started", "total": len(businesses), "valid": len(valid),
+               "concurrency": concurrency, "timeout_seconds": timeout_seconds}
+        
+        valid_indexes = {index for index, _ in valid}
+        for index, business in enumerate(businesses):
+            if index not in valid_indexes:
+                yield {"type": "error", "index": index, "error": "business_name and location required"}
+        
+        limit = asyncio.Semaphore(concurrency)
+        
+        async def analyze(index: int, business: Dict[str, Any]):
+            started = datetime.now()
+            try:
+                async with limit:
+                    analysis = await asyncio.wait_for(
+                        self.analyze_business_comprehensive(business["business_name"], business["location"]),
+                        timeout_seconds
+                    )
+                error = analysis.get("error")
+            except asyncio.TimeoutError:
+                analysis, error = None, f"timed out after {timeout_seconds:g}s"
+            except Exception as e:
+                analysis, error = None, str(e)
+            return index, business, analysis, error, (datetime.now() - started).total_seconds()
+        
+        heatmap_task = None
+        if generate_heatmap and valid:
+            # Use first business location as center
+            heatmap_task = asyncio.ensure_future(self.generate_area_heatmap(
+                valid[0][1]["location"], "All", **(heatmap_options or {})
+            ))
+        
+        results = []
+        failed = len(businesses) - len(valid)
+        tasks = [asyncio.ensure_future(analyze(index, business)) for index, business in valid]
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                index, business, analysis, error, elapsed = await next_done
+                item = {"index": index, "business_name": business["business_name"],
+                        "location": business["location"], "elapsed_seconds": round(elapsed, 3)}
+                if error is not None:
+                    logger.error(f"Batch analysis of {business['business_name']} failed: {error}")
+                    failed += 1
+                    yield {"type": "error", **item, "error": error}
+                    continue
+                results.append(analysis)
+                yield {"type": "result", **item, "analysis": analysis}
+            
+            heatmap_data = None
+            if heatmap_task is not None:
+                if results:
+                    heatmap_data = await heatmap_task
+                    yield {"type": "heatmap", "heatmap": heatmap_data}
+                else:
+                    heatmap_task.cancel()
+        finally:
+            for task in tasks:
+                task.cancel()
+            if heatmap_task is not None:
+                heatmap_task.cancel()
+        
+        valuations = [r.get("valuation", {}).get("valuation", {}).get("p50", 0) for r in results if "valuation" in r]
+        yield {
+            "type": "summary",
+            "total_analyzed": len(results),
+            "failed": failed,
+            "avg_valuation": float(np.mean(valuations)) if valuations else 0,
+            "high_opportunity_count": len([r for r in results if r.get("opportunities", {}).get("overall_opportunity_score", 0) > 70]),
+            "total_tam": sum([r.get("tam_tsm", {}).get("tam", {}).get("total_market_value", 0) for r in results]),
+            "total_tsm": sum([r.get("tam_tsm", {}).get("tsm", {}).get("serviceable_market_value", 0) for r in results]),
+            "timestamp": datetime.now().isoformat()
+        }
+    
+    async def generate_area_heatmap(self, center_location: str, category: str, radius_miles: int = 25,
+                                    **options) -> Dict[str, Any]:
+        """Generate instant heatmap for business density, TAM, TSM in any area (options as for ``stream_area_heatmap``)"""
+        async for event in self.stream_area_heatmap(center_location, category, radius_miles, **options):
+            if event["type"] == "summary":
+                return {k: v for k, v in event.items() if k != "type"}
+            if event["type"] == "error" and "row" not in event:
+                return {"error": event["error"]}
+    
+    async def stream_area_heatmap(self, center_location: str, category: str, radius_miles: int = 25,
+                                  include_map: bool = False, include_plotly: bool = False,
+                                  quantize: bool = False) -> AsyncIterator[Dict[str, Any]]:
+        """Area heatmap as events: ``grid``, then one ``cell`` per grid point as it finishes, then ``summary``
+        
+        Cells are analyzed concurrently (at most HEATMAP_CONCURRENCY at once)
+        and come from HEATMAP_TILE_CACHE when an earlier heatmap covered them.
+        The summary carries the layers as a compact grid (uint8 with
+        ``quantize``); the point layers with the Folium map (``include_map``)
+        and the Plotly figure (``include_plotly``) are only built on request.
+        """
         logger.info(f"🗺️ Generating heatmap for {category} businesses around {center_location}")
         
         try:
             # Get center coordinates
             center_coords = await self._geocode_location(center_location)
             if not center_coords:
-                return {"error": "Could not geocode location"}
+                yield {"type": "error", "error": "Could not geocode location"}
+                return
             
             # Generate grid of analysis points
             analysis_grid = self._generate_analysis_grid(center_coords, radius_miles)
+            south, west = analysis_grid[0]["lat"], analysis_grid[0]["lng"]
+            north, east = analysis_grid[-1]["lat"], analysis_grid[-1]["lng"]
+            yield {
+                "type": "grid",
+                "center_location": center_location,
+                "center_coordinates": center_coords,
+                "category": category,
+                "radius_miles": radius_miles,
+                "rows": HEATMAP_GRID_SIZE,
+                "cols": HEATMAP_GRID_SIZE,
+                "bounds": {"south": south, "west": west, "north": north, "east": east},
+                "points": len(analysis_grid)
+            }
             
-            # Analyze each grid point
-            grid_analyses = []
-            for point in analysis_grid:
-                point_analysis = await self._analyze_grid_point(point, category)
-                grid_analyses.append(point_analysis)
+            limit = asyncio.Semaphore(HEATMAP_CONCURRENCY)
             
-            # Create heatmap layers
-            heatmap_layers = {
-                "business_density": self._create_density_layer(grid_analyses),
-                "tam_potential": self._create_tam_layer(grid_analyses),
-                "tsm_opportunity": self._create_tsm_layer(grid_analyses),
-                "succession_risk": self._create_succession_layer(grid_analyses),
-                "digital_gaps": self._create_digital_gaps_layer(grid_analyses)
-            }
+            async def analyze(point: Dict[str, Any]):
+                key = (point["lat"], point["lng"], radius_miles, category)
+                cached = HEATMAP_TILE_CACHE.get(key) is not None
+                try:
+                    async with limit:
+                        cell = await HEATMAP_TILE_CACHE.get_or_fetch(key, lambda: self._analyze_grid_point(point, category))
+                    return point, cell, cached, None
+                except Exception as e:
+                    return point, None, cached, e
+            
+            # Analyze grid points concurrently, yielding each as it finishes
+            grid_analyses = []
+            tasks = [asyncio.ensure_future(analyze(point)) for point in analysis_grid]
+            try:
+                for next_done in asyncio.as_completed(tasks):
+                    point, cell, cached, error = await next_done
+                    if cell is None:
+                        logger.error(f"Heatmap cell {point['row']},{point['col']} failed: {error}")
+                        yield {"type": "error", "row": point["row"], "col": point["col"], "error": str(error or "no data")}
+                        continue
+                    cell = {**cell, "row": point["row"], "col": point["col"]}
+                    grid_analyses.append(cell)
+                    yield {"type": "cell", "row": point["row"], "col": point["col"], "cached": cached, "cell": cell}
+            finally:
+                for task in tasks:
+                    task.cancel()
+            grid_analyses.sort(key=lambda cell: (cell["row"], cell["col"]))
             
-            # Generate interactive map
-            interactive_map = self._create_interactive_map(center_coords, heatmap_layers)
+            # Compact layers over the analysis lattice
+            steps = HEATMAP_GRID_SIZE - 1
+            grid = HeatmapGrid.from_cells(grid_analyses, HEATMAP_GRID_SIZE, HEATMAP_GRID_SIZE, south, west,
+                                          (north - south) / steps, (east - west) / steps, HEATMAP_LAYER_KEYS)
             
             # Calculate area summary
             area_summary = self._calculate_area_summary(grid_analyses, category)
             
-            return {
+            summary = {
+                "type": "summary",
                 "center_location": center_location,
                 "center_coordinates": center_coords,
                 "category": category,
                 "radius_miles": radius_miles,
-                "heatmap_layers": heatmap_layers,
-                "interactive_map": interactive_map,
+                "grid": grid.to_payload(quantize),
                 "area_summary": area_summary,
                 "analysis_points": len(grid_analyses),
                 "timestamp": datetime.now().isoformat()
             }
             
+            if include_map:
+                # Point layers and the interactive Folium map
+                heatmap_layers = {
+                    "business_density": self._create_density_layer(grid_analyses),
+                    "tam_potential": self._create_tam_layer(grid_analyses),
+                    "tsm_opportunity": self._create_tsm_layer(grid_analyses),
+                    "succession_risk": self._create_succession_layer(grid_analyses),
+                    "digital_gaps": self._create_digital_gaps_layer(grid_analyses)
+                }
+                summary["heatmap_layers"] = heatmap_layers
+                summary["interactive_map"] = self._create_interactive_map(center_coords, heatmap_layers)
+            if include_plotly:
+                summary["plotly_json"] = self._create_plotly_heatmap(grid)
+            
+            yield summary
+            
         except Exception as e:
             logger.error(f"Heatmap generation failed: {e}")
-            return {"error": str(e)}
+            yield {"type": "error", "error": str(e)}
+    
+    def _generate_analysis_grid(self, center_coords: Dict[str, float], radius_miles: float) -> List[Dict[str, Any]]:
+        """HEATMAP_GRID_SIZE x HEATMAP_GRID_SIZE points spanning the radius around the center
+        
+        Points sit on a lattice fixed by the radius (longitude spacing per whole
+        degree of latitude), so a panned or overlapping grid lands on the same
+        coordinates and reuses cached cells.
+        """
+        lat_step = 2 * radius_miles / (HEATMAP_GRID_SIZE - 1) / MILES_PER_DEGREE_LAT
+        lng_step = lat_step / max(np.cos(np.radians(round(center_coords["lat"]))), 0.2)
+        center_row = round(center_coords["lat"] / lat_step)
+        center_col = round(center_coords["lng"] / lng_step)
+        half = HEATMAP_GRID_SIZE // 2
+        
+        return [
+            {"row": i, "col": j, "lat": round((center_row + i - half) * lat_step, 6), "lng": round((center_col + j - half) * lng_step, 6)}
+            for i in range(HEATMAP_GRID_SIZE)
+            for j in range(HEATMAP_GRID_SIZE)
+        ]
+    
+    async def _analyze_grid_point(self, point: Dict[str, Any], category: str) -> Optional[Dict[str, Any]]:
+        """Density, TAM/TSM, succession risk and digital gaps for one grid cell
+        
+        ``None`` when no data source answered, so the tile cache doesn't keep
+        a cell made only of defaults.
+        """
+        location = f"{point['lat']},{point['lng']}"
+        business_data = await self._fetch_business_data(category if category != "All" else "businesses", location)
+        if not business_data["sources"]:
+            return None
+        industry_data = await self._get_industry_data(category, location)
+        
+        tam = self._calculate_tam(industry_data, business_data["demographics"])
+        tsm = self._calculate_tsm(tam, business_data["coordinates"], business_data["demographics"])
+        succession_risk = self._calculate_succession_risk(business_data)["risk_score"] / 100
+        digital_gap = 1 - self._analyze_digital_presence(business_data)["digital_maturity_score"] / 100
+        
+        # Review volume as the density signal (500+ reviews around a point = saturated)
+        density = min(1.0, business_data["reviews"]["total"] / 500)
+        
+        return {
+            "lat": point["lat"],
+            "lng": point["lng"],
+            "density": density,
+            "tam_value": tam["total_value"],
+            "tsm_value": tsm["serviceable_value"],
+            "succession_risk": succession_risk,
+            "digital_gap": digital_gap,
+            "opportunity": succession_risk * 0.4 + digital_gap * 0.3 + density * 0.3,
+            "business_count": int(density * 20)  # Estimate business count
+        }
+    
+    def _create_layer(self, grid_analyses: List[Dict[str, Any]], key: str) -> List[List[float]]:
+        """[lat, lng, value] triples for one metric"""
+        return [[cell["lat"], cell["lng"], cell[key]] for cell in grid_analyses]
+    
+    def _create_density_layer(self, grid_analyses: List[Dict[str, Any]]) -> List[List[float]]:
+        return self._create_layer(grid_analyses, "density")
+    
+    def _create_tam_layer(self, grid_analyses: List[Dict[str, Any]]) -> List[List[float]]:
+        return self._create_layer(grid_analyses, "tam_value")
+    
+    def _create_tsm_layer(self, grid_analyses: List[Dict[str, Any]]) -> List[List[float]]:
+        return self._create_layer(grid_analyses, "tsm_value")
+    
+    def _create_succession_layer(self, grid_analyses: List[Dict[str, Any]]) -> List[List[float]]:
+        return self._create_layer(grid_analyses, "succession_risk")
+    
+    def _create_digital_gaps_layer(self, grid_analyses: List[Dict[str, Any]]) -> List[List[float]]:
+        return self._create_layer(grid_analyses, "digital_gap")
+    
+    def _create_interactive_map(self, center_coords: Dict[str, float], heatmap_layers: Dict[str, List[List[float]]]) -> str:
+        """Folium map HTML with one toggleable heat layer per metric"""
+        area_map = folium.Map(location=[center_coords["lat"], center_coords["lng"]], zoom_start=10)
+        
+        for name, points in heatmap_layers.items():
+            # Leaflet heat weights are 0-1, so scale each layer by its own peak
+            peak = max((point[2] for point in points), default=0) or 1
+            HeatMap(
+                [[lat, lng, value / peak] for lat, lng, value in points],
+                name=name.replace("_", " ").title(),
+                show=name == "business_density"
+            ).add_to(area_map)
+        
+        folium.LayerControl().add_to(area_map)
+        return area_map._repr_html_()
+    
+    def _calculate_area_summary(self, grid_analyses: List[Dict[str, Any]], category: str) -> Dict[str, Any]:
+        """Totals and hot spots across the analyzed cells"""
+        if not grid_analyses:
+            return {"category": category, "cells_analyzed": 0}
+        
+        top_cells = sorted(grid_analyses, key=lambda cell: cell["opportunity"], reverse=True)[:5]
+        
+        return {
+            "category": category,
+            "cells_analyzed": len(grid_analyses),
+            "estimated_businesses": sum(cell["business_count"] for cell in grid_analyses),
+            "avg_density": float(np.mean([cell["density"] for cell in grid_analyses])),
+            "total_tam": float(sum(cell["tam_value"] for cell in grid_analyses)),
+            "total_tsm": float(sum(cell["tsm_value"] for cell in grid_analyses)),
+            "avg_succession_risk": float(np.mean([cell["succession_risk"] for cell in grid_analyses])),
+            "avg_digital_gap": float(np.mean([cell["digital_gap"] for cell in grid_analyses])),
+            "high_opportunity_cells": len([cell for cell in grid_analyses if cell["opportunity"] > 0.7]),
+            "top_opportunities": [
+                {"lat": cell["lat"], "lng": cell["lng"], "opportunity": cell["opportunity"]} for cell in top_cells
+            ]
+        }
     
     async def _fetch_business_data(self, business_name: str, location: str) -> Dict[str, Any]:
         """Fetch comprehensive business data from all APIs"""
@@ -190,40 +476,38 @@ class UnifiedOkapiqEngine:
         if not self.session:
             self.session = aiohttp.ClientSession()
         
-        # Parallel API calls
-        tasks = []
+        # Parallel API calls, keyed by source so a missing key doesn't shift the others
+        tasks = {}
         
         # Yelp data
         if self.api_config.get("YELP_API_KEY"):
-            tasks.append(self._fetch_yelp_data(business_name, location))
+            tasks["yelp_data"] = self._fetch_yelp_data(business_name, location)
         
         # Google Places data
         if self.api_config.get("GOOGLE_MAPS_API_KEY"):
-            tasks.append(self._fetch_google_places_data(business_name, location))
+            tasks["google_data"] = self._fetch_google_places_data(business_name, location)
         
         # Census demographic data
         if self.api_config.get("CENSUS_API_KEY"):
-            tasks.append(self._fetch_census_data(location))
+            tasks["census_data"] = self._fetch_census_data(location)
         
         # SERP/trends data
         if self.api_config.get("SERPAPI_API_KEY"):
-            tasks.append(self._fetch_serp_data(business_name, location))
+            tasks["serp_data"] = self._fetch_serp_data(business_name, location)
         
         # Execute all API calls in parallel
-        api_results = await asyncio.gather(*tasks, return_exceptions=True)
-        
-        # Combine results
-        combined_data = {
-            "name": business_name,
-            "location": location,
-            "yelp_data": api_results[0] if len(api_results) > 0 and not isinstance(api_results[0], Exception) else {},
-            "google_data": api_results[1] if len(api_results) > 1 and not isinstance(api_results[1], Exception) else {},
-            "census_data": api_results[2] if len(api_results) > 2 and not isinstance(api_results[2], Exception) else {},
-            "serp_data": api_results[3] if len(api_results) > 3 and not isinstance(api_results[3], Exception) else {}
-        }
-        
-        # Extract key metrics
-        return self._extract_business_metrics(combined_data)
+        api_results = dict(zip(tasks, await asyncio.gather(*tasks.values(), return_exceptions=True)))
+        
+        # Combine results (a failed call is an empty source)
+        combined_data = {"name": business_name, "location": location}
+        for source in ("yelp_data", "google_data", "census_data", "serp_data"):
+            result = api_results.get(source)
+            combined_data[source] = result if isinstance(result, dict) else {}
+        
+        # Extract key metrics, noting which sources actually answered
+        metrics = self._extract_business_metrics(combined_data)
+        metrics["sources"] = [source for source in api_results if combined_data[source]]
+        return metrics
     
     async def _fetch_yelp_data(self, business_name: str, location: str) -> Dict[str, Any]:
         """Fetch data from Yelp Fusion API"""
@@ -652,8 +936,9 @@ class UnifiedOkapiqEngine:
         
         return recommendations
     
-    async def _generate_area_heatmap(self, location: str, category: str) -> Dict[str, Any]:
-        """Generate heatmap data for the area"""
+    async def _generate_area_heatmap(self, location: str, category: str,
+                                     include_plotly: bool = False, quantize: bool = False) -> Dict[str, Any]:
+        """Generate heatmap data for the area as a compact grid (Plotly figure only with ``include_plotly``)"""
         
         # Get center coordinates
         center_coords = await self._geocode_location(location)
@@ -661,135 +946,67 @@ class UnifiedOkapiqEngine:
             return {"error": "Could not geocode location"}
         
         # Generate sample heatmap data (in production, use real API data)
-        heatmap_data = self._generate_sample_heatmap_data(center_coords, category)
-        
-        # Create Plotly heatmap
-        plotly_heatmap = self._create_plotly_heatmap(heatmap_data)
+        grid = self._generate_sample_heatmap_data(center_coords, category)
+        opportunity = grid.layers["opportunity"]
         
-        return {
+        heatmap = {
             "center_coordinates": center_coords,
-            "heatmap_data": heatmap_data,
-            "plotly_json": plotly_heatmap,
+            "grid": grid.to_payload(quantize),
             "summary": {
-                "total_businesses": len(heatmap_data),
-                "avg_density": np.mean([point["density"] for point in heatmap_data]),
-                "high_opportunity_areas": len([p for p in heatmap_data if p["opportunity"] > 0.7])
+                "total_businesses": int(opportunity.size),
+                "avg_density": float(grid.layers["business_density"].mean()),
+                "high_opportunity_areas": int((opportunity > 0.7).sum())
             }
         }
+        if include_plotly:
+            heatmap["plotly_json"] = self._create_plotly_heatmap(grid)
+        return heatmap
     
-    def _generate_sample_heatmap_data(self, center_coords: Dict, category: str) -> List[Dict]:
-        """Generate sample heatmap data points"""
-        
-        lat_center = center_coords["lat"]
-        lng_center = center_coords["lng"]
-        
-        # Generate grid of points around center
-        points = []
-        for i in range(-10, 11, 2):  # 11x11 grid
-            for j in range(-10, 11, 2):
-                lat = lat_center + (i * 0.01)  # ~1km spacing
-                lng = lng_center + (j * 0.01)
-                
-                # Simulate business density and opportunity
-                density = max(0, np.random.normal(0.5, 0.2))
-                tam_value = np.random.uniform(1e6, 10e6)  # $1M - $10M TAM per point
-                tsm_value = tam_value * np.random.uniform(0.1, 0.3)  # 10-30% of TAM
-                succession_risk = np.random.uniform(0.2, 0.8)
-                digital_gap = np.random.uniform(0.3, 0.9)
-                
-                # Calculate overall opportunity
-                opportunity = (succession_risk * 0.4 + digital_gap * 0.3 + density * 0.3)
-                
-                points.append({
-                    "lat": lat,
-                    "lng": lng,
-                    "density": density,
-                    "tam_value": tam_value,
-                    "tsm_value": tsm_value,
-                    "succession_risk": succession_risk,
-                    "digital_gap": digital_gap,
-                    "opportunity": opportunity,
-                    "business_count": int(density * 20)  # Estimate business count
-                })
-        
-        return points
+    def _generate_sample_heatmap_data(self, center_coords: Dict, category: str) -> HeatmapGrid:
+        """Generate sample heatmap layers on an 11x11 grid around the center"""
+        return sample_opportunity_grid(center_coords, size=11, step=0.02)
     
-    def _create_plotly_heatmap(self, heatmap_data: List[Dict]) -> str:
-        """Create Plotly heatmap visualization"""
-        
-        # Extract coordinates and values
-        lats = [point["lat"] for point in heatmap_data]
-        lngs = [point["lng"] for point in heatmap_data]
-        opportunities = [point["opportunity"] for point in heatmap_data]
-        
-        # Create heatmap
-        fig = go.Figure(data=go.Densitymapbox(
-            lat=lats,
-            lon=lngs,
-            z=opportunities,
-            radius=20,
-            colorscale="Viridis",
-            showscale=True,
-            colorbar=dict(title="Opportunity Score")
-        ))
-        
-        # Update layout
-        fig.update_layout(
-            mapbox=dict(
-                style="open-street-map",
-                center=dict(lat=np.mean(lats), lon=np.mean(lngs)),
-                zoom=10
-            ),
-            height=600,
-            title="Business Opportunity Heatmap"
-        )
-        
-        return json.dumps(fig, cls=PlotlyJSONEncoder)
+    def _create_plotly_heatmap(self, grid: HeatmapGrid) -> str:
+        """Create Plotly heatmap visualization of the opportunity layer"""
+        return grid.plotly_json("opportunity")
     
     async def _geocode_location(self, location: str) -> Optional[Dict[str, float]]:
-        """Geocode location to coordinates"""
-        try:
-            if self.api_config.get("GOOGLE_MAPS_API_KEY"):
-                params = {
-                    "address": location,
-                    "key": self.api_config["GOOGLE_MAPS_API_KEY"]
-                }
-                
-                if not self.session:
-                    self.session = aiohttp.ClientSession()
-                
-                async with self.session.get(
-                    "https://maps.googleapis.com/maps/api/geocode/json",
-                    params=params
-                ) as response:
-                    data = await response.json()
-                    results = data.get("results", [])
-                    
-                    if results:
-                        location_data = results[0]["geometry"]["location"]
-                        return {
-                            "lat": location_data["lat"],
-                            "lng": location_data["lng"]
-                        }
-            
-            # Fallback coordinates for major cities
-            city_coords = {
-                "Dallas": {"lat": 32.7767, "lng": -96.7970},
-                "Miami": {"lat": 25.7617, "lng": -80.1918},
-                "Chicago": {"lat": 41.8781, "lng": -87.6298},
-                "Houston": {"lat": 29.7604, "lng": -95.3698},
-                "Boston": {"lat": 42.3601, "lng": -71.0589}
-            }
-            
-            for city, coords in city_coords.items():
-                if city.lower() in location.lower():
-                    return coords
-            
+        """Geocode location to coordinates (shared cache, then centroids, then Google)"""
+        geocoder = self._google_geocode if self.api_config.get("GOOGLE_MAPS_API_KEY") else None
+        result = await shared_geocode_cache().resolve(location, geocoder)
+        if not result:
             return None
+        return {"lat": result["lat"], "lng": result["lng"]}
+    
+    async def _google_geocode(self, location: str) -> Optional[Dict[str, Any]]:
+        """Google geocode for one address; None when it has no match"""
+        params = {
+            "address": location,
+            "key": self.api_config["GOOGLE_MAPS_API_KEY"]
+        }
+        
+        if not self.session:
+            self.session = aiohttp.ClientSession()
+        
+        async with self.session.get(
+            "https://maps.googleapis.com/maps/api/geocode/json",
+            params=params
+        ) as response:
+            data = await response.json()
+            if data.get("status") not in ("OK", "ZERO_RESULTS"):
+                # Quota, key or server problems are not answers - don't cache them as "not found"
+                raise RuntimeError(f"Google geocode status {data.get('status')}")
+            results = data.get("results", [])
             
-        except Exception as e:
-            logger.error(f"Geocoding error: {e}")
-            return None
+            if not results:
+                return None
+            location_data = results[0]["geometry"]["location"]
+            return {
+                "lat": location_data["lat"],
+                "lng": location_data["lng"],
+                "formatted_address": results[0].get("formatted_address"),
+                "source": "google"
+            }
     
     def _get_state_code(self, location: str) -> Optional[str]:
         """Get state code from location string"""
@@ -995,12 +1212,22 @@ class UnifiedOkapiqEngine:
         if self.session:
             await self.session.close()
 
-# Initialize unified engine
+# Initialize unified engine; its HTTP session and tile lookups live on one loop for the life of the process
 unified_engine = UnifiedOkapiqEngine(API_CONFIG)
+UNIFIED_LOOP = BackgroundEventLoop("unified-loop")
+
+def _heatmap_options(data: Dict[str, Any]) -> Dict[str, bool]:
+    """Heatmap payload options - the compact grid is always sent; maps and figures only when asked for"""
+    quantize = data.get("quantize", False)
+    return {
+        "include_map": bool(data.get("include_map", False)),
+        "include_plotly": bool(data.get("include_plotly", False)),
+        "quantize": quantize == "uint8" or quantize is True
+    }
 
 # Unified API Endpoints
 @app.route('/api/unified/analyze', methods=['POST'])
-async def unified_analyze():
+def unified_analyze():
     """🔍 Comprehensive business analysis endpoint"""
     try:
         data = request.get_json()
@@ -1010,7 +1237,10 @@ async def unified_analyze():
         if not business_name or not location:
             return jsonify({"error": "business_name and location required"}), 400
         
-        result = await unified_engine.analyze_business_comprehensive(business_name, location)
+        options = _heatmap_options(data)
+        result = UNIFIED_LOOP.run(unified_engine.analyze_business_comprehensive(
+            business_name, location, options["include_plotly"], options["quantize"]
+        ))
         return jsonify(result)
         
     except Exception as e:
@@ -1018,7 +1248,7 @@ async def unified_analyze():
         return jsonify({"error": str(e)}), 500
 
 @app.route('/api/unified/heatmap', methods=['POST'])
-async def unified_heatmap():
+def unified_heatmap():
     """🗺️ Generate instant area heatmap"""
     try:
         data = request.get_json()
@@ -1029,15 +1259,48 @@ async def unified_heatmap():
         if not location:
             return jsonify({"error": "location required"}), 400
         
-        result = await unified_engine.generate_area_heatmap(location, category, radius)
+        result = UNIFIED_LOOP.run(unified_engine.generate_area_heatmap(location, category, radius, **_heatmap_options(data)))
         return jsonify(result)
         
     except Exception as e:
         logger.error(f"Heatmap generation error: {e}")
         return jsonify({"error": str(e)}), 500
 
+@app.route('/api/unified/heatmap/stream', methods=['POST'])
+def unified_heatmap_stream():
+    """🗺️ Area heatmap streamed as NDJSON - grid, then cells as they finish, then the summary"""
+    data = request.get_json(silent=True) or {}
+    location = data.get("location")
+    category = data.get("category", "All")
+    radius = data.get("radius_miles", 25)
+    
+    if not location:
+        return jsonify({"error": "location required"}), 400
+    
+    options = _heatmap_options(data)
+    
+    def generate():
+        for event in UNIFIED_LOOP.iterate(unified_engine.stream_area_heatmap(location, category, radius, **options)):
+            yield json.dumps(event, cls=PlotlyJSONEncoder) + "\n"
+    
+    return Response(stream_with_context(generate()), mimetype="application/x-ndjson",
+                    headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+def _batch_analysis_options(data: Dict[str, Any]) -> Tuple[int, float]:
+    """Concurrency and per-business timeout requested for a batch, capped at the server limits
+    
+    Raises ``ValueError`` for non-numeric or non-finite values (get_json accepts NaN and Infinity).
+    """
+    concurrency = float(data.get("concurrency", BATCH_ANALYSIS_CONCURRENCY))
+    timeout_seconds = float(data.get("timeout_seconds", BATCH_ANALYSIS_TIMEOUT_SECONDS))
+    if not (math.isfinite(concurrency) and math.isfinite(timeout_seconds)):
+        raise ValueError("concurrency and timeout_seconds must be finite")
+    concurrency = min(max(int(concurrency), 1), BATCH_ANALYSIS_CONCURRENCY)
+    timeout_seconds = min(max(timeout_seconds, 1.0), BATCH_ANALYSIS_TIMEOUT_SECONDS)
+    return concurrency, timeout_seconds
+
 @app.route('/api/unified/batch-analyze', methods=['POST'])
-async def unified_batch_analyze():
+def unified_batch_analyze():
     """📊 Batch analysis with heatmap generation"""
     try:
         data = request.get_json()
@@ -1047,34 +1310,31 @@ async def unified_batch_analyze():
         if not businesses:
             return jsonify({"error": "businesses array required"}), 400
         
-        # Analyze each business
-        results = []
-        for business in businesses:
-            if "business_name" in business and "location" in business:
-                analysis = await unified_engine.analyze_business_comprehensive(
-                    business["business_name"], 
-                    business["location"]
-                )
-                results.append(analysis)
-        
-        # Generate combined heatmap if requested
-        heatmap_data = None
-        if generate_heatmap and results:
-            # Use first business location as center
-            center_location = businesses[0]["location"]
-            heatmap_data = await unified_engine.generate_area_heatmap(center_location, "All")
-        
-        # Calculate batch summary
-        summary = {
-            "total_analyzed": len(results),
-            "avg_valuation": np.mean([r.get("valuation", {}).get("valuation", {}).get("p50", 0) for r in results if "valuation" in r]),
-            "high_opportunity_count": len([r for r in results if r.get("opportunities", {}).get("overall_opportunity_score", 0) > 70]),
-            "total_tam": sum([r.get("tam_tsm", {}).get("tam", {}).get("total_market_value", 0) for r in results]),
-            "total_tsm": sum([r.get("tam_tsm", {}).get("tsm", {}).get("serviceable_market_value", 0) for r in results])
-        }
+        try:
+            concurrency, timeout_seconds = _batch_analysis_options(data)
+        except (TypeError, ValueError):
+            return jsonify({"error": "concurrency and timeout_seconds must be finite numbers"}), 400
+        
+        async def collect():
+            results, errors, heatmap_data, summary = [], [], None, {}
+            async for event in unified_engine.stream_batch_analysis(businesses, generate_heatmap, concurrency,
+                                                                    timeout_seconds, _heatmap_options(data)):
+                if event["type"] == "result":
+                    results.append((event["index"], event["analysis"]))
+                elif event["type"] == "error":
+                    errors.append({k: v for k, v in event.items() if k != "type"})
+                elif event["type"] == "heatmap":
+                    heatmap_data = event["heatmap"]
+                elif event["type"] == "summary":
+                    summary = {k: v for k, v in event.items() if k not in ("type", "timestamp")}
+            # Results in submission order, as before
+            return [analysis for _, analysis in sorted(results, key=lambda r: r[0])], errors, heatmap_data, summary
+        
+        results, errors, heatmap_data, summary = UNIFIED_LOOP.run(collect())
         
         return jsonify({
             "results": results,
+            "errors": sorted(errors, key=lambda e: e["index"]),
             "heatmap": heatmap_data,
             "summary": summary,
             "timestamp": datetime.now().isoformat()
@@ -1084,6 +1344,30 @@ async def unified_batch_analyze():
         logger.error(f"Batch analysis error: {e}")
         return jsonify({"error": str(e)}), 500
 
+@app.route('/api/unified/batch-analyze/stream', methods=['POST'])
+def unified_batch_analyze_stream():
+    """📊 Batch analysis streamed as NDJSON - each business as soon as it finishes, then the summary"""
+    data = request.get_json(silent=True) or {}
+    businesses = data.get("businesses", [])
+    generate_heatmap = data.get("generate_heatmap", True)
+    
+    if not businesses or not isinstance(businesses, list):
+        return jsonify({"error": "businesses array required"}), 400
+    
+    try:
+        concurrency, timeout_seconds = _batch_analysis_options(data)
+    except (TypeError, ValueError):
+        return jsonify({"error": "concurrency and timeout_seconds must be finite numbers"}), 400
+    
+    def generate():
+        events = unified_engine.stream_batch_analysis(businesses, generate_heatmap, concurrency, timeout_seconds,
+                                                      _heatmap_options(data))
+        for event in UNIFIED_LOOP.iterate(events):
+            yield json.dumps(event, cls=PlotlyJSONEncoder) + "\n"
+    
+    return Response(stream_with_context(generate()), mimetype="application/x-ndjson",
+                    headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
 @app.route('/unified')
 def unified_dashboard():
     """🏦 Unified Okapiq Dashboard"""
@@ -1406,9 +1690,57 @@ def unified_dashboard():
             document.getElementById('resultsSection').classList.remove('hidden');
         }
 
+        function decodeHeatmapLayer(grid, name) {
+            // Base64 typed array -> grid rows (null where a cell has no data)
+            const layer = grid.layers[name];
+            const bytes = Uint8Array.from(atob(layer.data), c => c.charCodeAt(0));
+            const values = layer.dtype === 'uint8'
+                ? Array.from(bytes, v => v === layer.missing ? null : layer.min + v * layer.scale)
+                : Array.from(new Float32Array(bytes.buffer), v => Number.isNaN(v) ? null : v);
+            const rows = [];
+            for (let r = 0; r < grid.rows; r++) {
+                rows.push(values.slice(r * grid.cols, (r + 1) * grid.cols));
+            }
+            return rows;
+        }
+
+        function plotCompactHeatmap(containerId, grid, name, config) {
+            // Each cell's lat/lon comes from the grid bounds and step; cells without data are skipped
+            const lat = [], lon = [], z = [];
+            decodeHeatmapLayer(grid, name).forEach((row, r) => row.forEach((value, c) => {
+                if (value === null) return;
+                lat.push(grid.bounds.south + r * grid.step.lat);
+                lon.push(grid.bounds.west + c * grid.step.lng);
+                z.push(value);
+            }));
+            Plotly.newPlot(containerId, [{
+                type: 'densitymapbox',
+                lat: lat,
+                lon: lon,
+                z: z,
+                radius: 20,
+                colorscale: 'Viridis',
+                showscale: true,
+                colorbar: {title: 'Opportunity Score'}
+            }], {
+                mapbox: {
+                    style: 'open-street-map',
+                    center: {
+                        lat: grid.bounds.south + (grid.rows - 1) * grid.step.lat / 2,
+                        lon: grid.bounds.west + (grid.cols - 1) * grid.step.lng / 2
+                    },
+                    zoom: 10
+                },
+                height: 600,
+                title: 'Business Opportunity Heatmap'
+            }, config);
+        }
+
         function displayHeatmapResults(result) {
-            // Display Plotly heatmap
-            if (result.plotly_json) {
+            // Display heatmap - from the compact grid, or a server-built Plotly figure
+            if (result.grid && result.grid.layers.opportunity) {
+                plotCompactHeatmap('heatmapContainer', result.grid, 'opportunity');
+            } else if (result.plotly_json) {
                 const plotlyData = JSON.parse(result.plotly_json);
                 Plotly.newPlot('heatmapContainer', plotlyData.data, plotlyData.layout);
             }
@@ -0,0 +1,103 @@
+"""
+Content-addressed cache of SMB valuation results
+Results are keyed by the fingerprint SMBValuationEngine derives from the
+business signals, category prior and engine version, so a repeat valuation
+of the same business is a lookup.  Entries are kept as frozen JSON in a
+bounded in-memory LRU and, optionally, as one JSON file per fingerprint in a
+directory; every hit is a new dict marked with when it was computed.
+"""
+
+import json
+import logging
+import os
+import time
+from datetime import datetime
+from typing import Any, Dict, Optional
+
+import numpy as np
+
+from response_cache import LRUCache
+
+logger = logging.getLogger(__name__)
+
+# Enrichment data (reviews, census, trends) goes stale, so results expire
+DEFAULT_TTL_SECONDS = float(os.getenv("VALUATION_CACHE_TTL_SECONDS", "86400"))
+
+
+def json_default(value: Any) -> Any:
+    if isinstance(value, np.generic):
+        return value.item()
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    raise TypeError(f"{type(value).__name__} is not JSON serializable")
+
+
+class ValuationResultCache:
+    """Memory LRU in front of an optional on-disk store, both keyed by fingerprint"""
+
+    def __init__(self, max_entries: int = 2048, directory: Optional[str] = None,
+                 ttl_seconds: float = DEFAULT_TTL_SECONDS):
+        self.memory = LRUCache(max_entries)
+        self.directory = directory
+        self.ttl_seconds = ttl_seconds
+        self.hits = 0
+        self.misses = 0
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+    def _path(self, fingerprint: str) -> str:
+        return os.path.join(self.directory, f"{fingerprint}.json")
+
+    def _fresh(self, entry: Dict[str, Any]) -> bool:
+        return self.ttl_seconds <= 0 or time.time() - entry["stored_at"] < self.ttl_seconds
+
+    def get(self, fingerprint: str) -> Optional[Dict[str, Any]]:
+        """Cached result for ``fingerprint`` (a new dict marked ``cached`` with ``cached_at``) or ``None``"""
+        entry = self.memory.get(fingerprint)
+        if entry is None and self.directory:
+            try:
+                with open(self._path(fingerprint), "r") as f:
+                    stored = json.load(f)
+                entry = {"stored_at": stored["stored_at"], "payload": json.dumps(stored["result"])}
+                self.memory.put(fingerprint, entry)
+            except FileNotFoundError:
+                entry = None
+            except (OSError, KeyError, TypeError, ValueError) as e:
+                logger.warning(f"Valuation cache read error for {fingerprint}: {e}")
+                entry = None
+
+        if entry is None or not self._fresh(entry):
+            self.misses += 1
+            return None
+        self.hits += 1
+        # Callers add keys to results, so never hand out the stored one
+        result = json.loads(entry["payload"])
+        result["cached"] = True
+        result["cached_at"] = datetime.fromtimestamp(entry["stored_at"]).isoformat()
+        return result
+
+    def put(self, fingerprint: str, result: Dict[str, Any]):
+        try:
+            entry = {"stored_at": time.time(), "payload": json.dumps(result, default=json_default)}
+        except (TypeError, ValueError) as e:
+            logger.warning(f"Valuation cache encode error for {fingerprint}: {e}")
+            return
+        self.memory.put(fingerprint, entry)
+        if self.directory:
+            path = self._path(fingerprint)
+            try:
+                tmp_path = f"{path}.tmp"
+                with open(tmp_path, "w") as f:
+                    f.write(f'{{"stored_at": {json.dumps(entry["stored_at"])}, "result": {entry["payload"]}}}')
+                os.replace(tmp_path, path)
+            except OSError as e:
+                logger.warning(f"Valuation cache write error for {fingerprint}: {e}")
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "entries": len(self.memory),
+            "hits": self.hits,
+            "misses": self.misses,
+            "directory": self.directory,
+            "ttl_seconds": self.ttl_seconds
+        }
@@ -0,0 +1,194 @@
+"""
+Persistent SMB valuation history
+Every valuation is stored in SQLite with the fingerprint of the inputs that
+produced it, next to the latest signals of each business.  A portfolio
+revaluation compares current fingerprints with the stored ones and only
+recomputes the businesses whose signals, prior or engine version changed.
+"""
+
+import json
+import logging
+import sqlite3
+import threading
+import time
+from dataclasses import asdict
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from valuation_cache import json_default
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS businesses (
+    business_id TEXT PRIMARY KEY,
+    signals TEXT NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS valuations (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    business_id TEXT NOT NULL,
+    fingerprint TEXT NOT NULL,
+    engine_version TEXT,
+    valued_at REAL NOT NULL,
+    valuation_p50 REAL,
+    aoa_score REAL,
+    result TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS valuations_by_business ON valuations (business_id, id);
+CREATE INDEX IF NOT EXISTS valuations_by_fingerprint ON valuations (fingerprint);
+"""
+
+
+class ValuationStore:
+    """SQLite store of business signals and their valuation history"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._lock = threading.Lock()
+        with self._lock, self._conn:
+            if path != ":memory:":
+                self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.executescript(SCHEMA)
+
+    def record(self, signals, fingerprint: str, result: Dict[str, Any], engine_version: Optional[str] = None) -> bool:
+        """Store one valuation; False when it repeats the business's latest fingerprint"""
+        return self.record_many([(signals, fingerprint, result)], engine_version) == 1
+
+    def record_many(self, entries: Iterable[Tuple[Any, str, Dict[str, Any]]],
+                    engine_version: Optional[str] = None, portfolio_only: bool = False) -> int:
+        """Store (signals, fingerprint, result) valuations in one transaction; returns how many were new
+
+        The business's signals are updated either way, but a result whose
+        fingerprint matches the latest stored one is not added to the history
+        again.  With ``portfolio_only`` businesses not already stored are skipped.
+        """
+        entries = list(entries)
+        if portfolio_only:
+            known = self.portfolio_ids([signals.business_id for signals, _, _ in entries])
+            entries = [entry for entry in entries if entry[0].business_id in known]
+        if not entries:
+            return 0
+        now = time.time()
+        latest = self.latest_fingerprints([signals.business_id for signals, _, _ in entries])
+        added = 0
+        with self._lock, self._conn:
+            for signals, fingerprint, result in entries:
+                self._conn.execute(
+                    "INSERT INTO businesses (business_id, signals, updated_at) VALUES (?, ?, ?) "
+                    "ON CONFLICT(business_id) DO UPDATE SET signals = excluded.signals, updated_at = excluded.updated_at",
+                    (signals.business_id, json.dumps(asdict(signals), default=json_default), now)
+                )
+                if latest.get(signals.business_id) == fingerprint:
+                    continue
+                latest[signals.business_id] = fingerprint
+                self._conn.execute(
+                    "INSERT INTO valuations (business_id, fingerprint, engine_version, valued_at, valuation_p50, aoa_score, result) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    (signals.business_id, fingerprint, engine_version, now,
+                     result.get("valuation", {}).get("valuation", {}).get("p50"),
+                     result.get("aoa", {}).get("total_score"),
+                     json.dumps(result, default=json_default))
+                )
+                added += 1
+        return added
+
+    def add_businesses(self, signals_list: Iterable[Any]):
+        """Add businesses to the portfolio (or update their signals) without valuing them"""
+        now = time.time()
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT INTO businesses (business_id, signals, updated_at) VALUES (?, ?, ?) "
+                "ON CONFLICT(business_id) DO UPDATE SET signals = excluded.signals, updated_at = excluded.updated_at",
+                [(signals.business_id, json.dumps(asdict(signals), default=json_default), now) for signals in signals_list]
+            )
+
+    def portfolio_ids(self, business_ids: List[str]) -> set:
+        """The subset of ``business_ids`` that are in the portfolio"""
+        ids = list(dict.fromkeys(business_ids))
+        known = set()
+        with self._lock:
+            for start in range(0, len(ids), 500):
+                chunk = ids[start:start + 500]
+                rows = self._conn.execute(
+                    f"SELECT business_id FROM businesses WHERE business_id IN ({','.join('?' * len(chunk))})", chunk
+                ).fetchall()
+                known.update(row["business_id"] for row in rows)
+        return known
+
+    def latest_fingerprints(self, business_ids: Optional[List[str]] = None) -> Dict[str, str]:
+        """Fingerprint of the most recent valuation per business (all businesses when ``business_ids`` is None)"""
+        query = ("SELECT v.business_id, v.fingerprint FROM valuations v JOIN "
+                 "(SELECT business_id, MAX(id) AS id FROM valuations {where} GROUP BY business_id) latest "
+                 "ON v.id = latest.id")
+        fingerprints: Dict[str, str] = {}
+        with self._lock:
+            if business_ids is None:
+                rows = self._conn.execute(query.format(where="")).fetchall()
+                fingerprints.update((row["business_id"], row["fingerprint"]) for row in rows)
+            else:
+                ids = list(dict.fromkeys(business_ids))
+                # Stay under SQLite's bound-parameter limit
+                for start in range(0, len(ids), 500):
+                    chunk = ids[start:start + 500]
+                    where = f"WHERE business_id IN ({','.join('?' * len(chunk))})"
+                    rows = self._conn.execute(query.format(where=where), chunk).fetchall()
+                    fingerprints.update((row["business_id"], row["fingerprint"]) for row in rows)
+        return fingerprints
+
+    def business_signals(self, business_ids: Optional[List[str]] = None, batch_size: int = 1000) -> Iterator[Dict[str, Any]]:
+        """Stored signals as dicts, ``batch_size`` rows per query"""
+        wanted = None if business_ids is None else set(business_ids)
+        last_id = ""
+        while True:
+            with self._lock:
+                rows = self._conn.execute(
+                    "SELECT business_id, signals FROM businesses WHERE business_id > ? ORDER BY business_id LIMIT ?",
+                    (last_id, batch_size)
+                ).fetchall()
+            if not rows:
+                return
+            for row in rows:
+                if wanted is None or row["business_id"] in wanted:
+                    yield json.loads(row["signals"])
+            last_id = rows[-1]["business_id"]
+
+    def latest(self, business_id: str) -> Optional[Dict[str, Any]]:
+        """Most recent stored valuation result for a business"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT result FROM valuations WHERE business_id = ? ORDER BY id DESC LIMIT 1", (business_id,)
+            ).fetchone()
+        return json.loads(row["result"]) if row else None
+
+    def history(self, business_id: str, limit: int = 50, include_results: bool = False) -> List[Dict[str, Any]]:
+        """Valuations of a business, newest first"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT fingerprint, engine_version, valued_at, valuation_p50, aoa_score, result "
+                "FROM valuations WHERE business_id = ? ORDER BY id DESC LIMIT ?", (business_id, limit)
+            ).fetchall()
+        history = []
+        for row in rows:
+            entry = {
+                "fingerprint": row["fingerprint"],
+                "engine_version": row["engine_version"],
+                "valued_at": row["valued_at"],
+                "valuation_p50": row["valuation_p50"],
+                "aoa_score": row["aoa_score"]
+            }
+            if include_results:
+                entry["result"] = json.loads(row["result"])
+            history.append(entry)
+        return history
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            businesses = self._conn.execute("SELECT COUNT(*) FROM businesses").fetchone()[0]
+            valuations = self._conn.execute("SELECT COUNT(*) FROM valuations").fetchone()[0]
+        return {"path": self.path, "businesses": businesses, "valuations": valuations}
+
+    def close(self):
+        with self._lock:
+            self._conn.close()